@@ -0,0 +1,170 @@
+"""
+Totais corridos das compras e receitas
+Atualizados em O(1) a cada escrita para que o /resumo seja só uma consulta
+"""
+import threading
+from calculator import ordinal_para_mes
+
+# Diferenças menores que isso são resíduo de ponto flutuante
+TOLERANCIA = 0.005
+
+
+class Agregados:
+    """
+    Totais por cartão, por categoria e por mês
+
+    Só compras ativas entram nas despesas (como no resumo). Cada escrita
+    aplica a diferença do registro (somar, subtrair ou trocar a versão antiga
+    pela nova); o recálculo completo só acontece em `recalcular`.
+
+    As despesas por mês (passados e futuros) ficam num array de diferenças em
+    centavos: cada compra marca o mês da primeira e o mês seguinte ao da
+    última parcela, então adicionar ou trocar uma compra continua O(1).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.carregado = False
+        self._zerar()
+
+    def _zerar(self):
+        self.receitas = 0.0
+        self.despesas = 0.0
+        self.total_compras = 0
+        # {chave: [soma, quantidade]} (a quantidade diz quando a chave some)
+        self.por_cartao = {}
+        self.por_categoria = {}
+        self.receitas_por_mes = {}
+        # {ordinal do mês: centavos} (ver despesas_por_mes)
+        self.diferencas_por_mes = {}
+
+    @staticmethod
+    def _somar(grupos, chave, valor, sinal):
+        grupo = grupos.get(chave)
+        if grupo is None:
+            grupo = grupos[chave] = [0.0, 0]
+        grupo[0] += sinal * valor
+        grupo[1] += sinal
+        if grupo[1] <= 0:
+            del grupos[chave]
+
+    def recalcular(self, compras, receitas):
+        """
+        Refaz todos os totais a partir dos registros
+
+        Args:
+            compras (list): Todas as compras (qualquer status)
+            receitas (list): Todas as receitas
+        """
+        with self._lock:
+            self._zerar()
+            for compra in compras:
+                self._aplicar_compra(compra, 1)
+            for receita in receitas:
+                self._aplicar_receita(receita, 1)
+            self.carregado = True
+
+    def invalidar(self):
+        """Marca os totais como defasados (o próximo resumo recalcula)"""
+        self.carregado = False
+
+    def _aplicar_compra(self, compra, sinal):
+        inicio = compra.mes_inicio_ord
+        fim = None if inicio is None else inicio + compra.total_parcelas - compra.parcela_inicial
+        if fim is not None and fim >= inicio and compra.status != 'erro':
+            centavos = sinal * round(compra.valor_parcela * 100)
+            for mes, delta in ((inicio, centavos), (fim + 1, -centavos)):
+                total = self.diferencas_por_mes.get(mes, 0) + delta
+                if total:
+                    self.diferencas_por_mes[mes] = total
+                else:
+                    self.diferencas_por_mes.pop(mes, None)
+        if compra.status != 'ativo':
+            return
+        self.despesas += sinal * compra.valor_parcela
+        self.total_compras += sinal
+        self._somar(self.por_cartao, compra.cartao, compra.valor_parcela, sinal)
+        self._somar(self.por_categoria, compra.categoria, compra.valor_parcela, sinal)
+
+    def _aplicar_receita(self, receita, sinal):
+        self.receitas += sinal * receita.valor
+        self._somar(self.receitas_por_mes, str(receita.data)[:7], receita.valor, sinal)
+
+    def adicionar_compra(self, compra):
+        with self._lock:
+            self._aplicar_compra(compra, 1)
+
+    def remover_compra(self, compra):
+        with self._lock:
+            self._aplicar_compra(compra, -1)
+
+    def substituir_compra(self, antiga, nova):
+        """Troca a versão antiga de uma compra pela nova (edição ou virada de mês)"""
+        with self._lock:
+            self._aplicar_compra(antiga, -1)
+            self._aplicar_compra(nova, 1)
+
+    def adicionar_receita(self, receita):
+        with self._lock:
+            self._aplicar_receita(receita, 1)
+
+    def remover_receita(self, receita):
+        with self._lock:
+            self._aplicar_receita(receita, -1)
+
+    def _despesas_por_mes(self):
+        """Soma acumulada das diferenças: {'YYYY-MM': total} dos meses com parcelas"""
+        totais = {}
+        meses = sorted(self.diferencas_por_mes)
+        acumulado = 0
+        for mes, seguinte in zip(meses, meses[1:]):
+            acumulado += self.diferencas_por_mes[mes]
+            # Entre duas marcas o total é constante; trechos zerados são pulados
+            if acumulado:
+                for ordinal in range(mes, seguinte):
+                    totais[ordinal_para_mes(ordinal)] = acumulado / 100
+        return totais
+
+    def despesas_por_mes(self):
+        """
+        Total das parcelas de cada mês, passados e futuros
+
+        Returns:
+            dict: {'YYYY-MM': total} só dos meses com parcelas, em ordem
+        """
+        with self._lock:
+            return self._despesas_por_mes()
+
+    def resumo(self):
+        """
+        Totais no formato de Storage.calcular_resumo
+
+        Returns:
+            dict: receitas, despesas, saldo, por_cartao, por_categoria,
+                  receitas_por_mes, despesas_por_mes e total_compras
+        """
+        with self._lock:
+            receitas = round(self.receitas, 2)
+            despesas = round(self.despesas, 2)
+            return {
+                'receitas': receitas,
+                'despesas': despesas,
+                'saldo': round(receitas - despesas, 2),
+                'por_cartao': {k: round(v[0], 2) for k, v in self.por_cartao.items()},
+                'por_categoria': {k: round(v[0], 2) for k, v in self.por_categoria.items()},
+                'receitas_por_mes': {k: round(v[0], 2) for k, v in sorted(self.receitas_por_mes.items())},
+                'despesas_por_mes': self._despesas_por_mes(),
+                'total_compras': self.total_compras
+            }
+
+    @staticmethod
+    def diferentes(resumo_a, resumo_b):
+        """True se dois resumos divergem além da tolerância"""
+        for chave in ('receitas', 'despesas', 'total_compras'):
+            if abs(resumo_a[chave] - resumo_b[chave]) > TOLERANCIA:
+                return True
+        for chave in ('por_cartao', 'por_categoria', 'receitas_por_mes', 'despesas_por_mes'):
+            a, b = resumo_a[chave], resumo_b[chave]
+            if a.keys() != b.keys() or any(abs(a[k] - b[k]) > TOLERANCIA for k in a):
+                return True
+        return False
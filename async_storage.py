@@ -0,0 +1,87 @@
+"""
+Camada assíncrona sobre o armazenamento
+Executa as chamadas bloqueantes (gspread) num pool de threads limitado,
+para que um comando lento não trave o event loop do bot
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config import SHEETS_MAX_WORKERS
+
+
+class AsyncStorage:
+    """
+    Expõe os métodos do gerenciador como corrotinas
+    
+    Qualquer método público do gerenciador pode ser aguardado:
+    `await storage.listar_compras(status='ativo')`
+    """
+    
+    def __init__(self, gerenciador, max_workers=SHEETS_MAX_WORKERS, executor=None):
+        self.gerenciador = gerenciador
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='sheets'
+        )
+    
+    def __getattr__(self, nome):
+        if nome.startswith('_'):
+            raise AttributeError(nome)
+        
+        metodo = getattr(self.gerenciador, nome)
+        if not callable(metodo):
+            return metodo
+        
+        @functools.wraps(metodo)
+        async def chamada(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(metodo, *args, **kwargs)
+            )
+        
+        return chamada
+    
+    def fechar(self):
+        """Encerra o pool de threads aguardando as chamadas em andamento"""
+        self._executor.shutdown(wait=True)
+
+
+class AsyncPool:
+    """
+    Versão assíncrona do pool de planilhas por chat
+    
+    Abrir uma planilha conecta na API, então a resolução também roda no pool
+    de threads; todos os armazenamentos compartilham o mesmo pool.
+    """
+    
+    def __init__(self, pool, max_workers=SHEETS_MAX_WORKERS):
+        self.pool = pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='sheets'
+        )
+    
+    async def obter(self, chave):
+        """
+        Armazenamento do chat/usuário
+        
+        Returns:
+            AsyncStorage: Armazenamento, ou None se o chat não tem planilha
+        """
+        loop = asyncio.get_running_loop()
+        gerenciador = await loop.run_in_executor(self._executor, self.pool.obter, chave)
+        if gerenciador is None:
+            return None
+        return AsyncStorage(gerenciador, executor=self._executor)
+    
+    async def executar(self, funcao, *args, **kwargs):
+        """Roda uma função bloqueante (ex: a virada de uma planilha) no pool de threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(funcao, *args, **kwargs)
+        )
+    
+    def fechar(self):
+        """Fecha as planilhas abertas e o pool de threads"""
+        self._executor.shutdown(wait=True)
+        self.pool.fechar()
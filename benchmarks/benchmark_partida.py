@@ -0,0 +1,209 @@
+"""
+Benchmark do tempo até o primeiro update
+Inicia o bot num processo novo (python bot.py, modo polling) contra uma Bot
+API falsa e o gspread em memória, envia um comando e mede quanto tempo passa
+entre criar o processo e a resposta chegar
+
+Uso:
+    python benchmarks/benchmark_partida.py
+    python benchmarks/benchmark_partida.py --repeticoes 10 --latencia 0.2 --comando /resumo
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(AQUI)
+
+
+def servidor_telegram(comando):
+    """
+    Bot API falsa: entrega um único update com `comando` e anota quando a
+    primeira resposta (sendMessage) chega
+
+    Returns:
+        tuple: (servidor, dict com 'resposta_em' preenchido pela resposta)
+    """
+    estado = {'entregue': False, 'resposta_em': None}
+    resposta = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _corpo(self):
+            tamanho = int(self.headers.get('Content-Length', 0))
+            dados = self.rfile.read(tamanho).decode('utf-8')
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                return json.loads(dados or '{}')
+            return {k: v[0] for k, v in parse_qs(dados).items()}
+
+        def do_POST(self):
+            metodo = self.path.rsplit('/', 1)[-1]
+            self._corpo()
+            if metodo == 'getMe':
+                resultado = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+            elif metodo == 'getUpdates':
+                if estado['entregue']:
+                    resposta.wait(1)
+                    resultado = []
+                else:
+                    estado['entregue'] = True
+                    resultado = [{
+                        'update_id': 1,
+                        'message': {
+                            'message_id': 1, 'date': int(time.time()),
+                            'chat': {'id': 42, 'type': 'private'},
+                            'from': {'id': 42, 'is_bot': False, 'first_name': 'Bench'},
+                            'text': comando,
+                            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(comando.split()[0])}]
+                        }
+                    }]
+            elif metodo == 'sendMessage':
+                if estado['resposta_em'] is None:
+                    estado['resposta_em'] = time.time()
+                    resposta.set()
+                resultado = {'message_id': 2, 'date': int(time.time()), 'chat': {'id': 42, 'type': 'private'}}
+            else:
+                resultado = True
+            corpo = json.dumps({'ok': True, 'result': resultado}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        do_GET = do_POST
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, estado, resposta
+
+
+def filho(latencia):
+    """
+    Processo do bot: troca o pool de planilhas por um com o gspread em memória
+    (a mesma fábrica de produção, só que com o cliente falso) e roda main()
+    """
+    inicio = time.time()
+    sys.path.insert(0, RAIZ)
+    sys.path.insert(0, AQUI)
+    sys.argv = ['bot.py']
+
+    import bot
+    importado = time.time()
+
+    from async_storage import AsyncPool
+    from planilhas import PoolPlanilhas
+    from sheets_client import ClienteSheets
+    from sheets_manager import SheetsManager
+    from planilha_falsa import ClienteFalso
+
+    cliente = ClienteFalso(latencia=latencia)
+    api = ClienteSheets(por_minuto=10 ** 9)
+    pasta = tempfile.mkdtemp()
+
+    def fabrica(spreadsheet_id):
+        gerenciador = SheetsManager(
+            spreadsheet_id, client=cliente, api=api,
+            caminho_historico=os.path.join(pasta, 'historico.db')
+        )
+        gerenciador.inicializar()
+        return gerenciador
+
+    bot.armazenamentos = AsyncPool(PoolPlanilhas(fabrica, padrao='benchmark'))
+    print(json.dumps({'inicio': inicio, 'importado': importado}), flush=True)
+    bot.main()
+
+
+def medir(comando, latencia):
+    """
+    Uma rodada: processo novo até a primeira resposta
+
+    Returns:
+        dict: import_ms (interpretador + import bot) e primeiro_update_ms
+    """
+    servidor, estado, resposta = servidor_telegram(comando)
+    ambiente = dict(
+        os.environ,
+        TELEGRAM_BOT_TOKEN='123:benchmark',
+        TELEGRAM_BASE_URL=f'http://127.0.0.1:{servidor.server_port}/bot',
+        BOT_MODE='polling',
+        STORAGE_BACKEND='sheets',
+        SPREADSHEET_ID='benchmark',
+        OUTBOX_ENABLED='false',
+        VIRADA_PATH=os.path.join(tempfile.mkdtemp(), 'virada.json'),
+        METRICS_PORT='0',
+        METRICS_FILE=''
+    )
+    criado = time.time()
+    processo = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--filho', '--latencia', str(latencia)],
+        env=ambiente, cwd=RAIZ, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        if not resposta.wait(60):
+            raise RuntimeError('o bot não respondeu em 60s')
+        marcos = {}
+        for linha in processo.stdout:
+            if linha.startswith('{'):
+                marcos = json.loads(linha)
+                break
+    finally:
+        processo.terminate()
+        processo.wait(10)
+        servidor.shutdown()
+
+    return {
+        'import_ms': round((marcos.get('importado', criado) - criado) * 1000, 1),
+        'primeiro_update_ms': round((estado['resposta_em'] - criado) * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo até o primeiro update (processo novo)')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--comando', default='/resumo', help='Comando enviado ao bot (padrão: /resumo)')
+    parser.add_argument('--latencia', type=float, default=0.0,
+                        help='Latência simulada por chamada à API do Sheets, em segundos')
+    parser.add_argument('--json', help='Grava as medições neste arquivo')
+    parser.add_argument('--filho', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        filho(args.latencia)
+        return
+
+    medicoes = []
+    for i in range(args.repeticoes):
+        medicao = medir(args.comando, args.latencia)
+        print(f"⏱️ Rodada {i + 1}: import {medicao['import_ms']:.0f} ms, "
+              f"primeiro update {medicao['primeiro_update_ms']:.0f} ms", file=sys.stderr)
+        medicoes.append(medicao)
+
+    resultado = {
+        'comando': args.comando,
+        'latencia': args.latencia,
+        'import_ms': statistics.median(m['import_ms'] for m in medicoes),
+        'primeiro_update_ms': statistics.median(m['primeiro_update_ms'] for m in medicoes),
+        'rodadas': medicoes
+    }
+    print(f"\n📊 Mediana de {args.repeticoes} rodadas ({args.comando}, latência {args.latencia}s):")
+    print(f"  Processo → import do bot:    {resultado['import_ms']:>8.0f} ms")
+    print(f"  Processo → primeiro update:  {resultado['primeiro_update_ms']:>8.0f} ms")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f"\n💾 Medições gravadas em {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark do SheetsManager sem rede
+Mede tempo, chamadas à API e pico de memória das operações principais com
+10 a 10.000 compras, usando o gspread em memória (planilha_falsa.py)
+
+Uso:
+    python benchmarks/benchmark_sheets.py
+    python benchmarks/benchmark_sheets.py --tamanhos 10,100 --latencia 0.05
+    python benchmarks/benchmark_sheets.py --taxa-erro-cota 0.05 --json resultado.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Configuração do benchmark antes de importar o config do bot: sem outbox
+# (as escritas vão direto para a planilha e são contadas na própria operação)
+# e sem reconstrução visual em segundo plano durante as medições
+os.environ.setdefault('OUTBOX_ENABLED', 'false')
+os.environ.setdefault('VISUAL_DEBOUNCE_SECONDS', '3600')
+os.environ.setdefault('VISUAL_MAX_DELAY_SECONDS', '3600')
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sheets_manager import SheetsManager  # noqa: E402
+from sheets_client import ClienteSheets  # noqa: E402
+from planilha_falsa import ClienteFalso  # noqa: E402
+
+TAMANHOS = (10, 100, 1000, 10000)
+CARTOES = ('Nubank', 'Inter', 'Itaú', 'C6', 'XP')
+CATEGORIAS = ('Geral', 'Mercado', 'Casa', 'Lazer')
+
+
+def gerar_compras(quantidade, semente=0):
+    """Itens no formato do /importar (parcela atual já paga)"""
+    aleatorio = random.Random(semente)
+    compras = []
+    for i in range(quantidade):
+        total = aleatorio.choice((1, 2, 3, 6, 10, 12, 24))
+        compras.append({
+            'descricao': f'Compra {i}',
+            'valor_parcela': round(aleatorio.uniform(10, 500), 2),
+            'parcela_atual': aleatorio.randint(1, total),
+            'total_parcelas': total,
+            'cartao': aleatorio.choice(CARTOES),
+            'categoria': aleatorio.choice(CATEGORIAS)
+        })
+    return compras
+
+
+def medir(cliente, nome, funcao):
+    """
+    Executa uma operação medindo tempo, chamadas à API e pico de memória
+
+    Returns:
+        dict: operacao, tempo_ms, chamadas, erros_cota, por_metodo e pico_kib
+    """
+    cliente.zerar_contadores()
+    tracemalloc.reset_peak()
+    antes, _ = tracemalloc.get_traced_memory()
+    inicio = time.perf_counter()
+    funcao()
+    tempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    return {
+        'operacao': nome,
+        'tempo_ms': round(tempo * 1000, 2),
+        'chamadas': cliente.total_chamadas(),
+        'erros_cota': sum(cliente.erros.values()),
+        'por_metodo': dict(sorted(cliente.chamadas.items())),
+        'pico_kib': round(max(0, pico - antes) / 1024, 1)
+    }
+
+
+def executar(tamanho, latencia=0.0, taxa_erro_cota=0.0, semente=0):
+    """
+    Roda todas as operações numa planilha falsa com `tamanho` compras
+
+    Returns:
+        list: Uma medição por operação
+    """
+    cliente = ClienteFalso(latencia=latencia, taxa_erro_cota=taxa_erro_cota, semente=semente)
+    # Sem limite local de cota e com backoff curto: mede o código, não a espera
+    api = ClienteSheets(por_minuto=10 ** 9, espera_base=0.001, espera_maxima=0.01)
+    dados = gerar_compras(tamanho, semente)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        gerenciador = SheetsManager(
+            spreadsheet_id=f'benchmark-{tamanho}', client=cliente, api=api,
+            caminho_historico=os.path.join(pasta, 'historico.db')
+        )
+        gerenciador.inicializar()
+
+        def listar_frio():
+            gerenciador.invalidar_cache()
+            gerenciador.listar_compras(status='todos')
+
+        def resumo_frio():
+            gerenciador.invalidar_cache()
+            gerenciador.calcular_resumo()
+
+        def adicionar_dez():
+            for i in range(10):
+                gerenciador.adicionar_compra(f'Nova {i}', 1200.0, 100.0, 1, 12, 'Nubank')
+
+        medicoes = [
+            medir(cliente, 'importar_dados', lambda: gerenciador.importar_dados(dados)),
+            medir(cliente, 'listar_compras (frio)', listar_frio),
+            medir(cliente, 'listar_compras (cache)', lambda: gerenciador.listar_compras(status='todos')),
+            medir(cliente, 'calcular_resumo (frio)', resumo_frio),
+            medir(cliente, 'calcular_resumo (cache)', gerenciador.calcular_resumo),
+            medir(cliente, 'adicionar_compra x10', adicionar_dez),
+            medir(cliente, 'atualizar_mes', gerenciador.atualizar_mes),
+            medir(cliente, 'atualizar_aba_visual', gerenciador.atualizar_aba_visual),
+        ]
+        gerenciador.fechar()
+
+    for medicao in medicoes:
+        medicao['compras'] = tamanho
+    return medicoes
+
+
+def imprimir(medicoes):
+    print(f"\n{'compras':>8} | {'operação':<24} | {'tempo (ms)':>11} | {'chamadas':>8} | {'429':>4} | {'pico (KiB)':>10}")
+    print('-' * 80)
+    for m in medicoes:
+        print(f"{m['compras']:>8} | {m['operacao']:<24} | {m['tempo_ms']:>11.2f} | "
+              f"{m['chamadas']:>8} | {m['erros_cota']:>4} | {m['pico_kib']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do SheetsManager com gspread em memória')
+    parser.add_argument('--tamanhos', default=','.join(map(str, TAMANHOS)),
+                        help='Quantidades de compras separadas por vírgula (padrão: 10,100,1000,10000)')
+    parser.add_argument('--latencia', type=float, default=0.0,
+                        help='Latência simulada por chamada à API, em segundos')
+    parser.add_argument('--taxa-erro-cota', type=float, default=0.0,
+                        help='Probabilidade de uma chamada responder 429 (0 a 1)')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--json', help='Grava as medições (com chamadas por método) neste arquivo')
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    medicoes = []
+    for tamanho in (int(t) for t in args.tamanhos.split(',')):
+        print(f"⏱️ {tamanho} compras...", file=sys.stderr)
+        medicoes.extend(executar(tamanho, args.latencia, args.taxa_erro_cota, args.semente))
+    tracemalloc.stop()
+
+    imprimir(medicoes)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(medicoes, arquivo, ensure_ascii=False, indent=2)
+        print(f"\n💾 Medições gravadas em {args.json}")
+
+
+if __name__ == '__main__':
+    main()
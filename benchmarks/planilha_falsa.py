@@ -0,0 +1,221 @@
+"""
+gspread em memória para benchmarks
+Cliente, planilha e abas falsas com a mesma interface usada pelo
+SheetsManager, latência e erros de cota injetáveis e contagem de chamadas
+"""
+import collections
+import random
+import threading
+import time
+import gspread
+from gspread.utils import a1_range_to_grid_range
+
+
+class RespostaFalsa:
+    """Resposta HTTP mínima para montar um gspread.exceptions.APIError"""
+
+    def __init__(self, status_code, mensagem):
+        self.status_code = status_code
+        self.text = mensagem
+        self._corpo = {'error': {'code': status_code, 'message': mensagem, 'status': 'RESOURCE_EXHAUSTED'}}
+
+    def json(self):
+        return self._corpo
+
+
+class ClienteFalso:
+    """
+    Substituto do gspread.Client
+
+    Todas as chamadas de planilhas e abas passam por `_chamada`, que conta a
+    chamada por método, espera a latência configurada e pode responder 429.
+
+    Uso: `SheetsManager(spreadsheet_id='x', client=ClienteFalso(latencia=0.05))`
+    """
+
+    def __init__(self, latencia=0.0, taxa_erro_cota=0.0, cota_por_minuto=None, semente=0):
+        """
+        Args:
+            latencia (float): Segundos de espera por chamada (simula a rede)
+            taxa_erro_cota (float): Probabilidade (0 a 1) de uma chamada responder 429
+            cota_por_minuto (int): Chamadas aceitas por janela de 60s (None = sem cota)
+            semente (int): Semente dos erros aleatórios (resultados reproduzíveis)
+        """
+        self.latencia = latencia
+        self.taxa_erro_cota = taxa_erro_cota
+        self.cota_por_minuto = cota_por_minuto
+        self.chamadas = collections.Counter()
+        self.erros = collections.Counter()
+        self._aleatorio = random.Random(semente)
+        self._janela = collections.deque()
+        self._falhas_forcadas = 0
+        self._planilhas = {}
+        self._lock = threading.Lock()
+
+    def falhar_proximas(self, quantidade):
+        """Faz as próximas `quantidade` chamadas responderem 429"""
+        with self._lock:
+            self._falhas_forcadas += quantidade
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.chamadas.clear()
+            self.erros.clear()
+
+    def total_chamadas(self):
+        return sum(self.chamadas.values())
+
+    def _chamada(self, metodo):
+        """Registra uma chamada à API (latência, cota e contagem)"""
+        with self._lock:
+            self.chamadas[metodo] += 1
+            agora = time.monotonic()
+            while self._janela and agora - self._janela[0] >= 60:
+                self._janela.popleft()
+            estourou = self.cota_por_minuto is not None and len(self._janela) >= self.cota_por_minuto
+            if not estourou:
+                self._janela.append(agora)
+            if self._falhas_forcadas:
+                self._falhas_forcadas -= 1
+                estourou = True
+            elif self.taxa_erro_cota and self._aleatorio.random() < self.taxa_erro_cota:
+                estourou = True
+            if estourou:
+                self.erros[metodo] += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        if estourou:
+            raise gspread.exceptions.APIError(RespostaFalsa(429, 'Quota exceeded (falso)'))
+
+    def open_by_key(self, chave):
+        self._chamada('Client.open_by_key')
+        with self._lock:
+            planilha = self._planilhas.get(chave)
+            if planilha is None:
+                planilha = self._planilhas[chave] = PlanilhaFalsa(self, chave)
+        return planilha
+
+
+class PlanilhaFalsa:
+    """Substituto do gspread.Spreadsheet"""
+
+    def __init__(self, cliente, chave):
+        self.cliente = cliente
+        self.id = chave
+        self._abas = {}
+        self._proximo_id = 0
+
+    def worksheet(self, titulo):
+        self.cliente._chamada('Spreadsheet.worksheet')
+        try:
+            return self._abas[titulo]
+        except KeyError:
+            raise gspread.exceptions.WorksheetNotFound(titulo) from None
+
+    def worksheets(self):
+        self.cliente._chamada('Spreadsheet.worksheets')
+        return list(self._abas.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self.cliente._chamada('Spreadsheet.add_worksheet')
+        return self._criar_aba(title)
+
+    def _criar_aba(self, titulo):
+        self._proximo_id += 1
+        aba = self._abas[titulo] = AbaFalsa(self, titulo, self._proximo_id)
+        return aba
+
+    def fetch_sheet_metadata(self, params=None):
+        self.cliente._chamada('Spreadsheet.fetch_sheet_metadata')
+        return {'sheets': [
+            {'properties': {'title': aba.title, 'sheetId': aba.id}} for aba in self._abas.values()
+        ]}
+
+    def batch_update(self, body):
+        """Só os pedidos addSheet (criação de abas) são interpretados"""
+        self.cliente._chamada('Spreadsheet.batch_update')
+        respostas = []
+        for pedido in body.get('requests', []):
+            propriedades = pedido.get('addSheet', {}).get('properties')
+            if propriedades is None:
+                respostas.append({})
+                continue
+            aba = self._criar_aba(propriedades['title'])
+            respostas.append({'addSheet': {'properties': {'title': aba.title, 'sheetId': aba.id}}})
+        return {'replies': respostas}
+
+    def values_batch_update(self, body, **kwargs):
+        self.cliente._chamada('Spreadsheet.values_batch_update')
+        for bloco in body['data']:
+            titulo, intervalo = bloco['range'].rsplit('!', 1)
+            self._abas[titulo.strip("'")]._escrever(intervalo, bloco['values'])
+
+
+class AbaFalsa:
+    """Substituto do gspread.Worksheet (valores guardados como lista de linhas)"""
+
+    def __init__(self, planilha, titulo, id_aba):
+        self.spreadsheet = planilha
+        self.title = titulo
+        self.id = id_aba
+        self.linhas = []
+
+    def _chamada(self, metodo):
+        self.spreadsheet.cliente._chamada(f'Worksheet.{metodo}')
+
+    def _escrever(self, intervalo, valores):
+        grade = a1_range_to_grid_range(intervalo)
+        linha0 = grade.get('startRowIndex', 0)
+        coluna0 = grade.get('startColumnIndex', 0)
+        for i, valores_linha in enumerate(valores):
+            indice = linha0 + i
+            while len(self.linhas) <= indice:
+                self.linhas.append([])
+            linha = self.linhas[indice]
+            fim = coluna0 + len(valores_linha)
+            if len(linha) < fim:
+                linha.extend([''] * (fim - len(linha)))
+            linha[coluna0:fim] = valores_linha
+
+    def get_all_values(self, **kwargs):
+        self._chamada('get_all_values')
+        largura = max((len(linha) for linha in self.linhas), default=0)
+        return [list(linha) + [''] * (largura - len(linha)) for linha in self.linhas]
+
+    def get_all_records(self, **kwargs):
+        self._chamada('get_all_records')
+        if not self.linhas:
+            return []
+        cabecalho = self.linhas[0]
+        return [
+            dict(zip(cabecalho, list(linha) + [''] * (len(cabecalho) - len(linha))))
+            for linha in self.linhas[1:]
+        ]
+
+    def col_values(self, coluna, **kwargs):
+        self._chamada('col_values')
+        valores = [linha[coluna - 1] if len(linha) >= coluna else '' for linha in self.linhas]
+        while valores and valores[-1] == '':
+            valores.pop()
+        return valores
+
+    def append_row(self, valores, **kwargs):
+        self._chamada('append_row')
+        self.linhas.append(list(valores))
+
+    def append_rows(self, valores, **kwargs):
+        self._chamada('append_rows')
+        self.linhas.extend(list(linha) for linha in valores)
+
+    def update(self, intervalo, valores=None, **kwargs):
+        self._chamada('update')
+        self._escrever(intervalo, valores)
+
+    def batch_update(self, dados, **kwargs):
+        self._chamada('batch_update')
+        for bloco in dados:
+            self._escrever(bloco['range'], bloco['values'])
+
+    def clear(self):
+        self._chamada('clear')
+        self.linhas = []
@@ -0,0 +1,216 @@
+"""
+Verificação do modo webhook contra uma Bot API falsa
+Inicia o bot num processo novo (python bot.py, BOT_MODE=webhook) com o
+armazenamento SQLite num diretório temporário e confere que:
+
+- o setWebhook leva a URL, os tipos de update tratados e o segredo
+- um update com o segredo certo é atendido (chega um sendMessage)
+- um update com o segredo errado é recusado (403) e não é atendido
+
+Uso:
+    python benchmarks/verificar_webhook.py
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(AQUI)
+
+URL_PUBLICA = 'https://bot.exemplo.invalid'
+CAMINHO = 'telegram'
+SEGREDO = 'segredo-da-verificacao'
+TIPOS_ESPERADOS = ['message', 'callback_query']
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def servidor_telegram():
+    """
+    Bot API falsa: guarda o pedido de setWebhook e as mensagens enviadas
+
+    Returns:
+        tuple: (servidor, dict com 'set_webhook' e 'mensagens', Event do setWebhook)
+    """
+    estado = {'set_webhook': None, 'mensagens': []}
+    configurado = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _corpo(self):
+            tamanho = int(self.headers.get('Content-Length', 0))
+            dados = self.rfile.read(tamanho).decode('utf-8')
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                return json.loads(dados or '{}')
+            return {k: v[0] for k, v in parse_qs(dados).items()}
+
+        def do_POST(self):
+            metodo = self.path.rsplit('/', 1)[-1]
+            corpo = self._corpo()
+            if metodo == 'getMe':
+                resultado = {'id': 1, 'is_bot': True, 'first_name': 'Teste', 'username': 'teste_bot'}
+            elif metodo == 'setWebhook':
+                estado['set_webhook'] = corpo
+                configurado.set()
+                resultado = True
+            elif metodo == 'sendMessage':
+                estado['mensagens'].append(corpo)
+                resultado = {'message_id': 2, 'date': int(time.time()), 'chat': {'id': 42, 'type': 'private'}}
+            else:
+                resultado = True
+            resposta = json.dumps({'ok': True, 'result': resultado}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(resposta)))
+            self.end_headers()
+            self.wfile.write(resposta)
+
+        do_GET = do_POST
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, estado, configurado
+
+
+def enviar_update(porta, update_id, segredo):
+    """
+    Entrega um /start ao servidor de webhook do bot
+
+    Returns:
+        int: Status HTTP da resposta
+    """
+    update = {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': int(time.time()),
+            'chat': {'id': 42, 'type': 'private'},
+            'from': {'id': 42, 'is_bot': False, 'first_name': 'Teste'},
+            'text': '/start',
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}]
+        }
+    }
+    pedido = urllib.request.Request(
+        f'http://127.0.0.1:{porta}/{CAMINHO}', data=json.dumps(update).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'X-Telegram-Bot-Api-Secret-Token': segredo}
+    )
+    try:
+        with urllib.request.urlopen(pedido, timeout=10) as resposta:
+            return resposta.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def porta_aberta(porta):
+    with socket.socket() as s:
+        return s.connect_ex(('127.0.0.1', porta)) == 0
+
+
+def esperar(condicao, segundos=10):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def verificar():
+    """
+    Roda o bot em modo webhook e confere a configuração e o segredo
+
+    Returns:
+        list: Falhas encontradas (vazia se tudo certo)
+    """
+    servidor, estado, configurado = servidor_telegram()
+    porta = porta_livre()
+    pasta = tempfile.mkdtemp()
+    ambiente = dict(
+        os.environ,
+        TELEGRAM_BOT_TOKEN='123:verificacao',
+        TELEGRAM_BASE_URL=f'http://127.0.0.1:{servidor.server_port}/bot',
+        BOT_MODE='webhook',
+        WEBHOOK_URL=URL_PUBLICA,
+        WEBHOOK_LISTEN='127.0.0.1',
+        WEBHOOK_PORT=str(porta),
+        WEBHOOK_PATH=CAMINHO,
+        WEBHOOK_SECRET_TOKEN=SEGREDO,
+        STORAGE_BACKEND='sqlite',
+        SHEETS_MIRROR='false',
+        SQLITE_PATH=os.path.join(pasta, 'gastos.db'),
+        HISTORICO_PATH=os.path.join(pasta, 'historico.db'),
+        VIRADA_PATH=os.path.join(pasta, 'virada.json'),
+        METRICS_PORT='0',
+        METRICS_FILE=''
+    )
+    processo = subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ, 'bot.py')],
+        env=ambiente, cwd=pasta, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    falhas = []
+    try:
+        if not configurado.wait(60):
+            return ['o bot não chamou setWebhook em 60s']
+
+        pedido = estado['set_webhook']
+        tipos = pedido.get('allowed_updates')
+        if isinstance(tipos, str):
+            tipos = json.loads(tipos)
+        if pedido.get('url') != f'{URL_PUBLICA}/{CAMINHO}':
+            falhas.append(f"setWebhook com a URL {pedido.get('url')!r}")
+        if tipos != TIPOS_ESPERADOS:
+            falhas.append(f'setWebhook com allowed_updates={tipos!r}')
+        if pedido.get('secret_token') != SEGREDO:
+            falhas.append('setWebhook sem o segredo')
+
+        # O servidor do webhook sobe logo depois do setWebhook
+        if not esperar(lambda: porta_aberta(porta)):
+            return falhas + ['o servidor do webhook não abriu a porta']
+
+        status = enviar_update(porta, 1, 'segredo-errado')
+        if status != 403:
+            falhas.append(f'segredo errado respondeu {status} (esperado 403)')
+
+        status = enviar_update(porta, 2, SEGREDO)
+        if status != 200:
+            falhas.append(f'segredo certo respondeu {status} (esperado 200)')
+        elif not esperar(lambda: estado['mensagens']):
+            falhas.append('o /start com o segredo certo não foi respondido')
+
+        # Só o update com o segredo certo foi atendido
+        time.sleep(0.5)
+        if len(estado['mensagens']) > 1:
+            falhas.append(f"{len(estado['mensagens'])} respostas para um único update aceito")
+    finally:
+        processo.terminate()
+        processo.wait(10)
+        servidor.shutdown()
+    return falhas
+
+
+def main():
+    print("🔌 Modo webhook contra a Bot API falsa...")
+    falhas = verificar()
+    for falha in falhas:
+        print(f"  ❌ {falha}")
+    if not falhas:
+        print("  ✅ setWebhook com URL, tipos de update e segredo; segredo errado recusado (403)")
+    return not falhas
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -2,10 +2,12 @@
 Bot do Telegram para Controle Automático de Gastos Parcelados
 """
 import logging
-import schedule
+import sys
 import time
-from datetime import datetime
+from datetime import datetime, timedelta, time as horario
+from zoneinfo import ZoneInfo
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import MessageLimit
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -15,9 +17,17 @@ from telegram.ext import (
     filters,
     ContextTypes
 )
-from config import TELEGRAM_BOT_TOKEN, COMMANDS, CURRENCY_FORMAT, AUTO_UPDATE_DAY
-from sheets_manager import SheetsManager
-from calculator import ParcelCalculator
+from config import (
+    TELEGRAM_BOT_TOKEN, TELEGRAM_BASE_URL, COMMANDS, CURRENCY_FORMAT, AUTO_UPDATE_DAY,
+    AUTO_UPDATE_TIME, TIMEZONE, VIRADA_PATH, ADMIN_IDS, METRICS_FILE, METRICS_INTERVAL, METRICS_PORT,
+    MAX_MESES_PROJECAO, LISTAR_POR_PAGINA, TENANT_KEY, BOT_MODE, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT,
+    WEBHOOK_PATH, WEBHOOK_SECRET_TOKEN
+)
+from storage import criar_pool
+from async_storage import AsyncPool
+from calculator import ParcelCalculator, nome_do_mes, mes_para_ordinal
+from virada import EstadoVirada, virar_mes, virar_se_pendente
+from metricas import metricas, cronometrar, servir_metricas
 
 # Configurar logging
 logging.basicConfig(
@@ -31,13 +41,50 @@ logger = logging.getLogger(__name__)
  ADICIONAR_TOTAL_PARCELAS, ADICIONAR_CARTAO,
  IMPORTAR_DADOS, RECEITA_DESCRICAO, RECEITA_VALOR) = range(8)
 
-# Inicializar gerenciadores
-sheets = SheetsManager()
+# Tipos de update tratados pelos handlers (o Telegram não entrega os demais)
+TIPOS_DE_UPDATE = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# /listar: margem para título e rodapé dentro do limite de uma mensagem
+LIMITE_PAGINA = MessageLimit.MAX_TEXT_LENGTH - 200
+# /listar: descrição e nome do cartão são encurtados para uma compra sempre caber na página
+LIMITE_DESCRICAO = 200
+LIMITE_CARTAO = 60
+# Listagens guardadas por chat para a paginação (as mais antigas são descartadas)
+LISTAGENS_POR_CHAT = 5
+
+# Inicializar gerenciadores: uma planilha por chat (pool LRU), chamadas num pool de threads
+armazenamentos = AsyncPool(criar_pool())
 calc = ParcelCalculator()
+estado_virada = EstadoVirada(VIRADA_PATH)
+
+
+def chave_do_chat(update: Update):
+    """Chave que escolhe a planilha: o chat ou o usuário (TENANT_KEY)"""
+    return update.effective_user.id if TENANT_KEY == 'user' else update.effective_chat.id
+
+
+async def storage_do_chat(update: Update):
+    """Armazenamento do chat (ou usuário) da mensagem; avisa e retorna None se não houver"""
+    try:
+        storage = await armazenamentos.obter(chave_do_chat(update))
+    except Exception as e:
+        logger.error(f"❌ Erro ao abrir a planilha do chat: {e}")
+        await update.message.reply_text(
+            "❌ Não consegui abrir a planilha agora. Tente novamente em instantes.",
+            parse_mode='Markdown'
+        )
+        return None
+    if storage is None:
+        await update.message.reply_text(
+            "❌ Este chat não tem uma planilha configurada.",
+            parse_mode='Markdown'
+        )
+    return storage
 
 
 # ============ COMANDOS PRINCIPAIS ============
 
+@cronometrar
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /start - Apresentação do bot"""
     mensagem = """
@@ -51,6 +98,7 @@ Nunca mais atualize parcelas manualmente!
 📝 `/adicionar` - Nova compra parcelada
 📊 `/resumo` - Resumo financeiro do mês
 📋 `/listar` - Ver gastos atuais
+🔮 `/proximo` - Gastos dos próximos meses
 💰 `/receita` - Adicionar receita
 🔄 `/atualizarmes` - Atualizar parcelas
 📥 `/importar` - Importar dados existentes
@@ -62,6 +110,7 @@ Vamos começar? Digite `/adicionar` para sua primeira compra! 🚀
     await update.message.reply_text(mensagem, parse_mode='Markdown')
 
 
+@cronometrar
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /help - Lista todos os comandos"""
     mensagem = "📚 *Comandos Disponíveis:*\n\n"
@@ -74,6 +123,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ============ ADICIONAR COMPRA ============
 
+@cronometrar
 async def adicionar_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Inicia o processo de adicionar compra"""
     await update.message.reply_text(
@@ -85,6 +135,7 @@ async def adicionar_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ADICIONAR_DESCRICAO
 
 
+@cronometrar
 async def adicionar_descricao(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recebe a descrição"""
     context.user_data['descricao'] = update.message.text
@@ -98,6 +149,7 @@ async def adicionar_descricao(update: Update, context: ContextTypes.DEFAULT_TYPE
     return ADICIONAR_VALOR
 
 
+@cronometrar
 async def adicionar_valor(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recebe o valor"""
     try:
@@ -122,6 +174,7 @@ async def adicionar_valor(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ADICIONAR_VALOR
 
 
+@cronometrar
 async def adicionar_parcela_inicial(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recebe a parcela inicial"""
     try:
@@ -144,6 +197,7 @@ async def adicionar_parcela_inicial(update: Update, context: ContextTypes.DEFAUL
         return ADICIONAR_PARCELA_INICIAL
 
 
+@cronometrar
 async def adicionar_total_parcelas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recebe o total de parcelas"""
     try:
@@ -166,6 +220,7 @@ async def adicionar_total_parcelas(update: Update, context: ContextTypes.DEFAULT
         return ADICIONAR_TOTAL_PARCELAS
 
 
+@cronometrar
 async def adicionar_cartao(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recebe o cartão e finaliza"""
     cartao = update.message.text
@@ -180,7 +235,12 @@ async def adicionar_cartao(update: Update, context: ContextTypes.DEFAULT_TYPE):
     valor_parcela = valor_total / total_parcelas
     
     # Adicionar na planilha
-    resultado = sheets.adicionar_compra(
+    storage = await storage_do_chat(update)
+    if storage is None:
+        context.user_data.clear()
+        return ConversationHandler.END
+    
+    resultado = await storage.adicionar_compra(
         descricao=descricao,
         valor_total=valor_total,
         valor_parcela=valor_parcela,
@@ -191,8 +251,8 @@ async def adicionar_cartao(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if resultado:
         parcela_formatada = calc.formatar_parcela(
-            resultado['parcela_atual'],
-            resultado['total_parcelas']
+            resultado.parcela_atual,
+            resultado.total_parcelas
         )
         
         mensagem = f"""
@@ -222,14 +282,110 @@ Use `/resumo` para ver o total do mês.
 
 # ============ LISTAR E RESUMO ============
 
+def _tamanho(texto):
+    """Tamanho como o Telegram conta (unidades UTF-16: emojis valem 2)"""
+    return len(texto.encode('utf-16-le')) // 2
+
+
+def _encurtar(texto, limite):
+    """Corta o texto em `limite` caracteres do Telegram, terminando com reticências"""
+    if _tamanho(texto) <= limite:
+        return texto
+    texto = texto[:limite]
+    while _tamanho(texto) > limite - 1:
+        texto = texto[:-1]
+    return texto + '…'
+
+
+def paginar_compras(compras, por_pagina=LISTAR_POR_PAGINA, limite=LIMITE_PAGINA):
+    """
+    Divide a listagem de compras (agrupada por cartão) em páginas
+    
+    Cada página tem no máximo `por_pagina` compras e `limite` caracteres. O
+    cartão que continua numa página seguinte tem o cabeçalho repetido, e o
+    subtotal vem depois da última compra do cartão. Descrições e nomes de
+    cartão longos são encurtados (LIMITE_DESCRICAO, LIMITE_CARTAO): uma
+    compra sozinha nunca passa do limite da página.
+    
+    Returns:
+        list: Texto (Markdown) de cada página, sem título
+    """
+    por_cartao = {}
+    for compra in compras:
+        por_cartao.setdefault(compra.cartao, []).append(compra)
+    
+    paginas = []
+    pagina = []
+    tamanho = 0
+    cartao_da_pagina = None
+    
+    for cartao_nome, lista in por_cartao.items():
+        total_cartao = sum(c.valor_parcela for c in lista)
+        
+        for i, c in enumerate(lista):
+            parcela_fmt = calc.formatar_parcela(c.parcela_atual, c.total_parcelas)
+            descricao = _encurtar(c.descricao, LIMITE_DESCRICAO)
+            bloco = f"  • {descricao} {parcela_fmt} - {CURRENCY_FORMAT.format(c.valor_parcela)}\n"
+            if i == len(lista) - 1:
+                bloco += f"  *Subtotal:* {CURRENCY_FORMAT.format(total_cartao)}\n\n"
+            cabecalho = f"💳 *{_encurtar(cartao_nome, LIMITE_CARTAO)}*{' (cont.)' if i else ''}\n"
+            
+            novo_cartao = cartao_da_pagina != cartao_nome
+            if pagina and (len(pagina) >= por_pagina
+                           or tamanho + _tamanho(bloco) + (_tamanho(cabecalho) if novo_cartao else 0) > limite):
+                paginas.append(''.join(pagina))
+                pagina, tamanho, novo_cartao = [], 0, True
+            
+            if novo_cartao:
+                bloco = cabecalho + bloco
+                cartao_da_pagina = cartao_nome
+            pagina.append(bloco)
+            tamanho += _tamanho(bloco)
+    
+    if pagina:
+        paginas.append(''.join(pagina))
+    return paginas
+
+
+def pagina_da_listagem(listagem, listagem_id, indice):
+    """
+    Texto e teclado de uma página de uma listagem guardada
+    
+    Returns:
+        tuple: (texto em Markdown, InlineKeyboardMarkup ou None se for página única)
+    """
+    paginas = listagem['paginas']
+    indice = max(0, min(indice, len(paginas) - 1))
+    
+    if len(paginas) == 1:
+        return f"📊 *Gastos do Mês Atual*\n\n{paginas[0]}", None
+    
+    separador = '' if paginas[indice].endswith('\n\n') else '\n'
+    texto = (
+        f"📊 *Gastos do Mês Atual* ({indice + 1}/{len(paginas)})\n\n{paginas[indice]}{separador}"
+        f"📦 {listagem['quantidade']} compras - Total: {CURRENCY_FORMAT.format(listagem['total'])}"
+    )
+    botoes = []
+    if indice > 0:
+        botoes.append(InlineKeyboardButton("⬅️ Anterior", callback_data=f"listar:{listagem_id}:{indice - 1}"))
+    if indice < len(paginas) - 1:
+        botoes.append(InlineKeyboardButton("Próxima ➡️", callback_data=f"listar:{listagem_id}:{indice + 1}"))
+    return texto, InlineKeyboardMarkup([botoes])
+
+
+@cronometrar
 async def listar(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Lista gastos do mês atual"""
+    """Lista gastos do mês atual (paginado)"""
     # Verificar se tem filtro de cartão
     cartao = None
     if context.args and len(context.args) > 0:
         cartao = ' '.join(context.args)
     
-    compras = sheets.listar_compras(cartao=cartao, status='ativo')
+    storage = await storage_do_chat(update)
+    if storage is None:
+        return
+    
+    compras = await storage.listar_compras(cartao=cartao, status='ativo')
     
     if not compras:
         await update.message.reply_text(
@@ -238,34 +394,51 @@ async def listar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    # Agrupar por cartão
-    por_cartao = {}
-    for compra in compras:
-        c = compra['Cartão']
-        if c not in por_cartao:
-            por_cartao[c] = []
-        por_cartao[c].append(compra)
+    # Guardar as páginas prontas no chat: navegar não relê a planilha
+    listagem = {
+        'paginas': paginar_compras(compras),
+        'quantidade': len(compras),
+        'total': sum(c.valor_parcela for c in compras)
+    }
+    listagem_id = context.chat_data.get('proxima_listagem', 0)
+    context.chat_data['proxima_listagem'] = listagem_id + 1
+    listagens = context.chat_data.setdefault('listagens', {})
+    listagens[listagem_id] = listagem
+    while len(listagens) > LISTAGENS_POR_CHAT:
+        del listagens[next(iter(listagens))]
     
-    # Montar mensagem
-    mensagem = "📊 *Gastos do Mês Atual*\n\n"
+    texto, teclado = pagina_da_listagem(listagem, listagem_id, 0)
+    await update.message.reply_text(texto, parse_mode='Markdown', reply_markup=teclado)
+
+
+@cronometrar
+async def listar_pagina(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Botões Anterior/Próxima do /listar: mostra outra página da mesma listagem"""
+    query = update.callback_query
+    _, listagem_id, indice = query.data.split(':')
+    listagem = context.chat_data.get('listagens', {}).get(int(listagem_id))
     
-    for cartao_nome, lista in por_cartao.items():
-        mensagem += f"💳 *{cartao_nome}*\n"
-        total_cartao = 0
-        
-        for c in lista:
-            parcela_fmt = calc.formatar_parcela(c['Parcela Atual'], c['Total Parcelas'])
-            mensagem += f"  • {c['Descrição']} {parcela_fmt} - {CURRENCY_FORMAT.format(c['Valor'])}\n"
-            total_cartao += c['Valor']
-        
-        mensagem += f"  *Subtotal:* {CURRENCY_FORMAT.format(total_cartao)}\n\n"
+    if listagem is None:
+        await query.answer("⌛ Esta listagem expirou. Use /listar de novo.", show_alert=True)
+        return
     
-    await update.message.reply_text(mensagem, parse_mode='Markdown')
+    await query.answer()
+    texto, teclado = pagina_da_listagem(listagem, int(listagem_id), int(indice))
+    await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=teclado)
 
 
+@cronometrar
 async def resumo(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Mostra resumo financeiro completo"""
-    resultado = sheets.calcular_resumo()
+    """Mostra resumo financeiro completo (/resumo YYYY-MM para outro mês)"""
+    if context.args:
+        await resumo_mes(update, context)
+        return
+    
+    storage = await storage_do_chat(update)
+    if storage is None:
+        return
+    
+    resultado = await storage.calcular_resumo()
     
     if not resultado:
         await update.message.reply_text(
@@ -288,13 +461,137 @@ async def resumo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for cartao, valor in resultado['por_cartao'].items():
         mensagem += f"\n💳 {cartao}: {CURRENCY_FORMAT.format(valor)}"
     
+    if len(resultado['por_categoria']) > 1:
+        mensagem += "\n\n🏷️ *Despesas por Categoria:*"
+        for categoria, valor in resultado['por_categoria'].items():
+            mensagem += f"\n• {categoria}: {CURRENCY_FORMAT.format(valor)}"
+    
     mensagem += f"\n\n📦 Total de {resultado['total_compras']} compras ativas"
     
     await update.message.reply_text(mensagem, parse_mode='Markdown')
 
 
+def _variacao(atual, anterior):
+    """Texto da variação de um valor em relação ao ano anterior"""
+    diferenca = atual - anterior
+    sinal = '+' if diferenca >= 0 else '-'
+    texto = f"{sinal}{CURRENCY_FORMAT.format(abs(diferenca))}"
+    if anterior:
+        texto += f" ({diferenca / anterior * 100:+.0f}%)"
+    return texto
+
+
+async def resumo_mes(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /resumo YYYY-MM - Resumo de um mês com comparação ao ano anterior"""
+    try:
+        mes = mes_para_ordinal(context.args[0])
+    except ValueError:
+        await update.message.reply_text(
+            "❌ Mês inválido! Use o formato AAAA-MM.\n"
+            "_Exemplo: /resumo 2025-03_",
+            parse_mode='Markdown'
+        )
+        return
+    
+    storage = await storage_do_chat(update)
+    if storage is None:
+        return
+    
+    resultado = await storage.resumo_do_mes(mes)
+    
+    if not resultado:
+        await update.message.reply_text(
+            "❌ Erro ao consultar o resumo do mês.",
+            parse_mode='Markdown'
+        )
+        return
+    
+    foto = resultado['mes']
+    anterior = resultado['ano_anterior']
+    origem = "📁 _Registrado na virada do mês_" if foto['registrado'] else "🧮 _Calculado agora (mês sem registro no histórico)_"
+    
+    mensagem = f"""
+📊 *Resumo Financeiro - {nome_do_mes(mes)}*
+
+💰 *Receitas:* {CURRENCY_FORMAT.format(foto['receitas'])}
+💳 *Despesas:* {CURRENCY_FORMAT.format(foto['despesas'])}
+━━━━━━━━━━━━━━━━
+{'✅' if foto['saldo'] >= 0 else '⚠️'} *Saldo:* {CURRENCY_FORMAT.format(foto['saldo'])}
+
+📋 *Despesas por Cartão:*
+    """
+    
+    for cartao, valor in foto['por_cartao'].items():
+        mensagem += f"\n💳 {cartao}: {CURRENCY_FORMAT.format(valor)}"
+    
+    if len(foto['por_categoria']) > 1:
+        mensagem += "\n\n🏷️ *Despesas por Categoria:*"
+        for categoria, valor in foto['por_categoria'].items():
+            mensagem += f"\n• {categoria}: {CURRENCY_FORMAT.format(valor)}"
+    
+    mensagem += f"\n\n📦 {foto['total_compras']} parcelas no mês"
+    
+    # Comparação com o mesmo mês do ano anterior (só se houve movimento)
+    if anterior['total_compras'] or anterior['receitas']:
+        mensagem += f"\n\n📅 *Comparado a {nome_do_mes(mes - 12)}:*"
+        mensagem += f"\n💳 Despesas: {_variacao(foto['despesas'], anterior['despesas'])}"
+        mensagem += f"\n💰 Receitas: {_variacao(foto['receitas'], anterior['receitas'])}"
+    
+    mensagem += f"\n\n{origem}"
+    
+    await update.message.reply_text(mensagem, parse_mode='Markdown')
+
+
+@cronometrar
+async def proximo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /proximo [N] - Gastos por cartão nos próximos N meses"""
+    meses = 1
+    if context.args:
+        try:
+            meses = int(context.args[0])
+            if meses < 1 or meses > MAX_MESES_PROJECAO:
+                raise ValueError
+        except ValueError:
+            await update.message.reply_text(
+                f"❌ Quantidade de meses inválida! Use um número de 1 a {MAX_MESES_PROJECAO}.\n"
+                "_Exemplo: /proximo 3_",
+                parse_mode='Markdown'
+            )
+            return
+    
+    storage = await storage_do_chat(update)
+    if storage is None:
+        return
+    
+    # Compras futuras também entram; as já concluídas não somam nada na janela
+    compras = await storage.listar_compras(status='todos')
+    primeiro_mes = calc.mes_atual() + 1
+    projecao = calc.projetar_por_cartao(compras, meses, primeiro_mes)
+    
+    if not projecao:
+        await update.message.reply_text(
+            "📭 Nenhuma parcela prevista para os próximos meses.",
+            parse_mode='Markdown'
+        )
+        return
+    
+    titulo = "Próximo Mês" if meses == 1 else f"Próximos {meses} Meses"
+    mensagem = f"🔮 *Gastos - {titulo}*\n\n"
+    
+    for i in range(meses):
+        total_mes = round(sum(totais[i] for totais in projecao.values()), 2)
+        mensagem += f"📅 *{nome_do_mes(primeiro_mes + i)}*\n"
+        for cartao, totais in projecao.items():
+            if totais[i]:
+                mensagem += f"  💳 {cartao}: {CURRENCY_FORMAT.format(totais[i])}\n"
+        mensagem += f"  *Total:* {CURRENCY_FORMAT.format(total_mes)}\n\n"
+    
+    await update.message.reply_text(mensagem, parse_mode='Markdown')
+
+
 # ============ RECEITAS ============
 
+@cronometrar
 async def receita_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Inicia adicionar receita"""
     await update.message.reply_text(
@@ -306,6 +603,7 @@ async def receita_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return RECEITA_DESCRICAO
 
 
+@cronometrar
 async def receita_descricao(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recebe descrição da receita"""
     context.user_data['receita_descricao'] = update.message.text
@@ -318,13 +616,19 @@ async def receita_descricao(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return RECEITA_VALOR
 
 
+@cronometrar
 async def receita_valor(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recebe valor e finaliza"""
     try:
         valor = float(update.message.text.replace(',', '.'))
         descricao = context.user_data['receita_descricao']
         
-        resultado = sheets.adicionar_receita(descricao, valor)
+        storage = await storage_do_chat(update)
+        if storage is None:
+            context.user_data.clear()
+            return ConversationHandler.END
+        
+        resultado = await storage.adicionar_receita(descricao, valor)
         
         if resultado:
             await update.message.reply_text(
@@ -352,6 +656,7 @@ async def receita_valor(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ============ IMPORTAR DADOS ============
 
+@cronometrar
 async def importar_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Inicia importação de dados"""
     mensagem = """
@@ -374,6 +679,7 @@ Digite /cancelar para sair.
     return IMPORTAR_DADOS
 
 
+@cronometrar
 async def importar_dados(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Processa dados importados"""
     try:
@@ -408,7 +714,11 @@ async def importar_dados(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return IMPORTAR_DADOS
         
         # Importar
-        resultado = sheets.importar_dados(dados_lista)
+        storage = await storage_do_chat(update)
+        if storage is None:
+            return ConversationHandler.END
+        
+        resultado = await storage.importar_dados(dados_lista)
         
         if resultado:
             mensagem = f"""
@@ -440,11 +750,21 @@ Use `/listar` para ver os dados importados!
 
 # ============ ATUALIZAÇÃO MENSAL ============
 
+@cronometrar
 async def atualizar_mes_comando(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando manual para atualizar mês"""
+    storage = await storage_do_chat(update)
+    if storage is None:
+        return
+    
     await update.message.reply_text("🔄 Atualizando parcelas...", parse_mode='Markdown')
     
-    resultado = sheets.atualizar_mes()
+    planilha = armazenamentos.pool.planilha_de(chave_do_chat(update))
+    try:
+        resultado = await armazenamentos.executar(virar_mes, storage.gerenciador, planilha, estado_virada)
+    except Exception as e:
+        logger.error(f"❌ Erro ao atualizar mês de {planilha}: {e}")
+        resultado = None
     
     if resultado:
         mensagem = f"""
@@ -464,22 +784,52 @@ As parcelas foram atualizadas automaticamente! 🎉
         )
 
 
-def atualizar_mes_automatico():
-    """Função para atualização automática agendada"""
-    logger.info("Executando atualização automática mensal...")
-    resultado = sheets.atualizar_mes()
-    if resultado:
-        logger.info(f"✅ Atualização concluída: {resultado}")
-    else:
-        logger.error("❌ Erro na atualização automática")
+def virar_planilha(planilha):
+    """Vira o mês de uma planilha se a virada dele ainda não foi feita (bloqueante)"""
+    gerenciador = armazenamentos.pool.obter_planilha(planilha)
+    return virar_se_pendente(gerenciador, planilha, estado_virada, AUTO_UPDATE_DAY)
+
+
+async def atualizar_mes_automatico(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Job diário da virada (e na partida, para recuperar viradas perdidas)
+    
+    Cada planilha roda separadamente no pool de threads, então os comandos
+    continuam sendo atendidos entre uma planilha e outra.
+    """
+    for planilha in armazenamentos.pool.planilhas():
+        try:
+            resultado = await armazenamentos.executar(virar_planilha, planilha)
+        except Exception as e:
+            # A virada continua pendente e é repetida na próxima verificação
+            logger.error(f"❌ Erro na atualização automática de {planilha}: {e}")
+            continue
+        if resultado is not None:
+            logger.info(f"✅ Atualização concluída em {planilha}: {resultado}")
+
+
+def agendar_virada(app):
+    """Agenda a verificação diária da virada no JobQueue e uma logo após a partida"""
+    hora, minuto = (int(parte) for parte in AUTO_UPDATE_TIME.split(':'))
+    app.job_queue.run_daily(
+        atualizar_mes_automatico,
+        time=horario(hora, minuto, tzinfo=ZoneInfo(TIMEZONE)),
+        name='virada_mensal'
+    )
+    app.job_queue.run_once(atualizar_mes_automatico, when=timedelta(seconds=10), name='virada_recuperacao')
 
 
 # ============ OUTROS COMANDOS ============
 
+@cronometrar
 async def cartoes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Lista todos os cartões"""
-    compras = sheets.listar_compras(status='ativo')
-    cartoes_unicos = set(c['Cartão'] for c in compras)
+    storage = await storage_do_chat(update)
+    if storage is None:
+        return
+    
+    compras = await storage.listar_compras(status='ativo')
+    cartoes_unicos = set(c.cartao for c in compras)
     
     mensagem = "💳 *Cartões Cadastrados:*\n\n"
     for cartao in sorted(cartoes_unicos):
@@ -489,6 +839,20 @@ async def cartoes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(mensagem, parse_mode='Markdown')
 
 
+@cronometrar
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Latência dos comandos, chamadas ao Sheets e cache (só administradores)"""
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text(
+            "⛔ Comando restrito aos administradores.",
+            parse_mode='Markdown'
+        )
+        return
+    
+    await update.message.reply_text(metricas.texto_stats(), parse_mode='Markdown')
+
+
+@cronometrar
 async def cancelar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Cancela operação atual"""
     context.user_data.clear()
@@ -499,28 +863,50 @@ async def cancelar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 
+async def gravar_metricas(context: ContextTypes.DEFAULT_TYPE):
+    """Job periódico: grava as métricas no METRICS_FILE"""
+    try:
+        metricas.gravar_arquivo(METRICS_FILE)
+    except OSError as e:
+        logger.error(f"❌ Erro ao gravar métricas em {METRICS_FILE}: {e}")
+
+
 # ============ MAIN ============
 
-def main():
-    """Função principal"""
-    # Verificar configuração
-    if not TELEGRAM_BOT_TOKEN:
-        logger.error("❌ TELEGRAM_BOT_TOKEN não configurado!")
-        return
-    
-    # Garantir abas na planilha
-    sheets.garantir_abas()
+async def conectar_armazenamento(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Job da partida: abre a planilha padrão (conexão e abas) sem atrasar o bot
     
-    # Criar aplicação
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    Um comando que chegue antes disso espera a mesma abertura no pool em vez
+    de conectar de novo.
+    """
+    inicio = time.perf_counter()
+    try:
+        await armazenamentos.executar(armazenamentos.pool.inicializar)
+    except Exception as e:
+        # Não impede a partida: o primeiro comando tenta abrir de novo
+        logger.error(f"❌ Erro ao abrir o armazenamento padrão: {e}")
+        return
+    logger.info(f"✅ Armazenamento padrão pronto em {time.perf_counter() - inicio:.1f}s")
+
+
+def criar_aplicacao():
+    """Cria a aplicação com todos os handlers (comum aos modos polling e webhook)"""
+    construtor = Application.builder().token(TELEGRAM_BOT_TOKEN)
+    if TELEGRAM_BASE_URL:
+        construtor = construtor.base_url(TELEGRAM_BASE_URL)
+    app = construtor.build()
     
     # Handlers de comandos simples
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_command))
     app.add_handler(CommandHandler("listar", listar))
+    app.add_handler(CallbackQueryHandler(listar_pagina, pattern=r'^listar:\d+:\d+$'))
     app.add_handler(CommandHandler("resumo", resumo))
+    app.add_handler(CommandHandler("proximo", proximo))
     app.add_handler(CommandHandler("cartoes", cartoes))
     app.add_handler(CommandHandler("atualizarmes", atualizar_mes_comando))
+    app.add_handler(CommandHandler("stats", stats))
     
     # Conversação: Adicionar compra
     conv_adicionar = ConversationHandler(
@@ -557,14 +943,57 @@ def main():
     )
     app.add_handler(conv_importar)
     
-    # Agendar atualização automática (todo dia 1 às 00:01)
-    schedule.every().day.at("00:01").do(atualizar_mes_automatico)
+    return app
+
+
+def main():
+    """Função principal"""
+    # Verificar configuração
+    if not TELEGRAM_BOT_TOKEN:
+        logger.error("❌ TELEGRAM_BOT_TOKEN não configurado!")
+        return
+    if BOT_MODE == 'webhook' and not WEBHOOK_URL:
+        logger.error("❌ BOT_MODE=webhook exige WEBHOOK_URL!")
+        return
+    
+    app = criar_aplicacao()
+    
+    # Conectar ao armazenamento em paralelo com a partida do Telegram
+    app.job_queue.run_once(conectar_armazenamento, when=0, name='conectar_armazenamento')
+    
+    # Virada automática no AUTO_UPDATE_DAY (verificada todo dia; recupera meses perdidos)
+    agendar_virada(app)
+    
+    # Exportação das métricas no formato do Prometheus
+    servidor_metricas = servir_metricas(METRICS_PORT) if METRICS_PORT else None
+    if METRICS_FILE:
+        app.job_queue.run_repeating(gravar_metricas, interval=METRICS_INTERVAL, first=METRICS_INTERVAL)
     
     logger.info("🤖 Bot iniciado com sucesso!")
     
     # Iniciar bot
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    if BOT_MODE == 'webhook':
+        app.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET_TOKEN,
+            allowed_updates=TIPOS_DE_UPDATE
+        )
+    else:
+        app.run_polling(allowed_updates=TIPOS_DE_UPDATE)
+    
+    # Enviar o outbox e a reconstrução visual pendentes de todas as planilhas abertas
+    armazenamentos.fechar()
+    if servidor_metricas is not None:
+        servidor_metricas.shutdown()
+    if METRICS_FILE:
+        metricas.gravar_arquivo(METRICS_FILE)
 
 
 if __name__ == '__main__':
+    if '--profile-startup' in sys.argv:
+        from perfil_partida import main as perfilar
+        sys.exit(0 if perfilar() else 1)
     main()
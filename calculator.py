@@ -1,42 +1,92 @@
 """
 Módulo de cálculo automático de parcelas
 Calcula automaticamente qual parcela está no mês atual baseado na data de início
+
+Internamente os meses são ordinais inteiros (ano * 12 + mês - 1), então toda a
+conta de parcelas é aritmética de inteiros; 'YYYY-MM' só é lido/escrito nas bordas.
 """
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 import pytz
 from config import TIMEZONE
 
 
+def mes_para_ordinal(mes):
+    """
+    Converte um mês em ordinal inteiro
+    
+    Args:
+        mes (str | int): Mês no formato 'YYYY-MM' (ou um ordinal já convertido)
+        
+    Returns:
+        int: ano * 12 + (mês - 1)
+        
+    Raises:
+        ValueError: Se o mês não estiver no formato 'YYYY-MM' ou o ano estiver
+            fora de 1..9999 (o intervalo do datetime, usado para exibir o mês)
+    """
+    if isinstance(mes, int) and not isinstance(mes, bool):
+        return mes
+    ano, numero = str(mes).split('-')
+    ano, numero = int(ano), int(numero)
+    if not 1 <= numero <= 12 or not 1 <= ano <= 9999:
+        raise ValueError(f"mês inválido: {mes}")
+    return ano * 12 + numero - 1
+
+
+def ordinal_para_mes(ordinal):
+    """Converte um ordinal de mês de volta para 'YYYY-MM'"""
+    ano, indice = divmod(ordinal, 12)
+    return f"{ano:04d}-{indice + 1:02d}"
+
+
+def nome_do_mes(ordinal):
+    """Nome do mês de um ordinal no formato 'Month/YYYY'"""
+    ano, indice = divmod(ordinal, 12)
+    return datetime(ano, indice + 1, 1).strftime('%B/%Y')
+
+
 class ParcelCalculator:
     """Classe para calcular parcelas automaticamente"""
     
-    def __init__(self, timezone=TIMEZONE):
+    def __init__(self, timezone=TIMEZONE, relogio=None):
+        """
+        Args:
+            timezone (str): Fuso horário usado para saber o mês atual
+            relogio (callable): Função que retorna o "agora" (datetime); útil em testes
+        """
         self.tz = pytz.timezone(timezone)
+        self.relogio = relogio or (lambda: datetime.now(self.tz))
     
-    def calcular_parcela_atual(self, mes_inicio, parcela_inicial, total_parcelas):
+    def mes_atual(self):
+        """
+        Ordinal do mês atual
+        
+        Deve ser resolvido uma vez por requisição/lote e repassado como `hoje`
+        para os demais métodos.
+        """
+        agora = self.relogio()
+        return agora.year * 12 + agora.month - 1
+    
+    def calcular_parcela_atual(self, mes_inicio, parcela_inicial, total_parcelas, hoje=None):
         """
         Calcula qual parcela está no mês atual
         
         Args:
-            mes_inicio (str): Data de início no formato 'YYYY-MM'
+            mes_inicio (str | int): Início no formato 'YYYY-MM' (ou ordinal do mês)
             parcela_inicial (int): Número da parcela inicial (quando começou)
             total_parcelas (int): Total de parcelas
+            hoje (int): Ordinal do mês atual (None = consulta o relógio)
             
         Returns:
             tuple: (parcela_atual, status)
                    status pode ser: 'ativo', 'concluido', 'futuro'
         """
         try:
-            # Data atual
-            hoje = datetime.now(self.tz)
-            mes_atual = hoje.strftime('%Y-%m')
-            
-            # Converter mes_inicio para datetime
-            data_inicio = datetime.strptime(mes_inicio, '%Y-%m')
+            if hoje is None:
+                hoje = self.mes_atual()
             
             # Calcular diferença em meses
-            meses_decorridos = (hoje.year - data_inicio.year) * 12 + (hoje.month - data_inicio.month)
+            meses_decorridos = hoje - mes_para_ordinal(mes_inicio)
             
             # Calcular parcela atual
             parcela_atual = parcela_inicial + meses_decorridos
@@ -53,7 +103,68 @@ class ParcelCalculator:
             print(f"Erro ao calcular parcela: {e}")
             return parcela_inicial, 'erro'
     
-    def calcular_mes_inicio(self, parcela_atual, total_parcelas):
+    def calcular_parcelas_lote(self, compras, hoje=None):
+        """
+        Versão vetorizada de calcular_parcela_atual para muitas compras de uma vez
+        
+        Args:
+            compras (pandas.DataFrame | dict): Colunas 'mes_inicio' ('YYYY-MM' ou
+                ordinal inteiro, None = inválido), 'parcela_inicial' e 'total_parcelas' (uma linha por compra)
+            hoje (int): Ordinal do mês atual (None = consulta o relógio)
+            
+        Returns:
+            tuple: (parcelas_atuais, status) como arrays numpy, na ordem das linhas
+                   status pode ser: 'ativo', 'concluido', 'futuro', 'erro'
+        """
+        # pandas/numpy só são carregados quando o lote é usado
+        import numpy as np
+        import pandas as pd
+        
+        df = compras if isinstance(compras, pd.DataFrame) else pd.DataFrame(compras)
+        
+        # Mês atual resolvido uma vez para o lote inteiro
+        if hoje is None:
+            hoje = self.mes_atual()
+        
+        # Converter 'YYYY-MM' em ordinal (colunas numéricas já são ordinais; NaN = inválido)
+        if pd.api.types.is_numeric_dtype(df['mes_inicio']) and not pd.api.types.is_bool_dtype(df['mes_inicio']):
+            inicio = df['mes_inicio'].to_numpy(dtype=float)
+        else:
+            # Cada mês distinto é convertido uma vez pelo mes_para_ordinal, a
+            # mesma validação (formato e ano 1..9999) do cálculo individual
+            ordinais = {}
+            for valor in pd.unique(df['mes_inicio']):
+                try:
+                    ordinais[valor] = mes_para_ordinal(valor)
+                except ValueError:
+                    ordinais[valor] = np.nan
+            inicio = df['mes_inicio'].map(ordinais).to_numpy(dtype=float)
+        parcela_inicial = pd.to_numeric(df['parcela_inicial'], errors='coerce').to_numpy(dtype=float)
+        total_parcelas = pd.to_numeric(df['total_parcelas'], errors='coerce').to_numpy(dtype=float)
+        
+        invalido = np.isnan(inicio) | np.isnan(parcela_inicial) | np.isnan(total_parcelas)
+        
+        # Calcular parcela atual
+        parcela_atual = parcela_inicial + (hoje - inicio)
+        
+        # Determinar status
+        concluido = ~invalido & (parcela_atual > total_parcelas)
+        futuro = ~invalido & ~concluido & (parcela_atual < parcela_inicial)
+        status = np.select(
+            [invalido, concluido, futuro],
+            ['erro', 'concluido', 'futuro'],
+            default='ativo'
+        )
+        parcelas = np.where(concluido, total_parcelas, np.where(futuro, parcela_inicial, parcela_atual))
+        parcelas = np.nan_to_num(parcelas).astype(np.int64).astype(object)
+        
+        # Em caso de erro devolve a parcela inicial como veio, igual ao cálculo individual
+        if invalido.any():
+            parcelas[invalido] = df['parcela_inicial'].to_numpy(dtype=object)[invalido]
+        
+        return parcelas, status
+    
+    def calcular_mes_inicio(self, parcela_atual, total_parcelas, hoje=None):
         """
         Calcula o mês de início baseado na parcela atual
         Útil para importação de dados existentes
@@ -61,52 +172,53 @@ class ParcelCalculator:
         Args:
             parcela_atual (int): Parcela atual (ex: 12)
             total_parcelas (int): Total de parcelas (ex: 14)
+            hoje (int): Ordinal do mês atual (None = consulta o relógio)
             
         Returns:
             str: Mês de início no formato 'YYYY-MM'
         """
+        if hoje is None:
+            hoje = self.mes_atual()
+        
         try:
-            hoje = datetime.now(self.tz)
-            
             # Calcular quantos meses atrás começou
-            meses_atras = parcela_atual - 1
-            
-            # Calcular data de início
-            data_inicio = hoje - relativedelta(months=meses_atras)
+            meses_atras = int(parcela_atual) - 1
             
-            return data_inicio.strftime('%Y-%m')
+            return ordinal_para_mes(hoje - meses_atras)
             
         except Exception as e:
             print(f"Erro ao calcular mês de início: {e}")
-            return datetime.now(self.tz).strftime('%Y-%m')
+            return ordinal_para_mes(hoje)
     
-    def proximas_parcelas(self, mes_inicio, parcela_atual, total_parcelas, meses=3):
+    def proximas_parcelas(self, mes_inicio, parcela_atual, total_parcelas, meses=3, hoje=None):
         """
         Retorna lista das próximas parcelas
         
         Args:
-            mes_inicio (str): Data de início no formato 'YYYY-MM'
+            mes_inicio (str | int): Início no formato 'YYYY-MM' (ou ordinal do mês)
             parcela_atual (int): Parcela atual
             total_parcelas (int): Total de parcelas
             meses (int): Quantidade de meses para projetar
+            hoje (int): Ordinal do mês atual (None = consulta o relógio)
             
         Returns:
             list: Lista de dicts com {mes, parcela, status}
         """
         try:
             resultado = []
-            data_inicio = datetime.strptime(mes_inicio, '%Y-%m')
-            hoje = datetime.now(self.tz)
+            mes_para_ordinal(mes_inicio)  # Valida o formato
+            if hoje is None:
+                hoje = self.mes_atual()
             
             for i in range(meses):
-                data_projecao = hoje + relativedelta(months=i)
-                meses_decorridos = (data_projecao.year - data_inicio.year) * 12 + (data_projecao.month - data_inicio.month)
-                parcela = parcela_atual + meses_decorridos - ((hoje.year - data_inicio.year) * 12 + (hoje.month - data_inicio.month))
+                # A cada mês projetado a parcela avança uma unidade
+                mes_projecao = hoje + i
+                parcela = parcela_atual + i
                 
                 if parcela <= total_parcelas:
                     resultado.append({
-                        'mes': data_projecao.strftime('%Y-%m'),
-                        'mes_nome': data_projecao.strftime('%B/%Y'),
+                        'mes': ordinal_para_mes(mes_projecao),
+                        'mes_nome': nome_do_mes(mes_projecao),
                         'parcela': parcela,
                         'status': 'ativo' if parcela <= total_parcelas else 'concluido'
                     })
@@ -117,6 +229,61 @@ class ParcelCalculator:
             print(f"Erro ao calcular próximas parcelas: {e}")
             return []
     
+    def projetar_por_cartao(self, compras, meses=1, primeiro_mes=None):
+        """
+        Total a pagar por cartão em cada um dos próximos meses
+        
+        Cada compra soma o valor da parcela num intervalo contínuo de meses
+        [início, início + total - parcela inicial], então basta marcar o início
+        e o fim do intervalo (recortado à janela) num array de diferenças por
+        cartão e fazer a soma acumulada: O(compras + cartões × meses), em vez de
+        projetar compra a compra. A soma é feita em centavos inteiros: com float,
+        um mês em que todas as parcelas já terminaram ficaria com um resíduo
+        como 1e-12 em vez de zero.
+        
+        Args:
+            compras (list): Compras (usa mes_inicio_ord, parcela_inicial,
+                total_parcelas, valor_parcela e cartao)
+            meses (int): Tamanho da janela em meses
+            primeiro_mes (int): Ordinal do primeiro mês da janela (None = mês atual)
+            
+        Returns:
+            dict: {cartao: [total_mes_1, ..., total_mes_N]} (0.0 exato nos meses sem parcelas)
+        """
+        if primeiro_mes is None:
+            primeiro_mes = self.mes_atual()
+        ultimo_mes = primeiro_mes + meses - 1
+        
+        diferencas = {}
+        for compra in compras:
+            inicio = compra.mes_inicio_ord
+            if inicio is None:
+                continue  # Mês de início inválido
+            fim = inicio + compra.total_parcelas - compra.parcela_inicial
+            
+            # Recortar o intervalo de pagamento à janela
+            de = max(inicio, primeiro_mes) - primeiro_mes
+            ate = min(fim, ultimo_mes) - primeiro_mes
+            if de > ate:
+                continue
+            
+            centavos = round(compra.valor_parcela * 100)
+            if compra.cartao not in diferencas:
+                diferencas[compra.cartao] = [0] * (meses + 1)
+            diferencas[compra.cartao][de] += centavos
+            diferencas[compra.cartao][ate + 1] -= centavos
+        
+        projecao = {}
+        for cartao, diferenca in diferencas.items():
+            acumulado = 0
+            totais = []
+            for delta in diferenca[:meses]:
+                acumulado += delta
+                totais.append(acumulado / 100)
+            projecao[cartao] = totais
+        
+        return projecao
+    
     def formatar_parcela(self, parcela_atual, total_parcelas):
         """
         Formata parcela no padrão visual: 12/14
@@ -130,24 +297,28 @@ class ParcelCalculator:
         """
         return f"{parcela_atual}/{total_parcelas}"
     
-    def atualizar_mes(self, compras_list):
+    def atualizar_mes(self, compras_list, hoje=None):
         """
         Atualiza todas as parcelas para o novo mês
         
         Args:
             compras_list (list): Lista de dicts com dados das compras
+            hoje (int): Ordinal do mês atual (None = consulta o relógio uma vez)
             
         Returns:
             list: Lista atualizada com novos valores de parcelas
         """
         atualizadas = []
         finalizadas = []
+        if hoje is None:
+            hoje = self.mes_atual()
         
         for compra in compras_list:
             parcela_atual, status = self.calcular_parcela_atual(
                 compra['mes_inicio'],
                 compra['parcela_inicial'],
-                compra['total_parcelas']
+                compra['total_parcelas'],
+                hoje=hoje
             )
             
             compra['parcela_atual'] = parcela_atual
@@ -167,19 +338,27 @@ class ParcelCalculator:
 
 
 # Funções auxiliares para uso direto
-def calcular_parcela_atual(mes_inicio, parcela_inicial, total_parcelas):
+_calculadora_padrao = None
+
+
+def _calculadora():
+    """Calculadora compartilhada pelas funções auxiliares (criada uma vez)"""
+    global _calculadora_padrao
+    if _calculadora_padrao is None:
+        _calculadora_padrao = ParcelCalculator()
+    return _calculadora_padrao
+
+
+def calcular_parcela_atual(mes_inicio, parcela_inicial, total_parcelas, hoje=None):
     """Função auxiliar para calcular parcela atual"""
-    calc = ParcelCalculator()
-    return calc.calcular_parcela_atual(mes_inicio, parcela_inicial, total_parcelas)
+    return _calculadora().calcular_parcela_atual(mes_inicio, parcela_inicial, total_parcelas, hoje=hoje)
 
 
-def calcular_mes_inicio(parcela_atual, total_parcelas):
+def calcular_mes_inicio(parcela_atual, total_parcelas, hoje=None):
     """Função auxiliar para calcular mês de início"""
-    calc = ParcelCalculator()
-    return calc.calcular_mes_inicio(parcela_atual, total_parcelas)
+    return _calculadora().calcular_mes_inicio(parcela_atual, total_parcelas, hoje=hoje)
 
 
 def formatar_parcela(parcela_atual, total_parcelas):
     """Função auxiliar para formatar parcela"""
-    calc = ParcelCalculator()
-    return calc.formatar_parcela(parcela_atual, total_parcelas)
+    return f"{parcela_atual}/{total_parcelas}"
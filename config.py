@@ -10,15 +10,79 @@ load_dotenv()
 
 # Configurações do Telegram
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+# Servidor da Bot API (ex: http://localhost:8081/bot para um servidor local/de testes)
+TELEGRAM_BASE_URL = os.getenv('TELEGRAM_BASE_URL')
+
+# Recebimento das mensagens: 'polling' (padrão) ou 'webhook' (servidor embutido do python-telegram-bot)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # URL pública (https) que o Telegram chama, sem o caminho
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', os.getenv('PORT', 8443)))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram').strip('/')
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN')  # Conferido no cabeçalho de cada chamada
 
 # Configurações do Google Sheets
 GOOGLE_SHEETS_CREDENTIALS = os.getenv('GOOGLE_SHEETS_CREDENTIALS', 'credentials.json')
 GOOGLE_CREDENTIALS_JSON = os.getenv('GOOGLE_CREDENTIALS')  # JSON string da variável de ambiente
 SPREADSHEET_ID = os.getenv('SPREADSHEET_ID')
 
+# Várias planilhas: planilha de cada chat (ou usuário) em JSON {"id_do_chat": "id_da_planilha"},
+# direto na variável ou num arquivo .json. Chats fora do mapa usam SPREADSHEET_ID
+_chat_spreadsheets = os.getenv('CHAT_SPREADSHEETS', '').strip()
+if _chat_spreadsheets.endswith('.json'):
+    with open(_chat_spreadsheets, encoding='utf-8') as _arquivo:
+        _chat_spreadsheets = _arquivo.read()
+CHAT_SPREADSHEETS = {str(chave): valor for chave, valor in json.loads(_chat_spreadsheets or '{}').items()}
+# Chave do mapa: 'chat' (grupo da família/equipe) ou 'user' (cada pessoa)
+TENANT_KEY = os.getenv('TENANT_KEY', 'chat').lower()
+# Máximo de planilhas abertas ao mesmo tempo (as menos usadas são fechadas)
+TENANT_POOL_SIZE = int(os.getenv('TENANT_POOL_SIZE', 8))
+
+# Armazenamento: 'sheets' (planilha é a base principal) ou 'sqlite' (base local)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sheets').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'gastos.db')
+# Com STORAGE_BACKEND=sqlite, replica as escritas na planilha. Um banco novo é semeado
+# com as linhas da planilha; se ela tiver IDs que o banco não tem, o espelho é recusado
+SHEETS_MIRROR = os.getenv('SHEETS_MIRROR', 'false').lower() in ('1', 'true', 'sim', 'yes')
+
+# Diário local (outbox) das escritas na planilha: confirma na hora e replica em segundo plano
+OUTBOX_ENABLED = os.getenv('OUTBOX_ENABLED', 'true').lower() in ('1', 'true', 'sim', 'yes')
+OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'outbox.db')
+OUTBOX_INTERVAL = float(os.getenv('OUTBOX_INTERVAL', 2))
+OUTBOX_BATCH = int(os.getenv('OUTBOX_BATCH', 200))
+
+# Histórico mensal: resumo de cada mês gravado na virada (consultas do /resumo YYYY-MM)
+HISTORICO_PATH = os.getenv('HISTORICO_PATH', 'historico.db')
+
+# Métricas: /stats só para estes usuários (IDs separados por vírgula) e exportação Prometheus
+ADMIN_IDS = {int(i) for i in os.getenv('ADMIN_IDS', '').replace(' ', '').split(',') if i}
+METRICS_FILE = os.getenv('METRICS_FILE', '')  # Arquivo texto (coletor textfile), vazio = desligado
+METRICS_INTERVAL = int(os.getenv('METRICS_INTERVAL', 60))  # Segundos entre gravações do arquivo
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))  # Porta do GET /metrics, 0 = desligado
+
+# /listar: compras por página (as páginas também respeitam o limite de caracteres do Telegram)
+LISTAR_POR_PAGINA = int(os.getenv('LISTAR_POR_PAGINA', 20))
+
 # Configurações gerais
 TIMEZONE = os.getenv('TIMEZONE', 'America/Sao_Paulo')
 AUTO_UPDATE_DAY = int(os.getenv('AUTO_UPDATE_DAY', 1))
+AUTO_UPDATE_TIME = os.getenv('AUTO_UPDATE_TIME', '00:01')  # HH:MM no TIMEZONE
+VIRADA_PATH = os.getenv('VIRADA_PATH', 'virada.json')  # Último mês virado de cada planilha
+
+# Cache local das abas Database/Receitas (segundos até reler a planilha)
+CACHE_TTL = int(os.getenv('CACHE_TTL', 300))
+
+# Threads usadas para executar as chamadas bloqueantes ao Google Sheets
+SHEETS_MAX_WORKERS = int(os.getenv('SHEETS_MAX_WORKERS', 4))
+
+# Cota da API do Sheets: requisições/minuto (um pouco abaixo do limite de 60) e tentativas em 429/5xx
+SHEETS_REQUESTS_PER_MINUTE = int(os.getenv('SHEETS_REQUESTS_PER_MINUTE', 55))
+SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', 5))
+
+# Reconstrução da aba visual: espera este silêncio (s) após a última escrita,
+# mas nunca adia mais que o máximo (s) desde a primeira escrita pendente
+VISUAL_DEBOUNCE_SECONDS = float(os.getenv('VISUAL_DEBOUNCE_SECONDS', 5))
+VISUAL_MAX_DELAY_SECONDS = float(os.getenv('VISUAL_MAX_DELAY_SECONDS', 30))
 
 # Nomes das abas da planilha
 SHEET_VISUAL = 'Gastos'  # Aba visual que o usuário vê
@@ -28,18 +92,21 @@ SHEET_RECEITAS = 'Receitas'  # Aba de receitas
 # Formato de moeda
 CURRENCY_FORMAT = 'R$ {:.2f}'
 
+# Máximo de meses projetados pelo /proximo
+MAX_MESES_PROJECAO = 36
+
 # Comandos do bot
 COMMANDS = {
     'start': 'Inicia o bot e mostra as opções',
     'adicionar': 'Adiciona uma nova compra parcelada',
     'importar': 'Importa dados existentes',
     'listar': 'Lista gastos do mês atual',
-    'resumo': 'Mostra resumo financeiro do mês',
+    'resumo': 'Mostra resumo financeiro do mês (/resumo AAAA-MM para outro mês)',
     'receita': 'Adiciona uma receita',
     'atualizarmes': 'Atualiza parcelas para o próximo mês',
     'editar': 'Edita uma compra existente',
     'remover': 'Remove uma compra',
     'cartoes': 'Lista todos os cartões',
-    'proximo': 'Mostra gastos do próximo mês',
+    'proximo': 'Mostra gastos do próximo mês (/proximo N para N meses)',
     'help': 'Mostra todos os comandos disponíveis'
 }
@@ -0,0 +1,78 @@
+"""
+Histórico mensal dos resumos
+Cada virada de mês grava uma fotografia imutável do mês que terminou, então
+consultar um mês passado é uma leitura só, sem recalcular a partir das compras
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meses (
+    mes TEXT PRIMARY KEY,
+    dados TEXT NOT NULL,
+    criado_em TEXT NOT NULL
+);
+"""
+
+
+class HistoricoMensal:
+    """
+    Fotografias mensais num SQLite local (uma linha por mês 'YYYY-MM')
+
+    Uma fotografia gravada nunca é sobrescrita: rodar a virada de novo no
+    mesmo mês não altera o que já foi registrado.
+    """
+
+    def __init__(self, caminho):
+        """
+        Args:
+            caminho (str): Arquivo SQLite do histórico
+        """
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def gravar(self, mes, dados):
+        """
+        Grava a fotografia de um mês, se ainda não existir
+
+        Args:
+            mes (str): Mês no formato 'YYYY-MM'
+            dados (dict): Fotografia (serializável em JSON)
+
+        Returns:
+            bool: True se gravou, False se o mês já tinha fotografia
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO meses (mes, dados, criado_em) VALUES (?, ?, ?)',
+                (mes, json.dumps(dados, ensure_ascii=False, separators=(',', ':')),
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            return cursor.rowcount == 1
+
+    def obter(self, mes):
+        """
+        Fotografia de um mês
+
+        Args:
+            mes (str): Mês no formato 'YYYY-MM'
+
+        Returns:
+            dict: Fotografia, ou None se o mês não foi registrado
+        """
+        with self._lock:
+            linha = self.conn.execute('SELECT dados FROM meses WHERE mes = ?', (mes,)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def meses(self):
+        """Meses registrados, do mais antigo para o mais recente"""
+        with self._lock:
+            return [mes for (mes,) in self.conn.execute('SELECT mes FROM meses ORDER BY mes')]
+
+    def fechar(self):
+        with self._lock:
+            self.conn.close()
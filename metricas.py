@@ -0,0 +1,239 @@
+"""
+Métricas de desempenho do bot
+Latência de cada comando, chamadas ao Google Sheets (leituras, escritas e
+erros) e acertos de cache, expostas no /stats e no formato texto do Prometheus
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites dos buckets dos histogramas (segundos)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Métodos do gspread que só leem a planilha (os demais contam como escrita)
+LEITURAS = {
+    'open_by_key', 'worksheet', 'worksheets', 'fetch_sheet_metadata',
+    'get_all_records', 'get_all_values', 'col_values', 'row_values', 'get', 'batch_get'
+}
+
+
+class Histograma:
+    """Histograma cumulativo de buckets fixos (como o do Prometheus)"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)  # último = acima do maior limite
+        self.total = 0
+        self.soma = 0.0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(self.buckets, valor)] += 1
+        self.total += 1
+        self.soma += valor
+
+    def quantil(self, q):
+        """
+        Estimativa do quantil por interpolação dentro do bucket
+
+        Returns:
+            float: Segundos (None sem observações; o maior limite se cair acima dele)
+        """
+        if not self.total:
+            return None
+        alvo = q * self.total
+        acumulado = 0
+        for i, contagem in enumerate(self.contagens):
+            if acumulado + contagem >= alvo and contagem:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                inferior = self.buckets[i - 1] if i else 0.0
+                return inferior + (self.buckets[i] - inferior) * (alvo - acumulado) / contagem
+            acumulado += contagem
+        return self.buckets[-1]
+
+
+class Metricas:
+    """Registro das métricas do processo (seguro entre threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+        # {handler: Histograma} e {handler: erros}
+        self.handlers = {}
+        self.erros_handler = {}
+        # {(metodo, tipo): Histograma} e {(metodo, tipo, status): erros}
+        self.sheets = {}
+        self.erros_sheets = {}
+        self.espera_cota = Histograma()
+        # {cache: [acertos, faltas]}
+        self.caches = {}
+
+    def observar_handler(self, nome, segundos, erro=False):
+        with self._lock:
+            self.handlers.setdefault(nome, Histograma()).observar(segundos)
+            if erro:
+                self.erros_handler[nome] = self.erros_handler.get(nome, 0) + 1
+
+    def observar_sheets(self, metodo, segundos, status=None):
+        """
+        Registra uma tentativa de chamada à API
+
+        Args:
+            metodo (str): Método do gspread (ex: 'append_rows')
+            segundos (float): Duração da tentativa
+            status: Status HTTP do erro (None se a chamada deu certo)
+        """
+        tipo = 'leitura' if metodo in LEITURAS else 'escrita'
+        with self._lock:
+            self.sheets.setdefault((metodo, tipo), Histograma()).observar(segundos)
+            if status is not None:
+                chave = (metodo, tipo, str(status))
+                self.erros_sheets[chave] = self.erros_sheets.get(chave, 0) + 1
+
+    def observar_espera_cota(self, segundos):
+        with self._lock:
+            self.espera_cota.observar(segundos)
+
+    def cache(self, nome, acerto):
+        """Conta um acerto (True) ou uma falta (False) no cache `nome`"""
+        with self._lock:
+            contagem = self.caches.setdefault(nome, [0, 0])
+            contagem[0 if acerto else 1] += 1
+
+    def texto_stats(self):
+        """Resumo legível para o /stats (Markdown do Telegram)"""
+        def ms(valor):
+            return '-' if valor is None else f"{valor * 1000:.0f}"
+
+        with self._lock:
+            minutos = (time.time() - self.inicio) / 60
+            linhas = [f"📈 *Estatísticas* (há {minutos:.0f} min no ar)", "", "*Comandos* (p50/p95/p99 ms):"]
+            for nome, hist in sorted(self.handlers.items()):
+                erros = self.erros_handler.get(nome, 0)
+                linhas.append(
+                    f"• {nome}: {hist.total}x, {ms(hist.quantil(0.5))}/{ms(hist.quantil(0.95))}/"
+                    f"{ms(hist.quantil(0.99))}" + (f", {erros} erro(s)" if erros else "")
+                )
+
+            linhas += ["", "*Google Sheets* (p50/p99 ms):"]
+            por_tipo = {}
+            for (metodo, tipo), hist in sorted(self.sheets.items()):
+                por_tipo[tipo] = por_tipo.get(tipo, 0) + hist.total
+                linhas.append(f"• {metodo} ({tipo}): {hist.total}x, {ms(hist.quantil(0.5))}/{ms(hist.quantil(0.99))}")
+            erros = sum(self.erros_sheets.values())
+            linhas.append(
+                f"Leituras: {por_tipo.get('leitura', 0)} | Escritas: {por_tipo.get('escrita', 0)} | Erros: {erros}"
+            )
+            if self.espera_cota.total:
+                linhas.append(f"Espera pela cota p99: {ms(self.espera_cota.quantil(0.99))} ms")
+
+            if self.caches:
+                linhas += ["", "*Cache* (acertos):"]
+                for nome, (acertos, faltas) in sorted(self.caches.items()):
+                    total = acertos + faltas
+                    linhas.append(f"• {nome}: {acertos}/{total} ({acertos / total:.0%})")
+        return "\n".join(linhas).replace('_', '\\_')
+
+    def prometheus(self):
+        """Métricas no formato texto de exposição do Prometheus"""
+        saida = []
+
+        def histograma(nome, rotulos, hist):
+            base = ','.join(f'{k}="{v}"' for k, v in rotulos.items())
+            separador = ',' if base else ''
+            acumulado = 0
+            for limite, contagem in zip(hist.buckets + ('+Inf',), hist.contagens):
+                acumulado += contagem
+                saida.append(f'{nome}_bucket{{{base}{separador}le="{limite}"}} {acumulado}')
+            chaves = f'{{{base}}}' if base else ''
+            saida.append(f'{nome}_sum{chaves} {hist.soma:.6f}')
+            saida.append(f'{nome}_count{chaves} {hist.total}')
+
+        with self._lock:
+            saida.append('# HELP bot_handler_duracao_segundos Latência dos comandos do bot')
+            saida.append('# TYPE bot_handler_duracao_segundos histogram')
+            for nome, hist in sorted(self.handlers.items()):
+                histograma('bot_handler_duracao_segundos', {'handler': nome}, hist)
+
+            saida.append('# HELP bot_handler_erros_total Comandos que terminaram com exceção')
+            saida.append('# TYPE bot_handler_erros_total counter')
+            for nome, erros in sorted(self.erros_handler.items()):
+                saida.append(f'bot_handler_erros_total{{handler="{nome}"}} {erros}')
+
+            saida.append('# HELP sheets_chamada_duracao_segundos Duração de cada tentativa de chamada à API do Sheets')
+            saida.append('# TYPE sheets_chamada_duracao_segundos histogram')
+            for (metodo, tipo), hist in sorted(self.sheets.items()):
+                histograma('sheets_chamada_duracao_segundos', {'metodo': metodo, 'tipo': tipo}, hist)
+
+            saida.append('# HELP sheets_erros_total Chamadas à API do Sheets que falharam')
+            saida.append('# TYPE sheets_erros_total counter')
+            for (metodo, tipo, status), erros in sorted(self.erros_sheets.items()):
+                saida.append(f'sheets_erros_total{{metodo="{metodo}",tipo="{tipo}",status="{status}"}} {erros}')
+
+            saida.append('# HELP sheets_espera_cota_segundos Espera no limitador local antes de cada chamada')
+            saida.append('# TYPE sheets_espera_cota_segundos histogram')
+            histograma('sheets_espera_cota_segundos', {}, self.espera_cota)
+
+            saida.append('# HELP cache_consultas_total Consultas aos caches locais por resultado')
+            saida.append('# TYPE cache_consultas_total counter')
+            for nome, (acertos, faltas) in sorted(self.caches.items()):
+                saida.append(f'cache_consultas_total{{cache="{nome}",resultado="acerto"}} {acertos}')
+                saida.append(f'cache_consultas_total{{cache="{nome}",resultado="falta"}} {faltas}')
+        return "\n".join(saida) + "\n"
+
+    def gravar_arquivo(self, caminho):
+        """Grava o texto do Prometheus de forma atômica (coletor textfile do node_exporter)"""
+        temporario = f"{caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(self.prometheus())
+        os.replace(temporario, caminho)
+
+
+# Registro único do processo
+metricas = Metricas()
+
+
+def cronometrar(handler):
+    """Decorador dos handlers do bot: mede a latência (e conta exceções) pelo nome da função"""
+    @functools.wraps(handler)
+    async def executar(*args, **kwargs):
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            return await handler(*args, **kwargs)
+        except Exception:
+            erro = True
+            raise
+        finally:
+            metricas.observar_handler(handler.__name__, time.perf_counter() - inicio, erro)
+    return executar
+
+
+def servir_metricas(porta, endereco='0.0.0.0'):
+    """
+    Serve GET /metrics numa thread em segundo plano
+
+    Returns:
+        ThreadingHTTPServer: Servidor iniciado (shutdown() para encerrar)
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            corpo = metricas.prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((endereco, porta), Handler)
+    threading.Thread(target=servidor.serve_forever, name='metricas', daemon=True).start()
+    return servidor
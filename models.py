@@ -0,0 +1,175 @@
+"""
+Registros de compras e receitas
+Convertidos uma única vez na borda do armazenamento (planilha ou SQLite),
+com os campos numéricos já como números
+"""
+from calculator import mes_para_ordinal
+
+# Cabeçalhos (chaves dos registros) das compras e receitas
+CABECALHO_DATABASE = [
+    'ID', 'Descrição', 'Valor Total', 'Valor Parcela', 'Parcela Inicial', 'Total Parcelas',
+    'Parcela Atual', 'Mês Início', 'Cartão', 'Status',
+    'Data Cadastro', 'Última Atualização', 'Categoria', 'Observações'
+]
+CABECALHO_RECEITAS = ['ID', 'Descrição', 'Valor', 'Data', 'Tipo']
+
+
+def _numero(valor, padrao=0.0):
+    """Converte uma célula em float (aceita vírgula decimal; vazio = padrão)"""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    try:
+        return float(str(valor).strip().replace(',', '.'))
+    except ValueError:
+        return padrao
+
+
+def _inteiro(valor, padrao=0):
+    """Converte uma célula em int (vazio = padrão)"""
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return valor
+    try:
+        return int(_numero(valor, None))
+    except TypeError:
+        return padrao
+
+
+def _id(valor):
+    """ID numérico quando possível (IDs vazios/estranhos são mantidos como vieram)"""
+    numero = _inteiro(valor, None)
+    return valor if numero is None else numero
+
+
+def id_valido(valor):
+    """Indica se o ID é numérico (uma linha apagada à mão na planilha chega com ID vazio)"""
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+class Compra:
+    """Compra parcelada (uma linha da aba Database / tabela compras)"""
+
+    __slots__ = (
+        'id', 'descricao', 'valor_total', 'valor_parcela', 'parcela_inicial', 'total_parcelas',
+        'parcela_atual', 'mes_inicio', 'cartao', 'status',
+        'data_cadastro', 'ultima_atualizacao', 'categoria', 'observacoes',
+        'mes_inicio_ord'
+    )
+
+    def __init__(self, id, descricao, valor_total, valor_parcela, parcela_inicial, total_parcelas,
+                 parcela_atual, mes_inicio, cartao, status, data_cadastro='', ultima_atualizacao='',
+                 categoria='Geral', observacoes=''):
+        self.id = id
+        self.descricao = descricao
+        self.valor_total = valor_total
+        self.valor_parcela = valor_parcela
+        self.parcela_inicial = parcela_inicial
+        self.total_parcelas = total_parcelas
+        self.parcela_atual = parcela_atual
+        self.mes_inicio = mes_inicio
+        self.cartao = cartao
+        self.status = status
+        self.data_cadastro = data_cadastro
+        self.ultima_atualizacao = ultima_atualizacao
+        self.categoria = categoria
+        self.observacoes = observacoes
+        # Mês de início já convertido para a aritmética de parcelas (None se inválido)
+        try:
+            self.mes_inicio_ord = mes_para_ordinal(mes_inicio)
+        except (TypeError, ValueError):
+            self.mes_inicio_ord = None
+
+    @classmethod
+    def de_registro(cls, registro):
+        """
+        Cria a compra a partir de um dict com as chaves de CABECALHO_DATABASE
+        (linha da aba lida pelo SheetsManager ou entrada do outbox)
+        """
+        return cls(
+            _id(registro.get('ID')),
+            str(registro.get('Descrição', '')),
+            _numero(registro.get('Valor Total')),
+            # Planilhas antigas tinham só a coluna 'Valor'
+            _numero(registro.get('Valor Parcela', registro.get('Valor', 0))),
+            _inteiro(registro.get('Parcela Inicial'), 1),
+            _inteiro(registro.get('Total Parcelas'), 1),
+            _inteiro(registro.get('Parcela Atual'), 1),
+            str(registro.get('Mês Início', '')),
+            str(registro.get('Cartão', '')),
+            str(registro.get('Status', '')),
+            str(registro.get('Data Cadastro', '')),
+            str(registro.get('Última Atualização', '')),
+            str(registro.get('Categoria', '') or 'Geral'),
+            str(registro.get('Observações', ''))
+        )
+
+    @classmethod
+    def de_linha(cls, linha):
+        """Cria a compra a partir de uma linha na ordem de CABECALHO_DATABASE"""
+        return cls(*linha)
+
+    def para_linha(self):
+        """Linha da aba Database (colunas A..N)"""
+        return [
+            self.id, self.descricao, self.valor_total, self.valor_parcela,
+            self.parcela_inicial, self.total_parcelas, self.parcela_atual,
+            self.mes_inicio, self.cartao, self.status,
+            self.data_cadastro, self.ultima_atualizacao,
+            self.categoria, self.observacoes
+        ]
+
+    def para_registro(self):
+        """Dict com as chaves de CABECALHO_DATABASE (formato do outbox)"""
+        return dict(zip(CABECALHO_DATABASE, self.para_linha()))
+
+    def copiar(self, **alteracoes):
+        """Cópia da compra com alguns campos alterados"""
+        campos = dict(zip(CAMPOS_COMPRA, self.para_linha()))
+        campos.update(alteracoes)
+        return Compra(**campos)
+
+    def __repr__(self):
+        return f"Compra({self.id!r}, {self.descricao!r}, {self.parcela_atual}/{self.total_parcelas}, {self.cartao!r})"
+
+
+# Campos da compra na ordem das colunas (sem o ordinal derivado)
+CAMPOS_COMPRA = Compra.__slots__[:len(CABECALHO_DATABASE)]
+
+
+class Receita:
+    """Receita (uma linha da aba Receitas / tabela receitas)"""
+
+    __slots__ = ('id', 'descricao', 'valor', 'data', 'tipo')
+
+    def __init__(self, id, descricao, valor, data='', tipo=''):
+        self.id = id
+        self.descricao = descricao
+        self.valor = valor
+        self.data = data
+        self.tipo = tipo
+
+    @classmethod
+    def de_registro(cls, registro):
+        """Cria a receita a partir de um dict com as chaves de CABECALHO_RECEITAS"""
+        return cls(
+            _id(registro.get('ID')),
+            str(registro.get('Descrição', '')),
+            _numero(registro.get('Valor')),
+            str(registro.get('Data', '')),
+            str(registro.get('Tipo', ''))
+        )
+
+    @classmethod
+    def de_linha(cls, linha):
+        """Cria a receita a partir de uma linha na ordem de CABECALHO_RECEITAS"""
+        return cls(*linha)
+
+    def para_linha(self):
+        """Linha da aba Receitas (colunas A..E)"""
+        return [self.id, self.descricao, self.valor, self.data, self.tipo]
+
+    def para_registro(self):
+        """Dict com as chaves de CABECALHO_RECEITAS (formato do outbox)"""
+        return dict(zip(CABECALHO_RECEITAS, self.para_linha()))
+
+    def __repr__(self):
+        return f"Receita({self.id!r}, {self.descricao!r}, {self.valor!r})"
@@ -0,0 +1,206 @@
+"""
+Diário local (outbox) das escritas destinadas ao Google Sheets
+As escritas são gravadas primeiro num SQLite local e confirmadas ao usuário;
+um worker em segundo plano replica o diário na planilha em lotes
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    aba TEXT NOT NULL,
+    registros TEXT NOT NULL,
+    criado_em TEXT NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class Outbox:
+    """
+    Diário persistente de escritas pendentes
+
+    Cada entrada guarda registros completos (dicts com a coluna 'ID') de uma
+    aba. Como a replicação é um upsert pelo ID, reenviar uma entrada após uma
+    queda não duplica linhas (entrega pelo menos uma vez).
+    """
+
+    def __init__(self, caminho):
+        """
+        Args:
+            caminho (str): Arquivo SQLite do diário
+        """
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        if caminho != ':memory:':
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=FULL')
+        self.conn.executescript(SCHEMA)
+
+    def registrar(self, aba, registros):
+        """
+        Grava uma escrita no diário (durável ao retornar)
+
+        Args:
+            aba (str): Aba de destino
+            registros (list): Dicts completos das linhas, com a chave 'ID'
+
+        Returns:
+            int: ID da entrada no diário
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO outbox (aba, registros, criado_em) VALUES (?, ?, ?)',
+                (aba, json.dumps(registros, ensure_ascii=False),
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            return cursor.lastrowid
+
+    def pendentes(self, limite=None, aba=None):
+        """
+        Lista as entradas ainda não confirmadas, na ordem em que foram gravadas
+
+        Args:
+            limite (int): Máximo de entradas (None = todas)
+            aba (str): Filtrar por aba (None = todas)
+
+        Returns:
+            list: Tuplas (id, aba, registros)
+        """
+        sql = 'SELECT id, aba, registros FROM outbox'
+        parametros = []
+        if aba is not None:
+            sql += ' WHERE aba = ?'
+            parametros.append(aba)
+        sql += ' ORDER BY id'
+        if limite is not None:
+            sql += ' LIMIT ?'
+            parametros.append(limite)
+
+        with self._lock:
+            linhas = self.conn.execute(sql, parametros).fetchall()
+        return [(id_, aba_, json.loads(registros)) for id_, aba_, registros in linhas]
+
+    def confirmar(self, ids):
+        """Remove do diário as entradas já gravadas na planilha"""
+        if not ids:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany('DELETE FROM outbox WHERE id = ?', [(i,) for i in ids])
+
+    def registrar_falha(self, ids):
+        """Conta mais uma tentativa malsucedida para as entradas"""
+        if not ids:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'UPDATE outbox SET tentativas = tentativas + 1 WHERE id = ?',
+                [(i,) for i in ids]
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def fechar(self):
+        with self._lock:
+            self.conn.close()
+
+
+class OutboxWorker:
+    """
+    Thread que replica o diário no destino em lotes
+
+    Entradas seguidas da mesma aba são agrupadas num único envio (o último
+    registro de cada ID vence). Em caso de erro as entradas ficam no diário e
+    são reenviadas na próxima rodada; o que sobrou de uma execução anterior é
+    enviado assim que o worker inicia.
+    """
+
+    def __init__(self, outbox, enviar, intervalo=2.0, tamanho_lote=200):
+        """
+        Args:
+            outbox (Outbox): Diário de escritas
+            enviar (callable): enviar(aba, registros) grava os registros no destino
+            intervalo (float): Segundos entre rodadas (e espera após um erro)
+            tamanho_lote (int): Máximo de entradas lidas por rodada
+        """
+        self.outbox = outbox
+        self.enviar = enviar
+        self.intervalo = intervalo
+        self.tamanho_lote = tamanho_lote
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        """Inicia a thread (e o reenvio do que ficou pendente)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name='outbox', daemon=True)
+            self._thread.start()
+
+    def notificar(self):
+        """Avisa que há novas entradas no diário"""
+        self._acordar.set()
+
+    def _executar(self):
+        while not self._parar.is_set():
+            self._acordar.clear()
+            if self.drenar():
+                self._acordar.wait(self.intervalo)
+            else:
+                # Erro: espera o intervalo completo antes de tentar de novo
+                self._parar.wait(self.intervalo)
+
+    def drenar(self):
+        """
+        Envia todas as entradas pendentes
+
+        Returns:
+            bool: False se algum envio falhou (as entradas continuam no diário)
+        """
+        while True:
+            entradas = self.outbox.pendentes(self.tamanho_lote)
+            if not entradas:
+                return True
+
+            for aba, ids, registros in self._agrupar(entradas):
+                try:
+                    self.enviar(aba, registros)
+                except Exception as e:
+                    print(f"❌ Erro ao replicar {len(ids)} escritas na aba {aba}: {e}")
+                    self.outbox.registrar_falha(ids)
+                    return False
+                self.outbox.confirmar(ids)
+
+    @staticmethod
+    def _agrupar(entradas):
+        """Agrupa entradas consecutivas da mesma aba, mantendo o último registro de cada ID"""
+        grupos = []
+        for id_entrada, aba, registros in entradas:
+            if not grupos or grupos[-1][0] != aba:
+                grupos.append((aba, [], {}))
+            _, ids, por_id = grupos[-1]
+            ids.append(id_entrada)
+            for registro in registros:
+                por_id[str(registro.get('ID'))] = registro
+        return [(aba, ids, list(por_id.values())) for aba, ids, por_id in grupos]
+
+    def parar(self, drenar=True):
+        """
+        Encerra a thread
+
+        Args:
+            drenar (bool): Tenta enviar o que estiver pendente antes de sair
+        """
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if drenar:
+            self.drenar()
@@ -0,0 +1,122 @@
+"""
+Perfil da partida do bot
+Mede quanto das importações e da conexão com o armazenamento pesa no tempo
+até o bot ficar pronto, sem iniciar o polling/webhook
+Execute: python bot.py --profile-startup
+"""
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+
+def perfil_importacoes(modulo='bot', limite=12):
+    """
+    Custo de importar um módulo num interpretador limpo (python -X importtime)
+
+    Args:
+        modulo (str): Módulo importado
+        limite (int): Quantas importações diretas listar
+
+    Returns:
+        tuple: (total em segundos, [(módulo importado diretamente, segundos acumulados)])
+    """
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=RAIZ, env=os.environ.copy(), capture_output=True, text=True
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.strip().splitlines()[-1])
+
+    # O importtime lista os filhos antes do pai: as importações de nível 1
+    # acumuladas até a linha do módulo são as que ele fez diretamente
+    total = 0.0
+    diretas = []
+    filhos = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, acumulado, nome = linha.split('|')
+        segundos = int(acumulado) / 1e6
+        profundidade = (len(nome) - len(nome.lstrip()) - 1) // 2
+        if profundidade == 1:
+            filhos.append((nome.strip(), segundos))
+        elif profundidade == 0:
+            if nome.strip() == modulo:
+                total, diretas = segundos, filhos
+            filhos = []
+
+    diretas.sort(key=lambda item: item[1], reverse=True)
+    return total, diretas[:limite]
+
+
+def perfil_conexao():
+    """
+    Custo de abrir o armazenamento padrão neste processo
+
+    Returns:
+        list: [(etapa, segundos)] na ordem em que aconteceram
+    """
+    from config import STORAGE_BACKEND
+    from metricas import metricas
+    from storage import criar_pool
+
+    etapas = []
+    inicio = time.perf_counter()
+    pool = criar_pool()
+    etapas.append(('criar pool (sem conectar)', time.perf_counter() - inicio))
+
+    # Módulos que só são carregados ao abrir a primeira planilha/banco
+    inicio = time.perf_counter()
+    importlib.import_module('sheets_manager' if STORAGE_BACKEND == 'sheets' else 'sqlite_storage')
+    etapas.append((f'importações do backend ({STORAGE_BACKEND})', time.perf_counter() - inicio))
+
+    inicio = time.perf_counter()
+    pool.inicializar()
+    total = time.perf_counter() - inicio
+
+    chamadas = sorted(
+        ((metodo, hist.soma, hist.total) for (metodo, _), hist in metricas.sheets.items()),
+        key=lambda item: item[1], reverse=True
+    )
+    for metodo, segundos, quantidade in chamadas:
+        etapas.append((f'  Sheets {metodo} ({quantidade}x)', segundos))
+    if chamadas:
+        etapas.append(('  autorização e demais', total - sum(segundos for _, segundos, _ in chamadas)))
+    etapas.append(('conexão e abas (total)', total))
+
+    pool.fechar()
+    return etapas
+
+
+def main():
+    sys.path.insert(0, RAIZ)
+    print("⏱️ Perfil da partida do bot\n")
+
+    print("📦 Importações (python -X importtime, interpretador limpo)...")
+    try:
+        total, diretas = perfil_importacoes()
+        print(f"  import bot: {total * 1000:.0f} ms")
+        for modulo, segundos in diretas:
+            print(f"    {modulo:<32} {segundos * 1000:>8.0f} ms")
+    except RuntimeError as e:
+        print(f"  ❌ Erro ao importar o bot: {e}")
+        return False
+
+    print("\n🔌 Conexão com o armazenamento...")
+    try:
+        for etapa, segundos in perfil_conexao():
+            print(f"  {etapa:<34} {segundos * 1000:>8.0f} ms")
+    except Exception as e:
+        print(f"  ❌ Erro ao conectar: {e}")
+        return False
+
+    print("\n💡 Tempo até o primeiro update: python benchmarks/benchmark_partida.py")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
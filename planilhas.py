@@ -0,0 +1,117 @@
+"""
+Planilha de cada chat
+Resolve qual planilha atende um chat/usuário e mantém um pool LRU limitado
+de armazenamentos abertos, cada um com seu próprio cache
+"""
+import os
+import threading
+from collections import OrderedDict
+
+
+def caminho_da_planilha(caminho, spreadsheet_id):
+    """
+    Arquivo local exclusivo de uma planilha (ex: outbox.db -> outbox-<id>.db)
+
+    Args:
+        caminho (str): Caminho configurado para a planilha padrão
+        spreadsheet_id (str): Planilha dona do arquivo
+    """
+    base, extensao = os.path.splitext(caminho)
+    return f"{base}-{spreadsheet_id}{extensao}"
+
+
+class PoolPlanilhas:
+    """
+    Armazenamentos abertos por planilha, no máximo `tamanho` ao mesmo tempo
+
+    Quando o limite é atingido, o menos usado recentemente é fechado (o que
+    envia o que ele tinha pendente). Cada planilha tem seu próprio
+    armazenamento, então caches, contadores de ID e totais não se misturam.
+    """
+
+    def __init__(self, fabrica, mapa=None, padrao=None, tamanho=8):
+        """
+        Args:
+            fabrica (callable): fabrica(spreadsheet_id) cria o armazenamento já inicializado
+            mapa (dict): {chave do chat/usuário (str): spreadsheet_id}
+            padrao (str): Planilha dos chats fora do mapa (None = sem acesso)
+            tamanho (int): Máximo de armazenamentos abertos
+        """
+        self.fabrica = fabrica
+        self.mapa = dict(mapa or {})
+        self.padrao = padrao
+        self.tamanho = max(1, tamanho)
+        self._abertos = OrderedDict()
+        self._lock = threading.Lock()
+        # Uma trava por planilha em criação (conectar não bloqueia as demais)
+        self._criacao = {}
+
+    def planilha_de(self, chave):
+        """Planilha que atende o chat/usuário (None se não houver)"""
+        return self.mapa.get(str(chave), self.padrao)
+
+    def planilhas(self):
+        """Todas as planilhas configuradas (padrão primeiro)"""
+        ids = ([self.padrao] if self.padrao else []) + list(self.mapa.values())
+        return list(dict.fromkeys(ids))
+
+    def obter(self, chave):
+        """
+        Armazenamento do chat/usuário
+
+        Returns:
+            Storage: Armazenamento da planilha, ou None se o chat não tem planilha
+        """
+        spreadsheet_id = self.planilha_de(chave)
+        if spreadsheet_id is None:
+            return None
+        return self.obter_planilha(spreadsheet_id)
+
+    def obter_planilha(self, spreadsheet_id):
+        """Armazenamento de uma planilha, abrindo (e despejando o menos usado) se preciso"""
+        with self._lock:
+            storage = self._abertos.get(spreadsheet_id)
+            if storage is not None:
+                self._abertos.move_to_end(spreadsheet_id)
+                return storage
+            trava = self._criacao.setdefault(spreadsheet_id, threading.Lock())
+
+        despejados = []
+        with trava:
+            # Outra thread pode ter aberto enquanto esperávamos
+            with self._lock:
+                storage = self._abertos.get(spreadsheet_id)
+                if storage is not None:
+                    self._abertos.move_to_end(spreadsheet_id)
+                    return storage
+
+            storage = self.fabrica(spreadsheet_id)
+
+            with self._lock:
+                self._abertos[spreadsheet_id] = storage
+                self._criacao.pop(spreadsheet_id, None)
+                while len(self._abertos) > self.tamanho:
+                    _, antigo = self._abertos.popitem(last=False)
+                    despejados.append(antigo)
+
+        for antigo in despejados:
+            antigo.fechar()
+        return storage
+
+    def inicializar(self):
+        """Abre a planilha padrão (se houver) para validar a configuração na partida"""
+        if self.padrao:
+            self.obter_planilha(self.padrao)
+
+    def todos(self):
+        """Percorre os armazenamentos de todas as planilhas configuradas (abrindo se preciso)"""
+        for spreadsheet_id in self.planilhas():
+            yield self.obter_planilha(spreadsheet_id)
+
+    def fechar(self):
+        """Fecha todos os armazenamentos abertos"""
+        with self._lock:
+            abertos = list(self._abertos.values())
+            self._abertos.clear()
+        for storage in abertos:
+            storage.fechar()
@@ -0,0 +1,156 @@
+"""
+Cliente das chamadas à API do Google Sheets
+Limita a taxa de requisições à cota por minuto, repete erros de cota/servidor
+com backoff exponencial e dá preferência às chamadas interativas
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+import gspread
+from config import SHEETS_REQUESTS_PER_MINUTE, SHEETS_MAX_RETRIES
+from metricas import metricas
+
+# Prioridades (menor = atendida primeiro)
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_SEGUNDO_PLANO = 1
+
+# Status HTTP que valem nova tentativa (cota estourada / instabilidade do Google)
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+
+# Métodos que acrescentam linhas: um 5xx pode chegar de uma escrita que o
+# servidor aplicou, e repeti-la duplicaria as linhas. Neles só o 429 (recusado
+# antes de ser processado) é repetido; o resto vai para quem chamou (o outbox
+# reenvia com upsert pelo ID, que relê a coluna A antes de acrescentar)
+NAO_IDEMPOTENTES = {'append_row', 'append_rows'}
+STATUS_REPETIVEIS_NAO_IDEMPOTENTES = {429}
+
+
+class LimitadorCota:
+    """
+    Token bucket com fila de prioridade
+
+    Os tokens são repostos continuamente à taxa da cota; quem espera com
+    prioridade menor (interativa) é sempre atendido antes de quem espera com
+    prioridade maior (segundo plano), e dentro da mesma prioridade vale a ordem
+    de chegada.
+    """
+
+    def __init__(self, por_minuto, rajada=None):
+        """
+        Args:
+            por_minuto (int): Requisições permitidas por minuto
+            rajada (int): Máximo de requisições seguidas sem espera
+        """
+        self.taxa = por_minuto / 60.0
+        self.capacidade = rajada or max(1, por_minuto // 6)
+        self._tokens = float(self.capacidade)
+        self._atualizado = time.monotonic()
+        self._fila = []
+        self._sequencia = itertools.count()
+        self._cond = threading.Condition()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+
+    def adquirir(self, prioridade=PRIORIDADE_INTERATIVA):
+        """Bloqueia até haver um token disponível para esta chamada"""
+        with self._cond:
+            vez = (prioridade, next(self._sequencia))
+            heapq.heappush(self._fila, vez)
+            try:
+                while True:
+                    self._repor()
+                    if self._fila[0] == vez:
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return
+                        self._cond.wait((1 - self._tokens) / self.taxa)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._fila.remove(vez)
+                heapq.heapify(self._fila)
+                self._cond.notify_all()
+
+
+class ClienteSheets:
+    """
+    Ponto único de execução das chamadas ao gspread
+
+    Uso: `cliente.executar(ws.append_row, linha)`; trechos em segundo plano
+    usam `with cliente.prioridade(PRIORIDADE_SEGUNDO_PLANO): ...`.
+    """
+
+    def __init__(self, por_minuto=SHEETS_REQUESTS_PER_MINUTE, max_tentativas=SHEETS_MAX_RETRIES,
+                 espera_base=1.0, espera_maxima=32.0):
+        """
+        Args:
+            por_minuto (int): Requisições por minuto (um pouco abaixo da cota)
+            max_tentativas (int): Tentativas por chamada em erros repetíveis
+            espera_base (float): Espera inicial do backoff (segundos)
+            espera_maxima (float): Teto da espera do backoff (segundos)
+        """
+        self.limitador = LimitadorCota(por_minuto)
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self._local = threading.local()
+
+    @contextmanager
+    def prioridade(self, nivel):
+        """Define a prioridade das chamadas feitas por esta thread dentro do bloco"""
+        anterior = getattr(self._local, 'prioridade', PRIORIDADE_INTERATIVA)
+        self._local.prioridade = nivel
+        try:
+            yield
+        finally:
+            self._local.prioridade = anterior
+
+    @staticmethod
+    def status_http(erro):
+        """Status HTTP de um APIError do gspread (None se não houver)"""
+        resposta = getattr(erro, 'response', None)
+        return getattr(resposta, 'status_code', None) or getattr(erro, 'code', None)
+
+    def executar(self, funcao, *args, **kwargs):
+        """
+        Executa uma chamada respeitando a cota e repetindo erros 429/5xx
+
+        A espera entre tentativas é exponencial com jitter completo
+        (aleatória entre 0 e espera_base * 2^tentativa, limitada ao teto).
+        Os métodos de NAO_IDEMPOTENTES só são repetidos em erro de cota.
+
+        Returns:
+            Retorno da chamada
+
+        Raises:
+            gspread.exceptions.APIError: Erro não repetível ou tentativas esgotadas
+        """
+        prioridade = getattr(self._local, 'prioridade', PRIORIDADE_INTERATIVA)
+        metodo = getattr(funcao, '__name__', 'desconhecido')
+        repetiveis = STATUS_REPETIVEIS_NAO_IDEMPOTENTES if metodo in NAO_IDEMPOTENTES else STATUS_REPETIVEIS
+        for tentativa in range(self.max_tentativas):
+            inicio = time.perf_counter()
+            self.limitador.adquirir(prioridade)
+            chamada = time.perf_counter()
+            metricas.observar_espera_cota(chamada - inicio)
+            try:
+                resultado = funcao(*args, **kwargs)
+                metricas.observar_sheets(metodo, time.perf_counter() - chamada)
+                return resultado
+            except gspread.exceptions.APIError as e:
+                metricas.observar_sheets(metodo, time.perf_counter() - chamada, self.status_http(e) or 'erro')
+                ultima = tentativa == self.max_tentativas - 1
+                if ultima or self.status_http(e) not in repetiveis:
+                    raise
+                espera = random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** tentativa))
+                print(f"⚠️ Sheets respondeu {self.status_http(e)}, nova tentativa em {espera:.1f}s")
+                time.sleep(espera)
+            except Exception:
+                metricas.observar_sheets(metodo, time.perf_counter() - chamada, 'erro')
+                raise
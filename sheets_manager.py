@@ -2,56 +2,153 @@
 Gerenciador de integração com Google Sheets
 Mantém o visual da planilha e gerencia dados em aba oculta
 """
+import functools
+import time
+import threading
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from gspread.utils import rowcol_to_a1
 from datetime import datetime
-import pandas as pd
 from config import (
     GOOGLE_SHEETS_CREDENTIALS,
     SPREADSHEET_ID,
     SHEET_VISUAL,
     SHEET_DATABASE,
     SHEET_RECEITAS,
-    CURRENCY_FORMAT
+    CURRENCY_FORMAT,
+    CACHE_TTL,
+    VISUAL_DEBOUNCE_SECONDS,
+    VISUAL_MAX_DELAY_SECONDS,
+    OUTBOX_ENABLED,
+    OUTBOX_PATH,
+    OUTBOX_INTERVAL,
+    OUTBOX_BATCH,
+    HISTORICO_PATH
 )
-from calculator import ParcelCalculator
+from storage import Storage
+from models import Compra, Receita, CABECALHO_DATABASE, CABECALHO_RECEITAS, id_valido
+from outbox import Outbox, OutboxWorker
+from sheets_client import ClienteSheets, PRIORIDADE_SEGUNDO_PLANO
+from metricas import metricas
 
+# Colunas de cada aba de dados
+CABECALHOS = {
+    SHEET_DATABASE: CABECALHO_DATABASE,
+    SHEET_RECEITAS: CABECALHO_RECEITAS
+}
 
-class SheetsManager:
+# Abas que o bot usa: (nome, linhas, colunas) na criação
+ABAS = (
+    (SHEET_VISUAL, 1000, 20),
+    (SHEET_DATABASE, 1000, 15),
+    (SHEET_RECEITAS, 100, 10)
+)
+
+# Tipo de registro de cada aba de dados
+MODELOS = {
+    SHEET_DATABASE: Compra,
+    SHEET_RECEITAS: Receita
+}
+
+
+def autorizar():
+    """
+    Cliente gspread autorizado com a conta de serviço
+    
+    Um único cliente (e sessão HTTP) pode ser compartilhado por vários
+    SheetsManager, um por planilha.
+    """
+    # oauth2client só é necessário para autorizar (importá-lo custa ~0,1s)
+    from oauth2client.service_account import ServiceAccountCredentials
+    
+    scope = [
+        'https://spreadsheets.google.com/feeds',
+        'https://www.googleapis.com/auth/drive'
+    ]
+    
+    # Importar configuração de credenciais JSON
+    from config import GOOGLE_CREDENTIALS_JSON
+    
+    # Tentar usar credenciais da variável de ambiente primeiro
+    if GOOGLE_CREDENTIALS_JSON:
+        import json
+        creds_dict = json.loads(GOOGLE_CREDENTIALS_JSON)
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(
+            creds_dict, scope
+        )
+    else:
+        # Fallback para arquivo local
+        creds = ServiceAccountCredentials.from_json_keyfile_name(
+            GOOGLE_SHEETS_CREDENTIALS, scope
+        )
+    
+    return gspread.authorize(creds)
+
+
+def _em_segundo_plano(metodo):
+    """Executa o método com as chamadas à API em prioridade de segundo plano"""
+    @functools.wraps(metodo)
+    def executar(self, *args, **kwargs):
+        with self.api.prioridade(PRIORIDADE_SEGUNDO_PLANO):
+            return metodo(self, *args, **kwargs)
+    return executar
+
+
+class SheetsManager(Storage):
     """Gerenciador da planilha do Google Sheets"""
     
-    def __init__(self):
-        self.calc = ParcelCalculator()
-        self.client = None
+    def __init__(self, spreadsheet_id=None, client=None, api=None,
+                 caminho_outbox=OUTBOX_PATH, caminho_historico=HISTORICO_PATH):
+        """
+        Args:
+            spreadsheet_id (str): Planilha gerenciada (None = SPREADSHEET_ID)
+            client (gspread.Client): Cliente já autorizado a compartilhar (None = autoriza)
+            api (ClienteSheets): Limitador de cota a compartilhar (a cota é da conta de serviço)
+            caminho_outbox (str): Diário local desta planilha
+            caminho_historico (str): Histórico mensal desta planilha
+        """
+        super().__init__()
+        self.spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+        self.client = client
         self.spreadsheet = None
+        self.caminho_historico = caminho_historico
+        # Toda chamada à API passa pelo cliente (cota, backoff e prioridade)
+        self.api = api or ClienteSheets()
+        # Cache dos registros já convertidos por aba: {nome_aba: {'registros': [...], 'carregado_em': t}}
+        self._cache = {}
+        # Protege cache e contadores: os métodos são chamados de várias threads (AsyncStorage)
+        self._lock = threading.RLock()
+        # Escritas feitas durante cada leitura da planilha em andamento: {nome_aba: [lista, ...]}
+        self._leituras = {}
+        # Próximo ID livre por aba (contador monotônico, semeado uma única vez)
+        self._proximos_ids = {}
+        # Handles das abas resolvidos uma vez: {nome_aba: Worksheet}
+        self._abas = {}
+        # Reconstrução adiada da aba visual (ver marcar_visual_sujo)
+        self._visual_sujo_desde = None
+        self._visual_timer = None
+        self._visual_lock = threading.Lock()
+        # Depois de fechar() (ex: despejado do pool) as escritas são recusadas
+        self._fechado = False
         self.conectar()
+        
+        # Escritas confirmadas pelo diário local e replicadas em segundo plano
+        self._outbox = None
+        self._outbox_worker = None
+        if OUTBOX_ENABLED:
+            self._outbox = Outbox(caminho_outbox)
+            self._outbox_worker = OutboxWorker(
+                self._outbox, self._replicar,
+                intervalo=OUTBOX_INTERVAL, tamanho_lote=OUTBOX_BATCH
+            )
+            self._outbox_worker.iniciar()
     
     def conectar(self):
         """Conecta com o Google Sheets"""
         try:
-            scope = [
-                'https://spreadsheets.google.com/feeds',
-                'https://www.googleapis.com/auth/drive'
-            ]
-            
-            # Importar configuração de credenciais JSON
-            from config import GOOGLE_CREDENTIALS_JSON
-            
-            # Tentar usar credenciais da variável de ambiente primeiro
-            if GOOGLE_CREDENTIALS_JSON:
-                import json
-                creds_dict = json.loads(GOOGLE_CREDENTIALS_JSON)
-                creds = ServiceAccountCredentials.from_json_keyfile_dict(
-                    creds_dict, scope
-                )
-            else:
-                # Fallback para arquivo local
-                creds = ServiceAccountCredentials.from_json_keyfile_name(
-                    GOOGLE_SHEETS_CREDENTIALS, scope
-                )
-            
-            self.client = gspread.authorize(creds)
-            self.spreadsheet = self.client.open_by_key(SPREADSHEET_ID)
+            if self.client is None:
+                self.client = autorizar()
+            self.spreadsheet = self.api.executar(self.client.open_by_key, self.spreadsheet_id)
+            self._abas = {}
             print("✅ Conectado ao Google Sheets")
             return True
         except Exception as e:
@@ -59,32 +156,42 @@ class SheetsManager:
             return False
     
     def garantir_abas(self):
-        """Garante que as abas necessárias existam"""
+        """
+        Garante que as abas necessárias existam
+        
+        Uma única leitura dos metadados resolve os handles de todas as abas;
+        as que faltarem são criadas num único batch_update e recebem os
+        cabeçalhos num único values_batch_update.
+        """
         try:
-            # Verificar aba visual
-            try:
-                self.spreadsheet.worksheet(SHEET_VISUAL)
-            except:
-                self.spreadsheet.add_worksheet(title=SHEET_VISUAL, rows=1000, cols=20)
+            existentes = {ws.title: ws for ws in self.api.executar(self.spreadsheet.worksheets)}
+            faltando = [(nome, linhas, colunas) for nome, linhas, colunas in ABAS if nome not in existentes]
+            
+            if faltando:
+                self.api.executar(self.spreadsheet.batch_update, {'requests': [
+                    {'addSheet': {'properties': {
+                        'title': nome,
+                        'gridProperties': {'rowCount': linhas, 'columnCount': colunas}
+                    }}}
+                    for nome, linhas, colunas in faltando
+                ]})
+                
+                # Adicionar cabeçalhos das abas de dados criadas
+                cabecalhos = [
+                    {'range': f"'{nome}'!A1:{rowcol_to_a1(1, len(CABECALHOS[nome]))}", 'values': [CABECALHOS[nome]]}
+                    for nome, _, _ in faltando if nome in CABECALHOS
+                ]
+                if cabecalhos:
+                    self.api.executar(self.spreadsheet.values_batch_update, {
+                        'valueInputOption': 'RAW',
+                        'data': cabecalhos
+                    })
+                
+                existentes = {ws.title: ws for ws in self.api.executar(self.spreadsheet.worksheets)}
+                print(f"✅ Abas criadas: {', '.join(nome for nome, _, _ in faltando)}")
             
-            # Verificar aba de database
-            try:
-                self.spreadsheet.worksheet(SHEET_DATABASE)
-            except:
-                ws = self.spreadsheet.add_worksheet(title=SHEET_DATABASE, rows=1000, cols=15)
-                # Adicionar cabeçalhos
-                ws.update('A1:N1', [[
-                    'ID', 'Descrição', 'Valor Total', 'Valor Parcela', 'Parcela Inicial', 'Total Parcelas',
-                    'Parcela Atual', 'Mês Início', 'Cartão', 'Status',
-                    'Data Cadastro', 'Última Atualização', 'Categoria', 'Observações'
-                ]])
-            
-            # Verificar aba de receitas
-            try:
-                self.spreadsheet.worksheet(SHEET_RECEITAS)
-            except:
-                ws = self.spreadsheet.add_worksheet(title=SHEET_RECEITAS, rows=100, cols=10)
-                ws.update('A1:E1', [['ID', 'Descrição', 'Valor', 'Data', 'Tipo']])
+            for nome, _, _ in ABAS:
+                self._abas[nome] = existentes[nome]
             
             print("✅ Abas verificadas/criadas")
             return True
@@ -92,6 +199,259 @@ class SheetsManager:
             print(f"❌ Erro ao verificar abas: {e}")
             return False
     
+    def inicializar(self):
+        """
+        Prepara a planilha para uso (cria as abas que faltarem)
+        
+        Se a conexão feita na criação falhou, tenta conectar de novo.
+        
+        Returns:
+            bool: True se a planilha está conectada e com as abas
+        """
+        if self.spreadsheet is None and not self.conectar():
+            return False
+        return self.garantir_abas()
+    
+    def _aba(self, nome_aba):
+        """Retorna o handle da aba, resolvendo na planilha só na primeira vez"""
+        ws = self._abas.get(nome_aba)
+        if ws is None:
+            ws = self.api.executar(self.spreadsheet.worksheet, nome_aba)
+            self._abas[nome_aba] = ws
+        return ws
+    
+    @staticmethod
+    def _aba_nao_encontrada(erro):
+        """Indica se o erro significa que o handle em cache não aponta mais para uma aba válida"""
+        if isinstance(erro, gspread.exceptions.WorksheetNotFound):
+            return True
+        if isinstance(erro, gspread.exceptions.APIError):
+            mensagem = str(erro)
+            return 'Unable to parse range' in mensagem or 'NOT_FOUND' in mensagem
+        return False
+    
+    def _chamar_aba(self, nome_aba, metodo, *args, **kwargs):
+        """
+        Executa um método do Worksheet usando o handle em cache
+        
+        Se a chamada falhar porque a aba foi apagada/renomeada, o handle é
+        descartado, resolvido de novo e a chamada repetida uma única vez.
+        
+        Args:
+            nome_aba (str): Nome da aba
+            metodo (str): Nome do método do Worksheet (ex: 'append_row')
+            
+        Returns:
+            Retorno do método chamado
+        """
+        try:
+            return self.api.executar(getattr(self._aba(nome_aba), metodo), *args, **kwargs)
+        except Exception as e:
+            if not self._aba_nao_encontrada(e):
+                raise
+            self._abas.pop(nome_aba, None)
+            return self.api.executar(getattr(self._aba(nome_aba), metodo), *args, **kwargs)
+    
+    def _registros(self, nome_aba):
+        """
+        Retorna os registros de uma aba de dados a partir do cache local
+        
+        A aba só é relida da planilha quando o cache não existe ou passou de
+        CACHE_TTL segundos (para pegar edições feitas à mão na planilha).
+        
+        Args:
+            nome_aba (str): SHEET_DATABASE ou SHEET_RECEITAS
+            
+        Returns:
+            list: Cópia da lista de Compra / Receita (convertidos uma vez por
+                  leitura da planilha; os objetos são os mesmos do cache)
+        """
+        with self._lock:
+            entrada = self._cache.get(nome_aba)
+            if entrada is not None and time.monotonic() - entrada['carregado_em'] <= CACHE_TTL:
+                metricas.cache(nome_aba, True)
+                return list(entrada['registros'])
+        metricas.cache(nome_aba, False)
+        
+        # Escritas confirmadas que ainda não chegaram na planilha, lidas ANTES
+        # da planilha: uma entrada enviada durante a leitura sai do outbox, mas
+        # já está na fotografia. As escritas feitas durante a leitura são
+        # anotadas à parte e aplicadas por último (são as mais recentes).
+        modelo = MODELOS[nome_aba]
+        gravadas_durante = []
+        with self._lock:
+            self._leituras.setdefault(nome_aba, []).append(gravadas_durante)
+            pendentes = [modelo.de_registro(r) for r in self._pendentes(nome_aba)]
+        
+        # Leitura de rede fora do lock para não bloquear as outras threads
+        try:
+            registros = [modelo.de_registro(r) for r in self._ler_aba(nome_aba)]
+        finally:
+            with self._lock:
+                self._leituras[nome_aba].remove(gravadas_durante)
+        entrada = {
+            'registros': registros,
+            'posicoes': {str(r.id): i for i, r in enumerate(registros)},
+            'carregado_em': time.monotonic()
+        }
+        with self._lock:
+            self._aplicar(entrada, pendentes)
+            self._aplicar(entrada, gravadas_durante)
+            self._cache[nome_aba] = entrada
+            self._avancar_contador(nome_aba, (r.id for r in entrada['registros']))
+            return list(entrada['registros'])
+    
+    def _ler_aba(self, nome_aba):
+        """
+        Linhas da aba como dicts com as chaves do cabeçalho (linha 1)
+        
+        Usa get_all_values em vez de get_all_records: o get_all_records do
+        gspread 6 monta o intervalo com o número de linhas guardado no handle,
+        que fica defasado porque os handles são reaproveitados (ver _aba) e a
+        aba cresce. O get_all_values lê a aba inteira, qualquer que seja o tamanho.
+        
+        Returns:
+            list: Um dict por linha de dados (células faltando = '')
+        """
+        valores = self._chamar_aba(nome_aba, 'get_all_values')
+        if not valores:
+            return []
+        cabecalho = valores[0]
+        return [
+            dict(zip(cabecalho, list(linha) + [''] * (len(cabecalho) - len(linha))))
+            for linha in valores[1:]
+        ]
+    
+    def _pendentes(self, nome_aba):
+        """Registros da aba (dicts) que estão no outbox aguardando envio"""
+        if self._outbox is None:
+            return []
+        return [
+            registro
+            for _, _, registros in self._outbox.pendentes(aba=nome_aba)
+            for registro in registros
+        ]
+    
+    def _cache_gravar(self, nome_aba, registros):
+        """Reflete no cache (e nas leituras da aba em andamento) registros gravados"""
+        with self._lock:
+            for gravadas in self._leituras.get(nome_aba, ()):
+                gravadas.extend(registros)
+            entrada = self._cache.get(nome_aba)
+            if entrada is not None:
+                self._aplicar(entrada, registros)
+    
+    @staticmethod
+    def _aplicar(entrada, registros):
+        """Aplica registros numa entrada do cache (substitui pelo ID ou acrescenta)"""
+        for registro in registros:
+            chave = str(registro.id)
+            posicao = entrada['posicoes'].get(chave)
+            if posicao is not None:
+                entrada['registros'][posicao] = registro
+            else:
+                entrada['posicoes'][chave] = len(entrada['registros'])
+                entrada['registros'].append(registro)
+    
+    def _gravar(self, nome_aba, registros, envio_direto):
+        """
+        Grava registros completos de uma aba
+        
+        Com o outbox ativo, a escrita é registrada no diário local e confirmada
+        na hora (o worker replica na planilha); sem ele, `envio_direto()` faz a
+        chamada à planilha antes de retornar. Em ambos os casos o cache é atualizado.
+        
+        Args:
+            nome_aba (str): Aba de destino
+            registros (list): Compra / Receita completos (com ID)
+            envio_direto (callable): Escrita na planilha usada sem outbox
+        
+        Raises:
+            RuntimeError: O gerenciador já foi fechado
+        """
+        with self._lock:
+            if self._fechado:
+                raise RuntimeError(f"planilha {self.spreadsheet_id} já foi fechada")
+            if self._outbox is not None:
+                self._outbox.registrar(nome_aba, [r.para_registro() for r in registros])
+        if self._outbox is not None:
+            self._outbox_worker.notificar()
+        else:
+            envio_direto()
+        self._cache_gravar(nome_aba, registros)
+    
+    def invalidar_cache(self, nome_aba=None):
+        """
+        Descarta o cache local, forçando releitura da planilha na próxima consulta
+        
+        Args:
+            nome_aba (str): Aba a invalidar (None = todas)
+        """
+        with self._lock:
+            if nome_aba is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(nome_aba, None)
+    
+    def _versao_dados(self):
+        """
+        Versão dos dados para os totais do resumo: o instante em que cada aba foi
+        lida da planilha. Uma releitura (TTL vencido ou cache invalidado) pode
+        trazer edições feitas à mão, então os totais são recalculados.
+        """
+        with self._lock:
+            versao = []
+            for nome_aba in (SHEET_DATABASE, SHEET_RECEITAS):
+                entrada = self._cache.get(nome_aba)
+                if entrada is None or time.monotonic() - entrada['carregado_em'] > CACHE_TTL:
+                    return None
+                versao.append(entrada['carregado_em'])
+            return tuple(versao)
+    
+    def _avancar_contador(self, nome_aba, ids):
+        """Garante que o contador de IDs da aba fique acima de todos os IDs informados"""
+        maior = 0
+        for valor in ids:
+            try:
+                maior = max(maior, int(valor))
+            except (TypeError, ValueError):
+                continue  # Cabeçalho ou célula vazia
+        if maior + 1 > self._proximos_ids.get(nome_aba, 0):
+            self._proximos_ids[nome_aba] = maior + 1
+    
+    def _gerar_ids(self, nome_aba, quantidade=1):
+        """
+        Reserva IDs sequenciais para novas linhas
+        
+        O contador é semeado uma única vez (do cache, se carregado, ou de uma
+        leitura só da coluna A) e depois avança em memória, sem novas leituras.
+        Continua correto mesmo se alguma linha tiver sido apagada.
+        
+        Args:
+            nome_aba (str): Aba onde as linhas serão adicionadas
+            quantidade (int): Quantos IDs reservar
+            
+        Returns:
+            int: Primeiro ID reservado
+        """
+        with self._lock:
+            if nome_aba not in self._proximos_ids:
+                entrada = self._cache.get(nome_aba)
+                if entrada is not None:
+                    ids = [r.id for r in entrada['registros']]
+                else:
+                    # IDs já confirmados pelo outbox mas ainda não enviados. Lidos
+                    # antes da coluna A: uma entrada enviada entre as duas leituras
+                    # só sai do diário depois de gravada, então aparece na coluna
+                    ids = [r.get('ID') for r in self._pendentes(nome_aba)]
+                    ids += self._chamar_aba(nome_aba, 'col_values', 1)
+                self._avancar_contador(nome_aba, ids)
+                self._proximos_ids.setdefault(nome_aba, 1)
+            
+            primeiro = self._proximos_ids[nome_aba]
+            self._proximos_ids[nome_aba] = primeiro + quantidade
+            return primeiro
+    
     def adicionar_compra(self, descricao, valor_total, valor_parcela, parcela_inicial, total_parcelas, cartao, categoria='Geral'):
         """
         Adiciona nova compra parcelada
@@ -106,53 +466,37 @@ class SheetsManager:
             categoria (str): Categoria da compra
             
         Returns:
-            dict: Dados da compra adicionada
+            Compra: Compra adicionada
         """
         try:
-            ws_db = self.spreadsheet.worksheet(SHEET_DATABASE)
-            
             # Calcular mês de início baseado na parcela inicial
-            mes_inicio = self.calc.calcular_mes_inicio(parcela_inicial, total_parcelas)
-            
-            # Calcular parcela atual
-            parcela_atual, status = self.calc.calcular_parcela_atual(
-                mes_inicio, parcela_inicial, total_parcelas
-            )
+            hoje = self.calc.mes_atual()
+            mes_inicio = self.calc.calcular_mes_inicio(parcela_inicial, total_parcelas, hoje=hoje)
             
             # Gerar ID único
-            todas_linhas = ws_db.get_all_values()
-            novo_id = len(todas_linhas)  # ID baseado no número de linhas
+            novo_id = self._gerar_ids(SHEET_DATABASE)
             
             # Data atual
             agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
             # Dados da compra
-            compra = {
-                'id': novo_id,
-                'descricao': descricao,
-                'valor_total': valor_total,
-                'valor_parcela': valor_parcela,
-                'parcela_inicial': parcela_inicial,
-                'total_parcelas': total_parcelas,
-                'parcela_atual': parcela_atual,
-                'mes_inicio': mes_inicio,
-                'cartao': cartao,
-                'status': status,
-                'data_cadastro': agora,
-                'ultima_atualizacao': agora,
-                'categoria': categoria,
-                'observacoes': ''
-            }
+            compra = self._montar_compra(
+                novo_id, descricao, valor_total, valor_parcela, parcela_inicial,
+                total_parcelas, mes_inicio, cartao, categoria, agora, hoje=hoje
+            )
+            parcela_atual = compra.parcela_atual
             
             # Adicionar na planilha database
-            ws_db.append_row([
-                novo_id, descricao, valor_total, valor_parcela, parcela_inicial, total_parcelas,
-                parcela_atual, mes_inicio, cartao, status,
-                agora, agora, categoria, ''
-            ])
+            linha = compra.para_linha()
+            with self._lock_totais:
+                self._gravar(
+                    SHEET_DATABASE, [compra],
+                    lambda: self._chamar_aba(SHEET_DATABASE, 'append_row', linha)
+                )
+                self._agregar_compras([compra])
             
-            # Atualizar aba visual
-            self.atualizar_aba_visual()
+            # Aba visual é reconstruída em segundo plano
+            self.marcar_visual_sujo()
             
             print(f"✅ Compra adicionada: {descricao} - {parcela_atual}/{total_parcelas}")
             return compra
@@ -170,80 +514,86 @@ class SheetsManager:
             status (str): Status para filtrar ('ativo', 'concluido', 'todos')
             
         Returns:
-            list: Lista de dicts com dados das compras
+            list: Lista de Compra
         """
         try:
-            ws_db = self.spreadsheet.worksheet(SHEET_DATABASE)
-            dados = ws_db.get_all_records()
-            
-            # Filtrar
-            resultado = []
-            for compra in dados:
-                if cartao and compra['Cartão'].lower() != cartao.lower():
-                    continue
-                if status != 'todos' and compra['Status'] != status:
-                    continue
-                resultado.append(compra)
-            
-            return resultado
+            return self._ler_compras(cartao, status)
             
         except Exception as e:
             print(f"❌ Erro ao listar compras: {e}")
             return []
     
+    def _ler_compras(self, cartao=None, status='todos'):
+        """Compras filtradas do cache/planilha (erros de leitura são propagados)"""
+        dados = self._registros(SHEET_DATABASE)
+        cartao = cartao.lower() if cartao else None
+        
+        # Filtrar
+        resultado = []
+        for compra in dados:
+            if cartao and compra.cartao.lower() != cartao:
+                continue
+            if status != 'todos' and compra.status != status:
+                continue
+            resultado.append(compra)
+        
+        return resultado
+    
     def atualizar_aba_visual(self):
         """
         Atualiza a aba visual mantendo o layout colorido e organizado
+        
+        O layout inteiro é montado em memória e enviado de uma vez
+        (um clear + um values_batch_update), independente do número de compras.
+        Se a leitura das compras falhar a aba não é limpa e o retorno é False,
+        para a reconstrução ficar pendente (ver sincronizar_visual).
+        
+        Returns:
+            bool: True se a aba foi reconstruída
         """
         try:
-            ws_visual = self.spreadsheet.worksheet(SHEET_VISUAL)
-            ws_db = self.spreadsheet.worksheet(SHEET_DATABASE)
-            
-            # Buscar dados ativos
-            compras = self.listar_compras(status='ativo')
+            # Buscar dados ativos (antes do clear: erro de leitura não apaga a aba)
+            compras = self._ler_compras(status='ativo')
             
             # Agrupar por cartão
             cartoes = {}
             for compra in compras:
-                cartao = compra['Cartão']
+                cartao = compra.cartao
                 if cartao not in cartoes:
                     cartoes[cartao] = []
                 cartoes[cartao].append(compra)
             
-            # Limpar planilha visual
-            ws_visual.clear()
-            
-            # Construir layout visual
-            linha_atual = 1
+            # Construir layout visual em memória
+            linhas = []
             
             for cartao, lista_compras in cartoes.items():
                 # Cabeçalho do cartão
-                ws_visual.update(f'A{linha_atual}', [[f'═══ {cartao.upper()} ═══']])
-                linha_atual += 1
+                linhas.append([f'═══ {cartao.upper()} ═══', ''])
                 
                 # Cabeçalhos de colunas
-                ws_visual.update(f'A{linha_atual}:B{linha_atual}', [['Compra', 'Valor']])
-                linha_atual += 1
+                linhas.append(['Compra', 'Valor'])
                 
                 # Compras do cartão
                 total_cartao = 0
                 for compra in lista_compras:
-                    descricao_com_parcela = f"{compra['Descrição']} {compra['Parcela Atual']}/{compra['Total Parcelas']}"
-                    valor_parcela = compra.get('Valor Parcela', compra.get('Valor', 0))
-                    valor_formatado = CURRENCY_FORMAT.format(valor_parcela)
-                    
-                    ws_visual.update(f'A{linha_atual}:B{linha_atual}', [
-                        [descricao_com_parcela, valor_formatado]
-                    ])
-                    
-                    total_cartao += valor_parcela
-                    linha_atual += 1
+                    descricao_com_parcela = f"{compra.descricao} {compra.parcela_atual}/{compra.total_parcelas}"
+                    linhas.append([descricao_com_parcela, CURRENCY_FORMAT.format(compra.valor_parcela)])
+                    total_cartao += compra.valor_parcela
                 
                 # Total do cartão
-                ws_visual.update(f'A{linha_atual}:B{linha_atual}', [
-                    ['TOTAL', CURRENCY_FORMAT.format(total_cartao)]
-                ])
-                linha_atual += 2  # Espaço entre cartões
+                linhas.append(['TOTAL', CURRENCY_FORMAT.format(total_cartao)])
+                linhas.append(['', ''])  # Espaço entre cartões
+            
+            # Limpar planilha visual e enviar o layout numa única requisição
+            self._chamar_aba(SHEET_VISUAL, 'clear')
+            if linhas:
+                self.api.executar(self.spreadsheet.values_batch_update, {
+                    'valueInputOption': 'RAW',
+                    'data': [{
+                        'range': f"'{SHEET_VISUAL}'!A1:B{len(linhas)}",
+                        'values': linhas
+                    }]
+                })
             
             print("✅ Aba visual atualizada")
             return True
@@ -252,16 +602,104 @@ class SheetsManager:
             print(f"❌ Erro ao atualizar aba visual: {e}")
             return False
     
+    def marcar_visual_sujo(self):
+        """
+        Agenda a reconstrução da aba visual sem bloquear quem escreveu
+        
+        Escritas em sequência são agrupadas: a aba só é reconstruída depois de
+        VISUAL_DEBOUNCE_SECONDS sem novas escritas (ou VISUAL_MAX_DELAY_SECONDS
+        após a primeira escrita pendente), então dez adições seguidas geram uma
+        única reconstrução.
+        """
+        with self._lock:
+            if self._fechado:
+                return
+            agora = time.monotonic()
+            if self._visual_sujo_desde is None:
+                self._visual_sujo_desde = agora
+            
+            espera = min(
+                VISUAL_DEBOUNCE_SECONDS,
+                max(0, self._visual_sujo_desde + VISUAL_MAX_DELAY_SECONDS - agora)
+            )
+            
+            if self._visual_timer is not None:
+                self._visual_timer.cancel()
+            self._visual_timer = threading.Timer(espera, self.sincronizar_visual)
+            self._visual_timer.daemon = True
+            self._visual_timer.start()
+    
+    @_em_segundo_plano
+    def sincronizar_visual(self):
+        """
+        Reconstrói a aba visual agora, se houver escritas pendentes
+        
+        Returns:
+            bool: False se a reconstrução falhou (fica pendente para nova tentativa)
+        """
+        with self._visual_lock:
+            with self._lock:
+                if self._visual_sujo_desde is None:
+                    return True
+                self._visual_sujo_desde = None
+                if self._visual_timer is not None:
+                    self._visual_timer.cancel()
+                    self._visual_timer = None
+            
+            if self.atualizar_aba_visual():
+                return True
+        
+        self.marcar_visual_sujo()
+        return False
+    
+    def fechar(self):
+        """
+        Envia o outbox e a reconstrução visual pendentes e libera os arquivos locais
+        
+        Daí em diante as escritas são recusadas (RuntimeError): quem ainda
+        tiver esta instância, como um comando em andamento quando ela foi
+        despejada do pool, não grava num outbox que ninguém mais envia.
+        """
+        with self._lock:
+            if self._fechado:
+                return
+            self._fechado = True
+        
+        if self._outbox_worker is not None:
+            self._outbox_worker.parar()
+        
+        with self._lock:
+            if self._visual_timer is not None:
+                self._visual_timer.cancel()
+                self._visual_timer = None
+        with self._visual_lock:
+            with self._lock:
+                pendente = self._visual_sujo_desde is not None
+                self._visual_sujo_desde = None
+            if pendente:
+                self.atualizar_aba_visual()
+        self._fechar_historico()
+        
+        # O que não foi enviado continua no arquivo e é reenviado na próxima abertura
+        with self._lock:
+            if self._outbox is not None:
+                self._outbox.fechar()
+                self._outbox = None
+    
     def adicionar_receita(self, descricao, valor, tipo='Salário'):
         """Adiciona uma receita"""
         try:
-            ws_receitas = self.spreadsheet.worksheet(SHEET_RECEITAS)
-            
-            todas_linhas = ws_receitas.get_all_values()
-            novo_id = len(todas_linhas)
+            novo_id = self._gerar_ids(SHEET_RECEITAS)
             agora = datetime.now().strftime('%Y-%m-%d')
             
-            ws_receitas.append_row([novo_id, descricao, valor, agora, tipo])
+            receita = Receita(novo_id, descricao, valor, agora, tipo)
+            linha = receita.para_linha()
+            with self._lock_totais:
+                self._gravar(
+                    SHEET_RECEITAS, [receita],
+                    lambda: self._chamar_aba(SHEET_RECEITAS, 'append_row', linha)
+                )
+                self.agregados.adicionar_receita(receita)
             
             print(f"✅ Receita adicionada: {descricao} - {CURRENCY_FORMAT.format(valor)}")
             return True
@@ -270,80 +708,197 @@ class SheetsManager:
             print(f"❌ Erro ao adicionar receita: {e}")
             return False
     
-    def calcular_resumo(self):
+    def listar_receitas(self):
         """
-        Calcula resumo financeiro do mês atual
+        Lista todas as receitas
         
         Returns:
-            dict: Resumo com receitas, despesas e saldo
+            list: Lista de Receita
         """
         try:
-            # Buscar receitas
-            ws_receitas = self.spreadsheet.worksheet(SHEET_RECEITAS)
-            receitas_data = ws_receitas.get_all_records()
-            total_receitas = sum(r['Valor'] for r in receitas_data)
+            return self._ler_receitas()
+            
+        except Exception as e:
+            print(f"❌ Erro ao listar receitas: {e}")
+            return []
+    
+    def _ler_receitas(self):
+        """Receitas do cache/planilha (erros de leitura são propagados)"""
+        return self._registros(SHEET_RECEITAS)
+    
+    def _upsert_remoto(self, nome_aba, registros):
+        """
+        Grava registros completos na planilha, fazendo upsert pelo ID
+        
+        Linhas cujo ID já existe na aba são sobrescritas (um batch_update) e as
+        demais são acrescentadas (um append_rows). Repetir a mesma chamada não
+        duplica linhas, o que permite reenviar o outbox após uma falha.
+        Não mexe no cache (quem chama já refletiu a escrita nele).
+        
+        Args:
+            nome_aba (str): Aba de destino
+            registros (list): Compra / Receita da aba
+        """
+        cabecalho = CABECALHOS[nome_aba]
+        ultima_coluna = chr(ord('A') + len(cabecalho) - 1)
+        
+        # Posição atual de cada ID, lendo só a coluna A (linhas em branco ficam de fora)
+        posicoes = {
+            str(valor): i
+            for i, valor in enumerate(self._chamar_aba(nome_aba, 'col_values', 1), start=1)
+            if i > 1 and str(valor).strip()
+        }
+        
+        atualizacoes = []
+        novas = []
+        for registro in registros:
+            if not id_valido(registro.id):
+                continue  # Linha sem ID (apagada à mão): não é um registro
+            linha = registro.para_linha()
+            posicao = posicoes.get(str(registro.id))
+            if posicao:
+                atualizacoes.append({
+                    'range': f'A{posicao}:{ultima_coluna}{posicao}',
+                    'values': [linha]
+                })
+            else:
+                novas.append(linha)
+        
+        if atualizacoes:
+            self._chamar_aba(nome_aba, 'batch_update', atualizacoes)
+        if novas:
+            self._chamar_aba(nome_aba, 'append_rows', novas)
+    
+    @_em_segundo_plano
+    def _replicar(self, nome_aba, registros):
+        """Envio do outbox: upsert na planilha com prioridade de segundo plano"""
+        modelo = MODELOS[nome_aba]
+        self._upsert_remoto(nome_aba, [modelo.de_registro(r) for r in registros])
+    
+    def espelhar_compras(self, compras):
+        """
+        Replica compras na aba Database (upsert pelo ID)
+        
+        Args:
+            compras (list): Lista de Compra
             
-            # Buscar despesas ativas
-            compras = self.listar_compras(status='ativo')
-            total_despesas = sum(c.get('Valor Parcela', c.get('Valor', 0)) for c in compras)
+        Returns:
+            bool: True se gravou
+        """
+        try:
+            with self._lock_totais:
+                self._gravar(
+                    SHEET_DATABASE, compras,
+                    lambda: self._upsert_remoto(SHEET_DATABASE, compras)
+                )
+                # Upsert de registros que podem já existir: os totais são refeitos sob demanda
+                self.agregados.invalidar()
+            self.marcar_visual_sujo()
+            return True
             
-            # Agrupar despesas por cartão
-            por_cartao = {}
-            for compra in compras:
-                cartao = compra['Cartão']
-                if cartao not in por_cartao:
-                    por_cartao[cartao] = 0
-                valor_parcela = compra.get('Valor Parcela', compra.get('Valor', 0))
-                por_cartao[cartao] += valor_parcela
+        except Exception as e:
+            print(f"❌ Erro ao espelhar compras: {e}")
+            return False
+    
+    def espelhar_receitas(self, receitas):
+        """
+        Replica receitas na aba Receitas (upsert pelo ID)
+        
+        Args:
+            receitas (list): Lista de Receita
             
-            return {
-                'receitas': total_receitas,
-                'despesas': total_despesas,
-                'saldo': total_receitas - total_despesas,
-                'por_cartao': por_cartao,
-                'total_compras': len(compras)
-            }
+        Returns:
+            bool: True se gravou
+        """
+        try:
+            with self._lock_totais:
+                self._gravar(
+                    SHEET_RECEITAS, receitas,
+                    lambda: self._upsert_remoto(SHEET_RECEITAS, receitas)
+                )
+                self.agregados.invalidar()
+            return True
             
         except Exception as e:
-            print(f"❌ Erro ao calcular resumo: {e}")
-            return None
+            print(f"❌ Erro ao espelhar receitas: {e}")
+            return False
     
+    @_em_segundo_plano
     def atualizar_mes(self):
         """
         Atualiza todas as parcelas para o mês atual
         Deve ser executado automaticamente todo dia 1
+        
+        Nada é gravado (nem a fotografia do mês) se a leitura das abas falhar:
+        uma leitura vazia por erro de cota viraria um mês zerado.
+        
+        Returns:
+            dict: atualizadas, finalizadas e data_atualizacao (None em caso de erro)
         """
         try:
-            ws_db = self.spreadsheet.worksheet(SHEET_DATABASE)
-            compras = self.listar_compras(status='todos')
-            
-            atualizadas = 0
-            finalizadas = 0
+            # A escrita é posicional (linha a linha), então relê a aba para não
+            # depender de um cache que possa estar defasado por edições manuais
+            self.invalidar_cache(SHEET_DATABASE)
+            lidas = self._ler_compras()
+            receitas = self._ler_receitas()
             
-            for i, compra in enumerate(compras, start=2):  # Começa na linha 2 (pula cabeçalho)
-                parcela_atual, status = self.calc.calcular_parcela_atual(
-                    compra['Mês Início'],
-                    compra['Parcela Inicial'],
-                    compra['Total Parcelas']
-                )
-                
-                # Atualizar na planilha (Nova estrutura: A=ID, B=Desc, C=ValorTotal, D=ValorParcela, E=ParcInicial, F=TotalParc, G=ParcAtual, H=MesInicio, I=Cartao, J=Status, K=DataCad, L=UltAtualiz)
-                ws_db.update(f'G{i}', [[parcela_atual]])  # Coluna G = Parcela Atual
-                ws_db.update(f'J{i}', [[status]])  # Coluna J = Status
-                ws_db.update(f'L{i}', [[datetime.now().strftime('%Y-%m-%d %H:%M:%S')]])  # Coluna L = Última Atualização
-                
-                if status == 'concluido':
-                    finalizadas += 1
-                else:
-                    atualizadas += 1
+            agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            hoje = self.calc.mes_atual()
+            
+            # Linha de cada compra na aba (2 em diante, pula cabeçalho). Linhas
+            # sem ID (apagadas à mão) ficam como estão: não são compras
+            posicoes = [linha for linha, compra in enumerate(lidas, start=2) if id_valido(compra.id)]
+            compras = [compra for compra in lidas if id_valido(compra.id)]
+            
+            # Calcular os novos valores de todas as linhas antes de escrever (vetorizado)
+            parcelas, situacoes = self._recalcular_parcelas(compras, hoje=hoje)
+            finalizadas = situacoes.count('concluido')
+            atualizadas = len(situacoes) - finalizadas
+            
+            parcelas_col = [[parcela] for parcela in parcelas]
+            status_col = [[status] for status in situacoes]
+            atualizacao_col = [[agora]] * len(compras)
+            
+            # Registros completos já atualizados (para o outbox e o cache)
+            atualizados = [
+                compra.copiar(parcela_atual=parcela, status=status, ultima_atualizacao=agora)
+                for compra, parcela, status in zip(compras, parcelas, situacoes)
+            ]
             
-            # Atualizar aba visual
-            self.atualizar_aba_visual()
+            def enviar_colunas():
+                # Enviar as três colunas numa única requisição, um intervalo por
+                # trecho de linhas seguidas (as linhas em branco são puladas)
+                # Estrutura: A=ID, B=Desc, C=ValorTotal, D=ValorParcela, E=ParcInicial, F=TotalParc,
+                # G=ParcAtual, H=MesInicio, I=Cartao, J=Status, K=DataCad, L=UltAtualiz
+                dados = []
+                inicio = 0
+                for i in range(1, len(posicoes) + 1):
+                    if i < len(posicoes) and posicoes[i] == posicoes[i - 1] + 1:
+                        continue
+                    primeira, ultima = posicoes[inicio], posicoes[i - 1]
+                    dados += [
+                        {'range': f'G{primeira}:G{ultima}', 'values': parcelas_col[inicio:i]},  # Parcela Atual
+                        {'range': f'J{primeira}:J{ultima}', 'values': status_col[inicio:i]},  # Status
+                        {'range': f'L{primeira}:L{ultima}', 'values': atualizacao_col[inicio:i]},  # Última Atualização
+                    ]
+                    inicio = i
+                self._chamar_aba(SHEET_DATABASE, 'batch_update', dados)
+            
+            if compras:
+                with self._lock_totais:
+                    self._gravar(SHEET_DATABASE, atualizados, enviar_colunas)
+                    self._agregar_atualizacoes(compras, atualizados)
+            
+            # Aba visual é reconstruída em segundo plano
+            self.marcar_visual_sujo()
+            
+            # Fotografia do mês que terminou
+            self._registrar_mes_anterior(atualizados, receitas, hoje)
             
             resultado = {
                 'atualizadas': atualizadas,
                 'finalizadas': finalizadas,
-                'data_atualizacao': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'data_atualizacao': agora
             }
             
             print(f"✅ Mês atualizado: {atualizadas} ativas, {finalizadas} finalizadas")
@@ -365,46 +920,30 @@ class SheetsManager:
             dict: Resultado da importação
         """
         try:
-            sucesso = 0
-            erros = 0
-            
-            for dados in dados_lista:
-                try:
-                    # Calcular mês de início baseado na parcela atual
-                    mes_inicio = self.calc.calcular_mes_inicio(
-                        dados['parcela_atual'],
-                        dados['total_parcelas']
-                    )
-                    
-                    # O usuário informou o valor DA PARCELA na importação
-                    valor_parcela = dados['valor_parcela']
-                    total_parcelas = dados['total_parcelas']
-                    
-                    # Calcular valor total da compra
-                    valor_total = valor_parcela * total_parcelas
-                    
-                    # Adicionar compra (parcela_inicial sempre 1, o sistema calcula a atual baseado no mes_inicio)
-                    resultado = self.adicionar_compra(
-                        descricao=dados['descricao'],
-                        valor_total=valor_total,
-                        valor_parcela=valor_parcela,
-                        parcela_inicial=1,
-                        total_parcelas=total_parcelas,
-                        cartao=dados['cartao'],
-                        categoria=dados.get('categoria', 'Geral')
+            agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            compras, erros = self._preparar_importacao(dados_lista, agora)
+            
+            # Reservar os IDs do lote de uma vez
+            if compras:
+                primeiro_id = self._gerar_ids(SHEET_DATABASE, len(compras))
+                for i, compra in enumerate(compras):
+                    compra.id = primeiro_id + i
+            linhas = [compra.para_linha() for compra in compras]
+            
+            # Enviar todas as linhas numa única requisição e atualizar o visual uma vez
+            if linhas:
+                with self._lock_totais:
+                    self._gravar(
+                        SHEET_DATABASE, compras,
+                        lambda: self._chamar_aba(SHEET_DATABASE, 'append_rows', linhas)
                     )
-                    
-                    if resultado:
-                        sucesso += 1
-                    else:
-                        erros += 1
-                        
-                except Exception as e:
-                    print(f"❌ Erro ao importar {dados.get('descricao', 'item')}: {e}")
-                    erros += 1
+                    self._agregar_compras(compras)
+                self.marcar_visual_sujo()
             
+            print(f"✅ Importação concluída: {len(linhas)} compras")
             return {
-                'sucesso': sucesso,
+                'sucesso': len(linhas),
                 'erros': erros,
                 'total': len(dados_lista)
             }
@@ -0,0 +1,379 @@
+"""
+Armazenamento local em SQLite
+Mesmas operações do SheetsManager com latência de disco local;
+a planilha do Google Sheets pode ser usada como espelho opcional
+"""
+import sqlite3
+import threading
+from datetime import datetime
+from config import CURRENCY_FORMAT, HISTORICO_PATH
+from storage import Storage
+from models import Compra, Receita
+
+# Colunas das tabelas, na mesma ordem dos cabeçalhos
+COLUNAS_COMPRAS = [
+    'id', 'descricao', 'valor_total', 'valor_parcela', 'parcela_inicial', 'total_parcelas',
+    'parcela_atual', 'mes_inicio', 'cartao', 'status',
+    'data_cadastro', 'ultima_atualizacao', 'categoria', 'observacoes'
+]
+COLUNAS_RECEITAS = ['id', 'descricao', 'valor', 'data', 'tipo']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS compras (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    descricao TEXT NOT NULL,
+    valor_total REAL NOT NULL,
+    valor_parcela REAL NOT NULL,
+    parcela_inicial INTEGER NOT NULL,
+    total_parcelas INTEGER NOT NULL,
+    parcela_atual INTEGER NOT NULL,
+    mes_inicio TEXT NOT NULL,
+    cartao TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data_cadastro TEXT,
+    ultima_atualizacao TEXT,
+    categoria TEXT DEFAULT 'Geral',
+    observacoes TEXT DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_compras_cartao ON compras (cartao COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_compras_status ON compras (status);
+CREATE INDEX IF NOT EXISTS idx_compras_mes_inicio ON compras (mes_inicio);
+
+CREATE TABLE IF NOT EXISTS receitas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    descricao TEXT NOT NULL,
+    valor REAL NOT NULL,
+    data TEXT,
+    tipo TEXT
+);
+"""
+
+
+class SQLiteStorage(Storage):
+    """Armazenamento das compras e receitas num arquivo SQLite local"""
+    
+    def __init__(self, caminho, espelho=None, caminho_historico=HISTORICO_PATH):
+        """
+        Args:
+            caminho (str): Arquivo do banco (':memory:' para testes)
+            espelho (SheetsManager): Planilha que recebe uma cópia das escritas (opcional)
+            caminho_historico (str): Histórico mensal deste banco
+        """
+        super().__init__()
+        self.caminho = caminho
+        self.caminho_historico = caminho_historico
+        self.espelho = espelho
+        # Uma conexão compartilhada entre as threads do AsyncStorage, serializada pelo lock
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        if caminho != ':memory:':
+            self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+    
+    def inicializar(self):
+        """
+        Garante as tabelas/índices e prepara o espelho
+        
+        O espelho grava por ID, então só é usado se os IDs da planilha vierem
+        deste banco (ver _conferir_espelho). Se não der para conferir, ele fica
+        desligado e o retorno é False.
+        
+        Returns:
+            bool: True se o banco e o espelho (se houver) estão prontos
+        """
+        pronto = True
+        if self.espelho is not None:
+            try:
+                if not self.espelho.inicializar():
+                    raise RuntimeError("abas da planilha indisponíveis")
+                usar_espelho = self._conferir_espelho()
+            except Exception as e:
+                print(f"❌ Erro ao preparar o espelho, espelhamento desligado: {e}")
+                pronto = usar_espelho = False
+            if not usar_espelho:
+                self.espelho.fechar()
+                self.espelho = None
+        print("✅ Banco SQLite pronto")
+        return pronto
+    
+    def _conferir_espelho(self):
+        """
+        Evita que o espelho sobrescreva linhas que não vieram deste banco
+        
+        - Banco vazio e planilha com dados: o banco é semeado com as linhas da
+          planilha mantendo os IDs (o AUTOINCREMENT continua do maior deles)
+        - Planilha com linhas que não vieram do banco (ID que ele não tem, ou o
+          mesmo ID com outra compra): o espelho é recusado, pois as escritas do
+          banco sobrescreveriam essas linhas
+        
+        Returns:
+            bool: True se o espelho pode ser usado
+        """
+        compras = self.espelho._ler_compras()
+        receitas = self.espelho._ler_receitas()
+        if not compras and not receitas:
+            return True
+        
+        with self._lock:
+            vazio = not any(
+                self.conn.execute(f'SELECT 1 FROM {tabela} LIMIT 1').fetchone()
+                for tabela in ('compras', 'receitas')
+            )
+            if vazio:
+                with self.conn:
+                    self.conn.executemany(
+                        f"INSERT INTO compras ({', '.join(COLUNAS_COMPRAS)}) "
+                        f"VALUES ({', '.join('?' * len(COLUNAS_COMPRAS))})",
+                        [c.para_linha() for c in compras]
+                    )
+                    self.conn.executemany(
+                        f"INSERT INTO receitas ({', '.join(COLUNAS_RECEITAS)}) "
+                        f"VALUES ({', '.join('?' * len(COLUNAS_RECEITAS))})",
+                        [r.para_linha() for r in receitas]
+                    )
+                print(f"✅ Banco semeado da planilha: {len(compras)} compras, {len(receitas)} receitas")
+                return True
+            
+            # Descrição e data de cadastro não mudam depois de gravadas: uma linha
+            # com o mesmo ID e outros valores é de outro banco (ou da planilha)
+            estranhos = 0
+            for tabela, data, registros, chave in (
+                ('compras', 'data_cadastro', compras, lambda c: (c.descricao, c.data_cadastro)),
+                ('receitas', 'data', receitas, lambda r: (r.descricao, r.data))
+            ):
+                nossos = {
+                    linha[0]: (linha[1], linha[2])
+                    for linha in self.conn.execute(f'SELECT id, descricao, {data} FROM {tabela}')
+                }
+                estranhos += sum(1 for r in registros if nossos.get(r.id) != chave(r))
+        
+        if estranhos:
+            print(f"⚠️ A planilha tem {estranhos} linha(s) que não vieram deste banco; "
+                  "espelhamento desligado para não sobrescrevê-las")
+            return False
+        return True
+    
+    def _inserir_compras(self, compras):
+        """Insere compras numa transação e preenche o id de cada uma"""
+        with self._lock, self.conn:
+            for compra in compras:
+                cursor = self.conn.execute(
+                    f"INSERT INTO compras ({', '.join(COLUNAS_COMPRAS[1:])}) "
+                    f"VALUES ({', '.join('?' * (len(COLUNAS_COMPRAS) - 1))})",
+                    compra.para_linha()[1:]
+                )
+                compra.id = cursor.lastrowid
+    
+    def _espelhar_compras(self, compras):
+        """Replica as compras na planilha, se houver espelho"""
+        if self.espelho is not None and compras:
+            self.espelho.espelhar_compras(compras)
+    
+    def adicionar_compra(self, descricao, valor_total, valor_parcela, parcela_inicial, total_parcelas, cartao, categoria='Geral'):
+        """
+        Adiciona nova compra parcelada
+        
+        Args:
+            descricao (str): Descrição da compra
+            valor_total (float): Valor total da compra
+            valor_parcela (float): Valor de cada parcela mensal
+            parcela_inicial (int): Parcela inicial (geralmente 1)
+            total_parcelas (int): Total de parcelas
+            cartao (str): Nome do cartão
+            categoria (str): Categoria da compra
+        
+        Returns:
+            Compra: Compra adicionada
+        """
+        try:
+            hoje = self.calc.mes_atual()
+            mes_inicio = self.calc.calcular_mes_inicio(parcela_inicial, total_parcelas, hoje=hoje)
+            agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            compra = self._montar_compra(
+                None, descricao, valor_total, valor_parcela, parcela_inicial,
+                total_parcelas, mes_inicio, cartao, categoria, agora, hoje=hoje
+            )
+            with self._lock_totais:
+                self._inserir_compras([compra])
+                self._agregar_compras([compra])
+            self._espelhar_compras([compra])
+            
+            print(f"✅ Compra adicionada: {descricao} - {compra.parcela_atual}/{total_parcelas}")
+            return compra
+        
+        except Exception as e:
+            print(f"❌ Erro ao adicionar compra: {e}")
+            return None
+    
+    def listar_compras(self, cartao=None, status='ativo'):
+        """
+        Lista compras filtradas (usa os índices de cartão e status)
+        
+        Args:
+            cartao (str): Nome do cartão para filtrar (None = todos)
+            status (str): Status para filtrar ('ativo', 'concluido', 'todos')
+        
+        Returns:
+            list: Lista de Compra
+        """
+        try:
+            return self._ler_compras(cartao, status)
+        
+        except Exception as e:
+            print(f"❌ Erro ao listar compras: {e}")
+            return []
+    
+    def _ler_compras(self, cartao=None, status='todos'):
+        """Consulta as compras filtradas (erros do banco são propagados)"""
+        condicoes = []
+        parametros = []
+        if cartao:
+            condicoes.append('cartao = ? COLLATE NOCASE')
+            parametros.append(cartao)
+        if status != 'todos':
+            condicoes.append('status = ?')
+            parametros.append(status)
+        
+        sql = f"SELECT {', '.join(COLUNAS_COMPRAS)} FROM compras"
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        sql += ' ORDER BY id'
+        
+        with self._lock:
+            linhas = self.conn.execute(sql, parametros).fetchall()
+        return [Compra.de_linha(linha) for linha in linhas]
+    
+    def importar_dados(self, dados_lista):
+        """
+        Importa múltiplas compras numa única transação
+        
+        Args:
+            dados_lista (list): Lista de dicts com dados das compras
+                Formato: {'descricao', 'valor_parcela', 'parcela_atual', 'total_parcelas', 'cartao'}
+        
+        Returns:
+            dict: Resultado da importação
+        """
+        try:
+            agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            compras, erros = self._preparar_importacao(dados_lista, agora)
+            
+            with self._lock_totais:
+                self._inserir_compras(compras)
+                self._agregar_compras(compras)
+            self._espelhar_compras(compras)
+            
+            print(f"✅ Importação concluída: {len(compras)} compras")
+            return {
+                'sucesso': len(compras),
+                'erros': erros,
+                'total': len(dados_lista)
+            }
+        
+        except Exception as e:
+            print(f"❌ Erro na importação: {e}")
+            return None
+    
+    def atualizar_mes(self):
+        """
+        Atualiza todas as parcelas para o mês atual numa única transação
+        
+        Nada é gravado (nem a fotografia do mês) se a leitura do banco falhar.
+        
+        Returns:
+            dict: atualizadas, finalizadas e data_atualizacao (None em caso de erro)
+        """
+        try:
+            agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            compras = self._ler_compras()
+            receitas = self._ler_receitas()
+            hoje = self.calc.mes_atual()
+            
+            # Calcular os novos valores de todas as linhas (vetorizado)
+            parcelas, situacoes = self._recalcular_parcelas(compras, hoje=hoje)
+            finalizadas = situacoes.count('concluido')
+            atualizadas = len(situacoes) - finalizadas
+            
+            atualizados = [
+                compra.copiar(parcela_atual=parcela_atual, status=status, ultima_atualizacao=agora)
+                for compra, parcela_atual, status in zip(compras, parcelas, situacoes)
+            ]
+            
+            with self._lock_totais:
+                with self._lock, self.conn:
+                    self.conn.executemany(
+                        'UPDATE compras SET parcela_atual = ?, status = ?, ultima_atualizacao = ? WHERE id = ?',
+                        [(c.parcela_atual, c.status, c.ultima_atualizacao, c.id) for c in atualizados]
+                    )
+                self._agregar_atualizacoes(compras, atualizados)
+            
+            if self.espelho is not None and atualizados:
+                self.espelho.espelhar_compras(atualizados)
+            
+            # Fotografia do mês que terminou
+            self._registrar_mes_anterior(atualizados, receitas, hoje)
+            
+            print(f"✅ Mês atualizado: {atualizadas} ativas, {finalizadas} finalizadas")
+            return {
+                'atualizadas': atualizadas,
+                'finalizadas': finalizadas,
+                'data_atualizacao': agora
+            }
+        
+        except Exception as e:
+            print(f"❌ Erro ao atualizar mês: {e}")
+            return None
+    
+    def adicionar_receita(self, descricao, valor, tipo='Salário'):
+        """Adiciona uma receita"""
+        try:
+            agora = datetime.now().strftime('%Y-%m-%d')
+            with self._lock_totais:
+                with self._lock, self.conn:
+                    cursor = self.conn.execute(
+                        'INSERT INTO receitas (descricao, valor, data, tipo) VALUES (?, ?, ?, ?)',
+                        (descricao, valor, agora, tipo)
+                    )
+                receita = Receita(cursor.lastrowid, descricao, valor, agora, tipo)
+                self.agregados.adicionar_receita(receita)
+            
+            if self.espelho is not None:
+                self.espelho.espelhar_receitas([receita])
+            
+            print(f"✅ Receita adicionada: {descricao} - {CURRENCY_FORMAT.format(valor)}")
+            return True
+        
+        except Exception as e:
+            print(f"❌ Erro ao adicionar receita: {e}")
+            return False
+    
+    def listar_receitas(self):
+        """
+        Lista todas as receitas
+        
+        Returns:
+            list: Lista de Receita
+        """
+        try:
+            return self._ler_receitas()
+        
+        except Exception as e:
+            print(f"❌ Erro ao listar receitas: {e}")
+            return []
+    
+    def _ler_receitas(self):
+        """Consulta todas as receitas (erros do banco são propagados)"""
+        with self._lock:
+            linhas = self.conn.execute(
+                f"SELECT {', '.join(COLUNAS_RECEITAS)} FROM receitas ORDER BY id"
+            ).fetchall()
+        return [Receita.de_linha(linha) for linha in linhas]
+    
+    def fechar(self):
+        """Fecha o banco e envia as escritas pendentes do espelho"""
+        if self.espelho is not None:
+            self.espelho.fechar()
+        self._fechar_historico()
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,481 @@
+"""
+Interface de armazenamento do bot
+Define as operações de persistência usadas pelos comandos e escolhe o backend configurado
+"""
+import threading
+from abc import ABC, abstractmethod
+from config import (
+    STORAGE_BACKEND, SQLITE_PATH, SHEETS_MIRROR, HISTORICO_PATH,
+    SPREADSHEET_ID, CHAT_SPREADSHEETS, TENANT_POOL_SIZE, OUTBOX_PATH
+)
+from calculator import ParcelCalculator, ordinal_para_mes
+from models import Compra, CABECALHO_DATABASE, CABECALHO_RECEITAS
+from agregados import Agregados
+from historico import HistoricoMensal
+from metricas import metricas
+
+
+class Storage(ABC):
+    """
+    Base dos backends de armazenamento
+    
+    Os backends implementam os métodos abstratos e devolvem compras e
+    receitas como registros Compra / Receita (convertidos uma vez ao ler do
+    armazenamento). As operações públicas seguem a convenção do bot de
+    imprimir o erro e devolver None/False/[] em caso de falha; _ler_compras e
+    _ler_receitas propagam o erro para quem não pode confundir falha com vazio.
+    """
+    
+    def __init__(self):
+        self.calc = ParcelCalculator()
+        # Totais corridos do resumo (ver calcular_resumo)
+        self.agregados = Agregados()
+        self._versao_agregados = None
+        # Uma escrita (registro + diferença nos totais) e o recálculo dos totais
+        # não se intercalam: o recálculo que lesse o registro já gravado e depois
+        # recebesse a diferença contaria a compra duas vezes
+        self._lock_totais = threading.RLock()
+        # Fotografias mensais (aberto no primeiro uso)
+        self.historico = None
+        self.caminho_historico = HISTORICO_PATH
+    
+    @abstractmethod
+    def inicializar(self):
+        """Prepara o armazenamento para uso (abas, tabelas, índices)"""
+    
+    @abstractmethod
+    def adicionar_compra(self, descricao, valor_total, valor_parcela, parcela_inicial, total_parcelas, cartao, categoria='Geral'):
+        """Adiciona nova compra parcelada e retorna a Compra (ou None)"""
+    
+    @abstractmethod
+    def listar_compras(self, cartao=None, status='ativo'):
+        """Lista compras filtradas por cartão e status ('ativo', 'concluido', 'todos')"""
+    
+    @abstractmethod
+    def _ler_compras(self, cartao=None, status='todos'):
+        """Como listar_compras, mas propaga o erro de leitura em vez de devolver []"""
+    
+    @abstractmethod
+    def importar_dados(self, dados_lista):
+        """Importa múltiplas compras e retorna {'sucesso', 'erros', 'total'} (ou None)"""
+    
+    @abstractmethod
+    def atualizar_mes(self):
+        """Recalcula parcela atual e status de todas as compras para o mês atual"""
+    
+    @abstractmethod
+    def adicionar_receita(self, descricao, valor, tipo='Salário'):
+        """Adiciona uma receita e retorna True/False"""
+    
+    @abstractmethod
+    def listar_receitas(self):
+        """Lista todas as receitas"""
+    
+    @abstractmethod
+    def _ler_receitas(self):
+        """Como listar_receitas, mas propaga o erro de leitura em vez de devolver []"""
+    
+    def fechar(self):
+        """Libera recursos e envia escritas pendentes antes de encerrar"""
+    
+    def _versao_dados(self):
+        """
+        Identifica a versão dos dados de onde os totais foram calculados
+        
+        Enquanto for a mesma, só o bot escreveu nos dados e os totais corridos
+        continuam certos. None = dados recarregados/defasados (recalcular).
+        """
+        return 0
+    
+    def recalcular_agregados(self):
+        """
+        Refaz os totais corridos a partir dos registros
+        
+        Returns:
+            bool: True se os totais que existiam tinham divergido dos dados
+        
+        Raises:
+            Exception: Erro ao ler compras/receitas (os totais não são alterados)
+        """
+        with self._lock_totais:
+            anterior = self.agregados.resumo() if self.agregados.carregado else None
+            compras = self._ler_compras()
+            receitas = self._ler_receitas()
+            self.agregados.recalcular(compras, receitas)
+            self._versao_agregados = self._versao_dados()
+        
+        divergiu = anterior is not None and Agregados.diferentes(anterior, self.agregados.resumo())
+        if divergiu:
+            print("⚠️ Totais do resumo divergiam dos dados e foram recalculados")
+        return divergiu
+    
+    def _agregar_compras(self, compras):
+        """Soma compras novas nos totais corridos"""
+        for compra in compras:
+            self.agregados.adicionar_compra(compra)
+    
+    def _agregar_atualizacoes(self, antigas, novas):
+        """Troca nos totais corridos as versões antigas das compras pelas novas"""
+        for antiga, nova in zip(antigas, novas):
+            self.agregados.substituir_compra(antiga, nova)
+    
+    def calcular_resumo(self, recalcular=False):
+        """
+        Calcula resumo financeiro do mês atual
+        
+        Os totais são mantidos a cada escrita, então normalmente isto é só uma
+        consulta; o recálculo completo acontece na primeira chamada, quando os
+        dados foram recarregados do armazenamento ou quando pedido.
+        
+        Args:
+            recalcular (bool): Força o recálculo a partir dos registros
+        
+        Returns:
+            dict: Resumo com receitas, despesas e saldo (None se a leitura falhar)
+        """
+        try:
+            versao = self._versao_dados()
+            if (recalcular or not self.agregados.carregado
+                    or versao is None or versao != self._versao_agregados):
+                metricas.cache('resumo', False)
+                self.recalcular_agregados()
+            else:
+                metricas.cache('resumo', True)
+            
+            return self.agregados.resumo()
+        
+        except Exception as e:
+            print(f"❌ Erro ao calcular resumo: {e}")
+            return None
+    
+    def _historico(self):
+        """Histórico mensal, aberto na primeira consulta/gravação"""
+        if self.historico is None:
+            self.historico = HistoricoMensal(self.caminho_historico)
+        return self.historico
+    
+    def _fechar_historico(self):
+        if self.historico is not None:
+            self.historico.fechar()
+            self.historico = None
+    
+    def _fotografar_mes(self, compras, receitas, mes):
+        """
+        Monta o resumo de um mês a partir dos registros
+        
+        As parcelas são recalculadas para o mês pedido (não para o atual), então
+        o resultado independe de quando a virada foi executada.
+        
+        Args:
+            compras (list): Todas as compras (qualquer status)
+            receitas (list): Todas as receitas
+            mes (int): Ordinal do mês
+        
+        Returns:
+            dict: mes, receitas, despesas, saldo, por_cartao, por_categoria,
+                  total_compras e parcelas ([descrição, cartão, categoria,
+                  parcela, total de parcelas, valor])
+        """
+        chave = ordinal_para_mes(mes)
+        parcelas, situacoes = self._recalcular_parcelas(compras, hoje=mes)
+        
+        despesas = 0
+        por_cartao = {}
+        por_categoria = {}
+        lista = []
+        for compra, parcela, status in zip(compras, parcelas, situacoes):
+            if status != 'ativo':
+                continue
+            despesas += compra.valor_parcela
+            por_cartao[compra.cartao] = por_cartao.get(compra.cartao, 0) + compra.valor_parcela
+            por_categoria[compra.categoria] = por_categoria.get(compra.categoria, 0) + compra.valor_parcela
+            lista.append([
+                compra.descricao, compra.cartao, compra.categoria,
+                parcela, compra.total_parcelas, compra.valor_parcela
+            ])
+        
+        total_receitas = sum(r.valor for r in receitas if str(r.data)[:7] == chave)
+        
+        return {
+            'mes': chave,
+            'receitas': round(total_receitas, 2),
+            'despesas': round(despesas, 2),
+            'saldo': round(total_receitas - despesas, 2),
+            'por_cartao': {k: round(v, 2) for k, v in por_cartao.items()},
+            'por_categoria': {k: round(v, 2) for k, v in por_categoria.items()},
+            'total_compras': len(lista),
+            'parcelas': lista
+        }
+    
+    def _registrar_mes_anterior(self, compras, receitas, hoje):
+        """
+        Grava no histórico a fotografia do mês que acabou de terminar
+        Chamado pela virada de mês; um mês já registrado não é regravado
+        
+        Args:
+            compras (list): Todas as compras (qualquer status)
+            receitas (list): Todas as receitas
+            hoje (int): Ordinal do mês atual
+        """
+        self._registrar_meses(compras, receitas, hoje - 1, hoje - 1)
+    
+    def _registrar_meses(self, compras, receitas, desde, ate):
+        """
+        Grava as fotografias dos meses [desde, ate] que ainda não estão no histórico
+        
+        Recebe os registros já lidos: uma leitura que falhou não pode virar
+        uma fotografia zerada.
+        """
+        try:
+            historico = self._historico()
+            for ordinal in range(desde, ate + 1):
+                mes = ordinal_para_mes(ordinal)
+                if historico.obter(mes) is not None:
+                    continue
+                if historico.gravar(mes, self._fotografar_mes(compras, receitas, ordinal)):
+                    print(f"✅ Histórico de {mes} registrado")
+        except Exception as e:
+            print(f"❌ Erro ao registrar histórico do mês: {e}")
+    
+    def registrar_historico(self, desde, ate):
+        """
+        Grava as fotografias de meses cuja virada não aconteceu (bot fora do ar)
+        
+        Args:
+            desde (int): Ordinal do primeiro mês a registrar
+            ate (int): Ordinal do último mês a registrar
+        
+        Raises:
+            Exception: Erro ao ler compras/receitas (nada é gravado)
+        """
+        if desde > ate:
+            return
+        self._registrar_meses(self._ler_compras(), self._ler_receitas(), desde, ate)
+    
+    def resumo_do_mes(self, mes):
+        """
+        Resumo de um mês qualquer e do mesmo mês no ano anterior
+        
+        Meses registrados no histórico são lidos direto dele; os demais (mês em
+        andamento, futuros ou anteriores ao histórico) são calculados na hora.
+        
+        Args:
+            mes (int): Ordinal do mês
+        
+        Returns:
+            dict: {'mes': fotografia, 'ano_anterior': fotografia}, cada uma com
+                  'registrado' indicando se veio do histórico (ou None em erro)
+        """
+        try:
+            historico = self._historico()
+            resultado = {}
+            compras = receitas = None
+            for chave, ordinal in (('mes', mes), ('ano_anterior', mes - 12)):
+                foto = historico.obter(ordinal_para_mes(ordinal))
+                if foto is not None:
+                    foto['registrado'] = True
+                else:
+                    if compras is None:
+                        compras = self._ler_compras()
+                        receitas = self._ler_receitas()
+                    foto = self._fotografar_mes(compras, receitas, ordinal)
+                    foto['registrado'] = False
+                resultado[chave] = foto
+            return resultado
+        
+        except Exception as e:
+            print(f"❌ Erro ao consultar resumo do mês: {e}")
+            return None
+    
+    def _montar_compra(self, novo_id, descricao, valor_total, valor_parcela, parcela_inicial,
+                       total_parcelas, mes_inicio, cartao, categoria, agora, hoje=None):
+        """Monta a Compra já com parcela atual e status calculados"""
+        parcela_atual, status = self.calc.calcular_parcela_atual(
+            mes_inicio, parcela_inicial, total_parcelas, hoje=hoje
+        )
+        
+        return Compra(
+            novo_id, descricao, valor_total, valor_parcela, parcela_inicial, total_parcelas,
+            parcela_atual, mes_inicio, cartao, status,
+            data_cadastro=agora, ultima_atualizacao=agora, categoria=categoria
+        )
+    
+    def _recalcular_parcelas(self, compras, hoje=None):
+        """
+        Calcula parcela atual e status de todas as compras num único passo vetorizado
+        
+        Args:
+            compras (list): Compras (usa o mês de início já convertido em ordinal)
+            hoje (int): Ordinal do mês atual (None = consulta o relógio)
+            
+        Returns:
+            tuple: (parcelas, status) como listas, na ordem das compras
+        """
+        if not compras:
+            return [], []
+        
+        parcelas, status = self.calc.calcular_parcelas_lote({
+            'mes_inicio': [c.mes_inicio_ord for c in compras],
+            'parcela_inicial': [c.parcela_inicial for c in compras],
+            'total_parcelas': [c.total_parcelas for c in compras]
+        }, hoje=hoje)
+        return parcelas.tolist(), status.tolist()
+    
+    def _preparar_importacao(self, dados_lista, agora):
+        """
+        Converte os itens de uma importação em compras (ainda sem ID)
+        
+        Args:
+            dados_lista (list): Lista de dicts recebida em importar_dados
+            agora (str): Data/hora de cadastro
+        
+        Returns:
+            tuple: (lista de compras, quantidade de itens com erro)
+        """
+        compras = []
+        erros = 0
+        # Mês atual resolvido uma vez para toda a importação
+        hoje = self.calc.mes_atual()
+        
+        for dados in dados_lista:
+            try:
+                # Calcular mês de início baseado na parcela atual
+                mes_inicio = self.calc.calcular_mes_inicio(
+                    dados['parcela_atual'],
+                    dados['total_parcelas'],
+                    hoje=hoje
+                )
+                
+                # O usuário informou o valor DA PARCELA na importação
+                valor_parcela = dados['valor_parcela']
+                total_parcelas = dados['total_parcelas']
+                
+                # Calcular valor total da compra
+                valor_total = valor_parcela * total_parcelas
+                
+                # Parcela inicial sempre 1, o sistema calcula a atual baseado no mes_inicio
+                compras.append(self._montar_compra(
+                    None, dados['descricao'], valor_total, valor_parcela, 1,
+                    total_parcelas, mes_inicio, dados['cartao'],
+                    dados.get('categoria', 'Geral'), agora, hoje=hoje
+                ))
+            
+            except Exception as e:
+                print(f"❌ Erro ao importar {dados.get('descricao', 'item')}: {e}")
+                erros += 1
+        
+        return compras, erros
+
+
+def _arquivos_da_planilha(spreadsheet_id):
+    """
+    Arquivos locais de uma planilha: os da planilha padrão (SPREADSHEET_ID) são
+    os configurados; as demais ganham o ID no nome (ver caminho_da_planilha)
+    
+    Returns:
+        dict: caminho_outbox e caminho_historico ({} para a planilha padrão)
+    """
+    from planilhas import caminho_da_planilha
+    
+    if spreadsheet_id is None or spreadsheet_id == SPREADSHEET_ID:
+        return {}
+    return {
+        'caminho_outbox': caminho_da_planilha(OUTBOX_PATH, spreadsheet_id),
+        'caminho_historico': caminho_da_planilha(HISTORICO_PATH, spreadsheet_id)
+    }
+
+
+def criar_storage(spreadsheet_id=None):
+    """
+    Cria o backend configurado em STORAGE_BACKEND
+    
+    - 'sheets': Google Sheets é o armazenamento principal
+    - 'sqlite': SQLite local, com a planilha como espelho opcional (SHEETS_MIRROR)
+    
+    Args:
+        spreadsheet_id (str): Planilha de um chat de CHAT_SPREADSHEETS (None = a
+            padrão). Com 'sqlite', ela tem banco e histórico próprios
+            (gastos-<id>.db, historico-<id>.db) e é a planilha do espelho
+    
+    Returns:
+        Storage: Backend pronto para uso
+    """
+    arquivos = _arquivos_da_planilha(spreadsheet_id)
+    
+    if STORAGE_BACKEND == 'sqlite':
+        from planilhas import caminho_da_planilha
+        from sqlite_storage import SQLiteStorage
+        espelho = None
+        if SHEETS_MIRROR:
+            from sheets_manager import SheetsManager
+            espelho = SheetsManager(spreadsheet_id, **arquivos)
+        if not arquivos:
+            return SQLiteStorage(SQLITE_PATH, espelho=espelho)
+        return SQLiteStorage(
+            caminho_da_planilha(SQLITE_PATH, spreadsheet_id), espelho=espelho,
+            caminho_historico=arquivos['caminho_historico']
+        )
+    
+    from sheets_manager import SheetsManager
+    return SheetsManager(spreadsheet_id, **arquivos)
+
+
+def criar_pool():
+    """
+    Cria o pool de armazenamentos por chat (ver planilhas.PoolPlanilhas)
+    
+    - 'sheets': uma planilha por chat conforme CHAT_SPREADSHEETS (os demais usam
+      SPREADSHEET_ID); as planilhas compartilham o cliente autorizado e o
+      limitador de cota, e cada uma tem seu próprio cache, outbox e histórico
+    - 'sqlite': os chats de CHAT_SPREADSHEETS têm cada um o seu banco
+      (gastos-<id da planilha>.db); os demais usam SQLITE_PATH
+    
+    Nada é conectado aqui: cada planilha (ou o banco) abre no primeiro uso.
+    Se a planilha não abrir, obter() levanta RuntimeError e nada fica no pool.
+    
+    Returns:
+        PoolPlanilhas: Pool pronto para uso
+    """
+    from planilhas import PoolPlanilhas
+    
+    if STORAGE_BACKEND == 'sqlite':
+        def abrir_banco(chave):
+            storage = criar_storage(None if chave == SQLITE_PATH else chave)
+            storage.inicializar()
+            return storage
+        
+        # O banco padrão fica na chave SQLITE_PATH (a mesma do estado da virada
+        # de antes); chats mapeados para SPREADSHEET_ID também usam esse banco
+        mapa = {
+            chat: SQLITE_PATH if spreadsheet_id == SPREADSHEET_ID else spreadsheet_id
+            for chat, spreadsheet_id in CHAT_SPREADSHEETS.items()
+        }
+        return PoolPlanilhas(abrir_banco, mapa, padrao=SQLITE_PATH, tamanho=TENANT_POOL_SIZE)
+    
+    # gspread e o SheetsManager só são importados ao abrir a primeira planilha
+    compartilhado = {'client': None, 'api': None}
+    trava = threading.Lock()
+    
+    def fabrica(spreadsheet_id):
+        from sheets_manager import SheetsManager
+        from sheets_client import ClienteSheets
+        
+        with trava:
+            if compartilhado['api'] is None:
+                compartilhado['api'] = ClienteSheets()
+        api = compartilhado['api']
+        
+        gerenciador = SheetsManager(
+            spreadsheet_id, client=compartilhado['client'], api=api,
+            **_arquivos_da_planilha(spreadsheet_id)
+        )
+        # A primeira planilha autoriza; as seguintes reaproveitam o cliente
+        if gerenciador.client is not None:
+            compartilhado['client'] = gerenciador.client
+        # Uma planilha que não abriu não entra no pool: o próximo uso tenta de novo
+        if not gerenciador.inicializar():
+            gerenciador.fechar()
+            raise RuntimeError(f"não foi possível abrir a planilha {spreadsheet_id}")
+        return gerenciador
+    
+    return PoolPlanilhas(fabrica, CHAT_SPREADSHEETS, padrao=SPREADSHEET_ID, tamanho=TENANT_POOL_SIZE)
@@ -0,0 +1,76 @@
+"""
+Apoio aos testes
+Planilhas no gspread em memória (benchmarks/planilha_falsa.py), sem rede nem
+credenciais, e um relógio fixo para o mês atual
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+from unittest import mock
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+
+from planilha_falsa import ClienteFalso  # noqa: E402
+from sheets_client import ClienteSheets  # noqa: E402
+import sheets_manager  # noqa: E402
+
+
+def relogio(ano, mes, dia=1, hora=12):
+    """Relógio parado numa data (para ParcelCalculator.relogio)"""
+    return lambda: datetime(ano, mes, dia, hora)
+
+
+class PlanilhaEmMemoria:
+    """
+    Cria SheetsManager ligados ao mesmo gspread em memória
+
+    Uso: `planilhas = PlanilhaEmMemoria(); g = planilhas.abrir()`; no fim,
+    `planilhas.fechar()` fecha todos os gerenciadores abertos.
+    """
+
+    def __init__(self, outbox=False, max_tentativas=1):
+        """
+        Args:
+            outbox (bool): Liga o outbox nos gerenciadores criados
+            max_tentativas (int): Tentativas por chamada (1 = um 429 já vira erro)
+        """
+        self.cliente = ClienteFalso()
+        self.api = ClienteSheets(por_minuto=10 ** 9, max_tentativas=max_tentativas,
+                                 espera_base=0.001, espera_maxima=0.001)
+        self.outbox = outbox
+        self.pasta = tempfile.TemporaryDirectory()
+        self.abertos = []
+
+    def caminho(self, nome):
+        return os.path.join(self.pasta.name, nome)
+
+    def abrir(self, spreadsheet_id='teste', mes=None):
+        """
+        Abre (e inicializa) um gerenciador da planilha
+
+        Args:
+            spreadsheet_id (str): Planilha no cliente em memória
+            mes (tuple): (ano, mês) do relógio do gerenciador (None = relógio real)
+        """
+        with mock.patch.object(sheets_manager, 'OUTBOX_ENABLED', self.outbox):
+            gerenciador = sheets_manager.SheetsManager(
+                spreadsheet_id, client=self.cliente, api=self.api,
+                caminho_outbox=self.caminho(f'outbox-{spreadsheet_id}.db'),
+                caminho_historico=self.caminho(f'historico-{spreadsheet_id}.db')
+            )
+        if mes is not None:
+            gerenciador.calc.relogio = relogio(*mes)
+        gerenciador.inicializar()
+        self.abertos.append(gerenciador)
+        return gerenciador
+
+    def linhas(self, aba, spreadsheet_id='teste'):
+        """Linhas de dados (sem o cabeçalho) de uma aba"""
+        return self.cliente._planilhas[spreadsheet_id]._abas[aba].linhas[1:]
+
+    def fechar(self):
+        for gerenciador in self.abertos:
+            gerenciador.fechar()
+        self.pasta.cleanup()
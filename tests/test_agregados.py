@@ -0,0 +1,124 @@
+"""
+Testes dos totais corridos do resumo e da verificação de divergência
+"""
+import threading
+import unittest
+
+from tests.apoio import PlanilhaEmMemoria, relogio
+from agregados import Agregados
+from calculator import mes_para_ordinal, ordinal_para_mes
+from config import SHEET_DATABASE
+
+
+class TestAgregados(unittest.TestCase):
+
+    def setUp(self):
+        self.planilhas = PlanilhaEmMemoria()
+        self.addCleanup(self.planilhas.fechar)
+        self.gerenciador = self.planilhas.abrir(mes=(2026, 3))
+
+    def recalculado(self):
+        """Resumo refeito do zero a partir dos registros"""
+        agregados = Agregados()
+        agregados.recalcular(
+            self.gerenciador.listar_compras(status='todos'), self.gerenciador.listar_receitas()
+        )
+        return agregados.resumo()
+
+    def test_totais_corridos_acompanham_as_escritas(self):
+        g = self.gerenciador
+        g.calcular_resumo()
+        g.adicionar_compra('Geladeira', 3000, 300, 1, 10, 'Nubank', 'Casa')
+        g.adicionar_compra('Curso', 600, 200, 1, 3, 'Inter')
+        g.adicionar_receita('Salário', 5000)
+        g.importar_dados([
+            {'descricao': 'Tênis', 'valor_parcela': 49.9, 'parcela_atual': 3, 'total_parcelas': 3, 'cartao': 'C6'},
+            {'descricao': 'TV', 'valor_parcela': 250.1, 'parcela_atual': 1, 'total_parcelas': 12, 'cartao': 'Nubank'},
+        ])
+        self.assertFalse(Agregados.diferentes(g.calcular_resumo(), self.recalculado()))
+
+        # Virada: o Tênis (3/3) termina e sai das despesas
+        g.calc.relogio = relogio(2026, 4)
+        self.assertIsNotNone(g.atualizar_mes())
+        resumo = g.calcular_resumo()
+        self.assertFalse(Agregados.diferentes(resumo, self.recalculado()))
+        self.assertEqual(resumo['despesas'], 750.1)
+        self.assertFalse(g.recalcular_agregados())
+
+    def test_detecta_divergencia_de_edicao_manual(self):
+        g = self.gerenciador
+        g.adicionar_compra('Geladeira', 3000, 300, 1, 10, 'Nubank')
+        self.assertEqual(g.calcular_resumo()['despesas'], 300)
+
+        # Alguém muda o valor da parcela direto na planilha
+        self.planilhas.linhas(SHEET_DATABASE)[0][3] = 350
+        g.invalidar_cache()
+
+        self.assertTrue(g.recalcular_agregados())
+        self.assertEqual(g.calcular_resumo()['despesas'], 350)
+        self.assertFalse(g.recalcular_agregados())
+
+    def test_erro_de_leitura_nao_zera_o_resumo(self):
+        g = self.gerenciador
+        g.adicionar_compra('Geladeira', 3000, 300, 1, 10, 'Nubank')
+        self.assertEqual(g.calcular_resumo()['despesas'], 300)
+
+        g.invalidar_cache()
+        self.planilhas.cliente.falhar_proximas(1)
+        self.assertIsNone(g.calcular_resumo())
+        self.assertEqual(g.agregados.resumo()['despesas'], 300)
+        self.assertEqual(g.calcular_resumo()['despesas'], 300)
+
+    def test_despesas_por_mes_iguais_a_soma_compra_a_compra(self):
+        g = self.gerenciador
+        g.adicionar_compra('Geladeira', 3000, 300, 1, 10, 'Nubank')
+        g.adicionar_compra('Curso', 600, 200.1, 1, 3, 'Inter')
+        g.importar_dados([
+            {'descricao': 'Tênis', 'valor_parcela': 49.9, 'parcela_atual': 3, 'total_parcelas': 3, 'cartao': 'C6'},
+            {'descricao': 'TV', 'valor_parcela': 250.1, 'parcela_atual': 7, 'total_parcelas': 12, 'cartao': 'Nubank'},
+        ])
+        g.calc.relogio = relogio(2026, 5)
+        self.assertIsNotNone(g.atualizar_mes())
+
+        esperado = {}
+        for compra in g.listar_compras(status='todos'):
+            for i in range(compra.total_parcelas - compra.parcela_inicial + 1):
+                mes = ordinal_para_mes(compra.mes_inicio_ord + i)
+                esperado[mes] = esperado.get(mes, 0) + round(compra.valor_parcela * 100)
+        esperado = {mes: centavos / 100 for mes, centavos in sorted(esperado.items())}
+
+        resumo = g.calcular_resumo()
+        self.assertEqual(resumo['despesas_por_mes'], esperado)
+        self.assertEqual(list(resumo['despesas_por_mes'])[0], '2025-09')
+        # O mês atual bate com as despesas das compras ativas
+        self.assertEqual(resumo['despesas_por_mes']['2026-05'], resumo['despesas'])
+        self.assertFalse(Agregados.diferentes(resumo, self.recalculado()))
+
+    def test_recalculo_no_meio_de_uma_escrita_nao_conta_duas_vezes(self):
+        g = self.gerenciador
+        g.adicionar_compra('Geladeira', 3000, 300, 1, 10, 'Nubank')
+        self.assertEqual(g.calcular_resumo()['despesas'], 300)
+
+        # Um /resumo que recalcula entre a compra entrar no cache e a
+        # diferença entrar nos totais
+        original = g._cache_gravar
+        concorrentes = []
+
+        def cache_gravar(nome_aba, registros):
+            original(nome_aba, registros)
+            concorrente = threading.Thread(target=g.calcular_resumo, kwargs={'recalcular': True})
+            concorrente.start()
+            concorrente.join(0.2)
+            concorrentes.append(concorrente)
+
+        g._cache_gravar = cache_gravar
+        g.adicionar_compra('Curso', 600, 200, 1, 3, 'Inter')
+        g._cache_gravar = original
+        concorrentes[0].join(5)
+
+        self.assertEqual(g.calcular_resumo()['despesas'], 500)
+        self.assertFalse(Agregados.diferentes(g.calcular_resumo(), self.recalculado()))
+
+
+if __name__ == '__main__':
+    unittest.main()
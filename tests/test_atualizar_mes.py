@@ -0,0 +1,62 @@
+"""
+Testes da virada de parcelas (atualizar_mes) na aba Database
+"""
+import unittest
+
+from tests.apoio import PlanilhaEmMemoria, relogio
+from config import SHEET_DATABASE
+
+
+class TestAtualizarMes(unittest.TestCase):
+
+    outbox = False
+
+    def setUp(self):
+        self.planilhas = PlanilhaEmMemoria(outbox=self.outbox)
+        self.addCleanup(self.planilhas.fechar)
+        self.gerenciador = self.planilhas.abrir(mes=(2026, 2))
+        for descricao in ('Geladeira', 'Curso', 'Tênis', 'TV'):
+            self.gerenciador.adicionar_compra(descricao, 1000, 100, 1, 10, 'Nubank')
+        self.enviar()
+        self.gerenciador.calc.relogio = relogio(2026, 3)
+
+    def enviar(self):
+        if self.outbox:
+            self.gerenciador._outbox_worker.drenar()
+
+    def linhas(self):
+        return self.planilhas.linhas(SHEET_DATABASE)
+
+    def apagar_linha(self, indice):
+        """Limpa uma linha de dados à mão (as células ficam vazias)"""
+        self.linhas()[indice][:] = [''] * 14
+
+    def test_avanca_parcela_status_e_data(self):
+        resultado = self.gerenciador.atualizar_mes()
+        self.enviar()
+        self.assertEqual(resultado['atualizadas'], 4)
+        for linha in self.linhas():
+            self.assertEqual((linha[6], linha[9]), (2, 'ativo'))
+            self.assertEqual(linha[11], resultado['data_atualizacao'])
+
+    def test_linhas_apagadas_a_mao_ficam_em_branco(self):
+        self.apagar_linha(1)
+        self.apagar_linha(3)
+        resultado = self.gerenciador.atualizar_mes()
+        self.enviar()
+        self.assertEqual(resultado['atualizadas'], 2)
+
+        linhas = self.linhas()
+        self.assertEqual(len(linhas), 4)
+        self.assertEqual(linhas[1], [''] * 14)
+        self.assertEqual(linhas[3], [''] * 14)
+        self.assertEqual([(l[1], l[6]) for l in (linhas[0], linhas[2])], [('Geladeira', 2), ('Tênis', 2)])
+
+
+class TestAtualizarMesComOutbox(TestAtualizarMes):
+
+    outbox = True
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Testes do ParcelCalculator
+Execute: python -m unittest discover tests
+"""
+import contextlib
+import io
+import random
+import unittest
+
+from calculator import ParcelCalculator, mes_para_ordinal, ordinal_para_mes
+from models import Compra
+
+
+def compras_aleatorias(quantidade, semente):
+    """Compras com valores quebrados em centavos, começando antes e depois da janela"""
+    aleatorio = random.Random(semente)
+    compras = []
+    for i in range(quantidade):
+        total = aleatorio.randint(1, 24)
+        mes = mes_para_ordinal('2026-01') + aleatorio.randint(-24, 12)
+        compras.append(Compra(
+            i + 1, f'Compra {i}', 0, round(aleatorio.uniform(0.01, 999.99), 2),
+            aleatorio.randint(1, total), total, 1, mes,
+            aleatorio.choice(('Nubank', 'Inter', 'C6')), 'ativo'
+        ))
+    return compras
+
+
+class TestMesParaOrdinal(unittest.TestCase):
+
+    def test_ida_e_volta(self):
+        for mes in ('0001-01', '2026-02', '2026-12', '9999-12'):
+            self.assertEqual(ordinal_para_mes(mes_para_ordinal(mes)), mes)
+
+    def test_rejeita_mes_e_ano_fora_do_intervalo(self):
+        for mes in ('2026-00', '2026-13', '0000-01', '10000-01', '-1-05', '2026', 'abc'):
+            with self.assertRaises(ValueError, msg=mes):
+                mes_para_ordinal(mes)
+
+
+class TestCalcularParcelasLote(unittest.TestCase):
+    """O lote vetorizado tem que dar, linha a linha, o mesmo que o cálculo individual"""
+
+    MESES = (
+        # Válidos
+        '2024-01', '2025-07', '2026-03', '2026-12', '0001-01', '9999-12',
+        # Malformados
+        '2026-13', '2026-00', '2026', 'abc', '', '2026-03-01', '2026.5-03', '2026-3.0',
+        '1e3-03', '2_026-03', ' 2026-03', '+2026-03', '-2026-03', None,
+        # Ano fora de 1..9999
+        '0000-05', '10000-01'
+    )
+
+    def setUp(self):
+        self.calc = ParcelCalculator()
+        self.hoje = mes_para_ordinal('2026-03')
+
+    def comparar(self, meses, semente):
+        aleatorio = random.Random(semente)
+        linhas = []
+        for mes in meses:
+            total = aleatorio.randint(1, 24)
+            linhas.append((mes, aleatorio.randint(1, total), total))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            esperado = [self.calc.calcular_parcela_atual(*linha, hoje=self.hoje) for linha in linhas]
+        parcelas, status = self.calc.calcular_parcelas_lote({
+            'mes_inicio': [linha[0] for linha in linhas],
+            'parcela_inicial': [linha[1] for linha in linhas],
+            'total_parcelas': [linha[2] for linha in linhas]
+        }, hoje=self.hoje)
+
+        for linha, individual, lote in zip(linhas, esperado, zip(parcelas, status)):
+            self.assertEqual((lote[0], str(lote[1])), individual, msg=linha)
+
+    def test_meses_em_texto(self):
+        aleatorio = random.Random(0)
+        for semente in range(20):
+            self.comparar([aleatorio.choice(self.MESES) for _ in range(50)], semente)
+
+    def test_ano_fora_do_intervalo_e_erro(self):
+        parcelas, status = self.calc.calcular_parcelas_lote(
+            {'mes_inicio': ['0000-05'], 'parcela_inicial': [2], 'total_parcelas': [10]}, hoje=self.hoje
+        )
+        self.assertEqual((parcelas[0], status[0]), (2, 'erro'))
+
+    def test_meses_ja_convertidos_em_ordinal(self):
+        aleatorio = random.Random(1)
+        meses = [self.hoje + aleatorio.randint(-30, 6) for _ in range(200)]
+        # Compra.mes_inicio_ord é None quando o mês da planilha é inválido
+        meses[::17] = [None] * len(meses[::17])
+        self.comparar(meses, 1)
+
+
+class TestProjetarPorCartao(unittest.TestCase):
+
+    def setUp(self):
+        self.calc = ParcelCalculator()
+
+    def forca_bruta(self, compras, meses, primeiro_mes):
+        """Projeção mês a mês e compra a compra pela regra de calcular_parcela_atual"""
+        projecao = {}
+        for i in range(meses):
+            for compra in compras:
+                _, status = self.calc.calcular_parcela_atual(
+                    compra.mes_inicio_ord, compra.parcela_inicial, compra.total_parcelas,
+                    hoje=primeiro_mes + i
+                )
+                if status == 'ativo':
+                    totais = projecao.setdefault(compra.cartao, [0.0] * meses)
+                    totais[i] += compra.valor_parcela
+        return projecao
+
+    def test_igual_a_forca_bruta(self):
+        primeiro_mes = mes_para_ordinal('2026-01')
+        for semente in range(20):
+            compras = compras_aleatorias(60, semente)
+            for meses in (1, 3, 12, 36):
+                projecao = self.calc.projetar_por_cartao(compras, meses, primeiro_mes)
+                esperado = self.forca_bruta(compras, meses, primeiro_mes)
+                self.assertEqual(projecao.keys(), esperado.keys())
+                for cartao, totais in esperado.items():
+                    self.assertEqual(projecao[cartao], [round(t, 2) for t in totais], (semente, meses, cartao))
+
+    def test_meses_sem_parcelas_sao_zero_exato(self):
+        # Em float, 0.1 + 0.2 + 0.3 - 0.1 - 0.2 - 0.3 deixa um resíduo de ~5e-17
+        inicio = mes_para_ordinal('2026-01')
+        compras = [
+            Compra(1, 'a', 0, 0.1, 1, 1, 1, inicio, 'Nubank', 'ativo'),
+            Compra(2, 'b', 0, 0.2, 1, 1, 1, inicio, 'Nubank', 'ativo'),
+            Compra(3, 'c', 0, 0.3, 1, 2, 1, inicio, 'Nubank', 'ativo'),
+        ]
+        projecao = self.calc.projetar_por_cartao(compras, 4, inicio)
+        self.assertEqual(projecao['Nubank'], [0.6, 0.3, 0.0, 0.0])
+        self.assertFalse(projecao['Nubank'][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Testes da paginação do /listar
+"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from telegram.constants import MessageLimit
+
+import bot
+from models import Compra
+
+
+def compra(i, cartao='Nubank', valor=10.0, descricao=None):
+    return Compra(i, descricao or f'Compra {i}', valor * 10, valor, 1, 10, 3, '2026-01', cartao, 'ativo')
+
+
+def listagem(compras, **kwargs):
+    return {
+        'paginas': bot.paginar_compras(compras, **kwargs),
+        'quantidade': len(compras),
+        'total': sum(c.valor_parcela for c in compras)
+    }
+
+
+class TestPaginarCompras(unittest.TestCase):
+
+    def test_divide_pelo_numero_de_compras(self):
+        paginas = bot.paginar_compras([compra(i) for i in range(45)], por_pagina=20)
+        self.assertEqual(len(paginas), 3)
+        self.assertEqual([p.count('  • ') for p in paginas], [20, 20, 5])
+
+    def test_cabecalho_repetido_e_subtotal_no_fim_do_cartao(self):
+        compras = [compra(i, 'Nubank', 10) for i in range(3)] + [compra(i, 'Inter', 2.5) for i in range(3, 6)]
+        paginas = bot.paginar_compras(compras, por_pagina=2)
+        self.assertEqual(len(paginas), 3)
+        self.assertTrue(paginas[0].startswith('💳 *Nubank*\n'))
+        self.assertNotIn('Subtotal', paginas[0])
+        self.assertTrue(paginas[1].startswith('💳 *Nubank* (cont.)\n'))
+        self.assertIn('*Subtotal:* R$ 30.00\n\n💳 *Inter*\n', paginas[1])
+        self.assertTrue(paginas[2].startswith('💳 *Inter* (cont.)\n'))
+        self.assertTrue(paginas[2].endswith('*Subtotal:* R$ 7.50\n\n'))
+
+    def test_respeita_o_limite_de_caracteres(self):
+        compras = [compra(i, descricao='Compra com uma descrição comprida 🛒' * 2) for i in range(100)]
+        paginas = bot.paginar_compras(compras, por_pagina=100, limite=1000)
+        self.assertGreater(len(paginas), 1)
+        self.assertTrue(all(bot._tamanho(p) <= 1000 for p in paginas))
+        self.assertEqual(sum(p.count('  • ') for p in paginas), 100)
+
+    def test_descricao_gigante_e_encurtada(self):
+        compras = [compra(1, cartao='C' * 5000, descricao='🛒' * 5000), compra(2)]
+        dados = listagem(compras)
+        self.assertTrue(all(bot._tamanho(p) <= bot.LIMITE_PAGINA for p in dados['paginas']))
+        self.assertIn('…', dados['paginas'][0])
+        for indice in range(len(dados['paginas'])):
+            texto, _ = bot.pagina_da_listagem(dados, 0, indice)
+            self.assertLessEqual(bot._tamanho(texto), MessageLimit.MAX_TEXT_LENGTH)
+
+
+class TestPaginaDaListagem(unittest.TestCase):
+
+    def setUp(self):
+        self.dados = listagem([compra(i) for i in range(5)], por_pagina=2)
+
+    def botoes(self, teclado):
+        return [botao.callback_data for botao in teclado.inline_keyboard[0]]
+
+    def test_botoes_e_rodape(self):
+        texto, teclado = bot.pagina_da_listagem(self.dados, 7, 1)
+        self.assertTrue(texto.startswith('📊 *Gastos do Mês Atual* (2/3)'))
+        self.assertTrue(texto.endswith('📦 5 compras - Total: R$ 50.00'))
+        self.assertEqual(self.botoes(teclado), ['listar:7:0', 'listar:7:2'])
+
+    def test_pagina_fora_do_intervalo_mostra_a_mais_proxima(self):
+        texto, teclado = bot.pagina_da_listagem(self.dados, 7, 99)
+        self.assertIn('(3/3)', texto)
+        self.assertEqual(self.botoes(teclado), ['listar:7:1'])
+
+    def test_pagina_unica_sem_botoes(self):
+        texto, teclado = bot.pagina_da_listagem(listagem([compra(1)]), 0, 0)
+        self.assertIsNone(teclado)
+        self.assertNotIn('(1/1)', texto)
+
+
+class TestListarPagina(unittest.IsolatedAsyncioTestCase):
+
+    def clique(self, dados, listagens):
+        query = SimpleNamespace(data=dados, answer=mock.AsyncMock(), edit_message_text=mock.AsyncMock())
+        contexto = SimpleNamespace(chat_data={'listagens': listagens})
+        return query, SimpleNamespace(callback_query=query), contexto
+
+    async def test_listagem_expirada(self):
+        query, update, contexto = self.clique('listar:3:1', {})
+        await bot.listar_pagina(update, contexto)
+        query.answer.assert_awaited_once()
+        self.assertTrue(query.answer.await_args.kwargs['show_alert'])
+        query.edit_message_text.assert_not_awaited()
+
+    async def test_troca_de_pagina_sem_reler_a_planilha(self):
+        dados = listagem([compra(i) for i in range(5)], por_pagina=2)
+        query, update, contexto = self.clique('listar:0:2', {0: dados})
+        with mock.patch.object(bot, 'armazenamentos') as armazenamentos:
+            await bot.listar_pagina(update, contexto)
+        armazenamentos.obter.assert_not_called()
+        texto = query.edit_message_text.await_args.args[0]
+        self.assertIn('(3/3)', texto)
+        self.assertIn('Compra 4', texto)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Testes do outbox: recuperação após queda e reenvio pelo menos uma vez
+"""
+import unittest
+from unittest import mock
+
+from tests.apoio import PlanilhaEmMemoria
+from config import SHEET_DATABASE
+from outbox import Outbox
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.planilhas = PlanilhaEmMemoria(outbox=True)
+        self.addCleanup(self.planilhas.fechar)
+
+    def ids_na_planilha(self):
+        return [linha[0] for linha in self.planilhas.linhas(SHEET_DATABASE)]
+
+    def test_reenvia_o_diario_depois_de_uma_queda(self):
+        gerenciador = self.planilhas.abrir()
+        # Queda antes do envio: o worker para sem drenar e o processo "morre"
+        gerenciador._outbox_worker.parar(drenar=False)
+        for i in range(3):
+            self.assertIsNotNone(gerenciador.adicionar_compra(f'Compra {i}', 300, 100, 1, 3, 'Nubank'))
+        self.assertEqual(self.ids_na_planilha(), [])
+        self.assertEqual(len(gerenciador._outbox), 3)
+
+        # Nova instância com o mesmo diário: reenvia tudo e continua os IDs
+        novo = self.planilhas.abrir()
+        novo._outbox_worker.parar()
+        self.assertEqual(self.ids_na_planilha(), [1, 2, 3])
+        self.assertEqual(len(novo._outbox), 0)
+        self.assertEqual(novo.adicionar_compra('Depois', 10, 10, 1, 1, 'Inter').id, 4)
+
+    def test_reenvio_de_entrada_ja_gravada_nao_duplica(self):
+        gerenciador = self.planilhas.abrir()
+        worker = gerenciador._outbox_worker
+        worker.parar(drenar=False)
+        gerenciador.adicionar_compra('Compra', 300, 100, 1, 3, 'Nubank')
+        gerenciador.adicionar_receita('Salário', 5000)
+
+        # Queda entre gravar na planilha e confirmar no diário
+        with mock.patch.object(Outbox, 'confirmar', side_effect=RuntimeError('queda')):
+            with self.assertRaises(RuntimeError):
+                worker.drenar()
+        self.assertEqual(self.ids_na_planilha(), [1])
+        self.assertEqual(len(gerenciador._outbox), 2)
+
+        self.assertTrue(worker.drenar())
+        self.assertEqual(len(gerenciador._outbox), 0)
+        self.assertEqual(self.ids_na_planilha(), [1])
+        self.assertEqual(len(self.planilhas.linhas('Receitas')), 1)
+
+    def test_falha_no_envio_mantem_a_entrada(self):
+        gerenciador = self.planilhas.abrir()
+        worker = gerenciador._outbox_worker
+        worker.parar(drenar=False)
+        gerenciador.adicionar_compra('Compra', 300, 100, 1, 3, 'Nubank')
+
+        self.planilhas.cliente.falhar_proximas(1)
+        self.assertFalse(worker.drenar())
+        tentativas = gerenciador._outbox.conn.execute('SELECT tentativas FROM outbox').fetchone()[0]
+        self.assertEqual(tentativas, 1)
+        self.assertEqual(self.ids_na_planilha(), [])
+
+        self.assertTrue(worker.drenar())
+        self.assertEqual(self.ids_na_planilha(), [1])
+
+    def test_escrita_enviada_durante_a_leitura_nao_some_do_cache(self):
+        gerenciador = self.planilhas.abrir()
+        worker = gerenciador._outbox_worker
+        worker.parar(drenar=False)
+        gerenciador.adicionar_compra('Pendente', 100, 100, 1, 1, 'Nubank')
+        gerenciador.invalidar_cache()
+
+        aba = self.planilhas.cliente._planilhas['teste']._abas[SHEET_DATABASE]
+        ler = aba.get_all_values
+
+        def leitura_concorrente(**kwargs):
+            # A leitura vê a aba antes; enquanto ela "viaja", o worker envia a
+            # compra pendente e uma nova compra é gravada e enviada
+            valores = ler(**kwargs)
+            worker.drenar()
+            gerenciador.adicionar_compra('Durante', 100, 100, 1, 1, 'Inter')
+            worker.drenar()
+            return valores
+
+        with mock.patch.object(aba, 'get_all_values', leitura_concorrente):
+            compras = gerenciador.listar_compras(status='todos')
+        self.assertEqual([c.descricao for c in compras], ['Pendente', 'Durante'])
+
+    def test_escritas_recusadas_depois_de_fechar(self):
+        gerenciador = self.planilhas.abrir()
+        gerenciador.fechar()
+        self.assertIsNone(gerenciador._outbox)
+        self.assertIsNone(gerenciador.adicionar_compra('Tarde', 10, 10, 1, 1, 'Nubank'))
+        self.assertEqual(self.ids_na_planilha(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Testes do pool de planilhas por chat (LRU)
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.apoio import PlanilhaEmMemoria
+import storage
+from planilhas import PoolPlanilhas, caminho_da_planilha
+
+
+class ArmazenamentoFalso:
+    def __init__(self, spreadsheet_id):
+        self.spreadsheet_id = spreadsheet_id
+        self.fechado = False
+
+    def fechar(self):
+        self.fechado = True
+
+
+class TestPoolPlanilhas(unittest.TestCase):
+
+    def setUp(self):
+        self.criados = []
+
+        def fabrica(spreadsheet_id):
+            storage = ArmazenamentoFalso(spreadsheet_id)
+            self.criados.append(storage)
+            return storage
+
+        self.pool = PoolPlanilhas(fabrica, {'1': 'A', '2': 'B', '3': 'C'}, padrao='P', tamanho=2)
+
+    def test_resolve_a_planilha_do_chat(self):
+        self.assertEqual(self.pool.obter(1).spreadsheet_id, 'A')
+        self.assertEqual(self.pool.obter(99).spreadsheet_id, 'P')
+        self.assertEqual(self.pool.planilhas(), ['P', 'A', 'B', 'C'])
+        self.assertIsNone(PoolPlanilhas(lambda _: None, {'1': 'A'}).obter(2))
+
+    def test_reaproveita_a_instancia_aberta(self):
+        self.assertIs(self.pool.obter(1), self.pool.obter(1))
+        self.assertEqual(len(self.criados), 1)
+
+    def test_despeja_e_fecha_o_menos_usado(self):
+        a = self.pool.obter(1)
+        b = self.pool.obter(2)
+        self.pool.obter(1)  # A passa a ser o mais recente
+        c = self.pool.obter(3)
+
+        self.assertTrue(b.fechado)
+        self.assertFalse(a.fechado)
+        self.assertFalse(c.fechado)
+        self.assertEqual(list(self.pool._abertos), ['A', 'C'])
+
+        # Reabrir uma planilha despejada cria uma instância nova
+        self.assertIsNot(self.pool.obter(2), b)
+        self.assertTrue(a.fechado)
+
+    def test_fechar_fecha_todas(self):
+        abertos = [self.pool.obter(1), self.pool.obter(2)]
+        self.pool.fechar()
+        self.assertTrue(all(storage.fechado for storage in abertos))
+        self.assertEqual(len(self.pool._abertos), 0)
+
+    def test_falha_na_abertura_nao_fica_no_pool(self):
+        falhas = [RuntimeError('sem conexão')]
+
+        def fabrica(spreadsheet_id):
+            if falhas:
+                raise falhas.pop()
+            return ArmazenamentoFalso(spreadsheet_id)
+
+        pool = PoolPlanilhas(fabrica, padrao='P')
+        with self.assertRaises(RuntimeError):
+            pool.obter(1)
+        self.assertEqual(len(pool._abertos), 0)
+        self.assertEqual(pool.obter(1).spreadsheet_id, 'P')
+
+    def test_arquivos_locais_por_planilha(self):
+        self.assertEqual(caminho_da_planilha('dados/outbox.db', 'abc'), 'dados/outbox-abc.db')
+
+
+class TestPoolComSheetsManager(unittest.TestCase):
+
+    def setUp(self):
+        self.planilhas = PlanilhaEmMemoria(outbox=True)
+        self.addCleanup(self.planilhas.fechar)
+
+    def test_despejo_envia_o_pendente_e_libera_o_outbox(self):
+        pool = PoolPlanilhas(self.planilhas.abrir, {'1': 'A', '2': 'B'}, tamanho=1)
+        a = pool.obter(1)
+        a._outbox_worker.parar(drenar=False)
+        a.adicionar_compra('Compra', 100, 100, 1, 1, 'Nubank')
+
+        pool.obter(2)
+
+        self.assertEqual([linha[1] for linha in self.planilhas.linhas('Database', 'A')], ['Compra'])
+        self.assertIsNone(a._outbox)
+        self.assertIsNone(a.adicionar_compra('Depois do despejo', 10, 10, 1, 1, 'Nubank'))
+
+
+
+class TestPoolSQLite(unittest.TestCase):
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        configuracao = {
+            'STORAGE_BACKEND': 'sqlite',
+            'SHEETS_MIRROR': False,
+            'SPREADSHEET_ID': 'P',
+            'SQLITE_PATH': os.path.join(self.pasta, 'gastos.db'),
+            'HISTORICO_PATH': os.path.join(self.pasta, 'historico.db'),
+            'CHAT_SPREADSHEETS': {'1': 'A', '2': 'B', '3': 'P'}
+        }
+        for nome, valor in configuracao.items():
+            patcher = mock.patch.object(storage, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.pool = storage.criar_pool()
+        self.addCleanup(self.pool.fechar)
+
+    def test_cada_planilha_do_mapa_tem_seu_banco(self):
+        self.pool.obter('1').adicionar_compra('Geladeira', 3000, 300, 1, 10, 'Nubank')
+        self.pool.obter('9').adicionar_compra('Curso', 400, 200, 1, 2, 'Inter')
+
+        self.assertEqual([c.descricao for c in self.pool.obter('1').listar_compras()], ['Geladeira'])
+        self.assertEqual(self.pool.obter('2').listar_compras(), [])
+        # Chats fora do mapa e os mapeados para SPREADSHEET_ID usam o banco padrão
+        self.assertEqual([c.descricao for c in self.pool.obter('3').listar_compras()], ['Curso'])
+        self.assertIs(self.pool.obter('3'), self.pool.obter('9'))
+
+        self.assertEqual(self.pool.obter('1').caminho, os.path.join(self.pasta, 'gastos-A.db'))
+        self.assertEqual(self.pool.obter('1').caminho_historico, os.path.join(self.pasta, 'historico-A.db'))
+        self.assertEqual(self.pool.obter('9').caminho, os.path.join(self.pasta, 'gastos.db'))
+
+
+if __name__ == '__main__':
+    unittest.main()
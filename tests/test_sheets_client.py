@@ -0,0 +1,125 @@
+"""
+Testes do cliente do Sheets: fila de prioridade do limitador e backoff
+"""
+import threading
+import time
+import unittest
+
+import gspread
+
+from tests.apoio import ClienteFalso
+from planilha_falsa import RespostaFalsa
+from sheets_client import (
+    ClienteSheets, LimitadorCota, PRIORIDADE_INTERATIVA, PRIORIDADE_SEGUNDO_PLANO
+)
+
+
+class TestLimitadorCota(unittest.TestCase):
+
+    def esperar_na_fila(self, limitador, quantidade):
+        """Espera até `quantidade` threads estarem na fila do limitador"""
+        limite = time.monotonic() + 5
+        while time.monotonic() < limite:
+            with limitador._cond:
+                if len(limitador._fila) >= quantidade:
+                    return
+            time.sleep(0.001)
+        self.fail('as threads não entraram na fila')
+
+    def ordem_de_atendimento(self, prioridades):
+        """
+        Esgota os tokens, enfileira uma thread por prioridade (nesta ordem de
+        chegada) e devolve a ordem em que foram atendidas
+        """
+        # 120/min = um token a cada 0,5s (folga para todas entrarem na fila);
+        # rajada de 1 para esgotar com uma chamada
+        limitador = LimitadorCota(por_minuto=120, rajada=1)
+        limitador.adquirir()
+        atendidas = []
+        threads = []
+        for i, prioridade in enumerate(prioridades):
+            def chamar(i=i, prioridade=prioridade):
+                limitador.adquirir(prioridade)
+                atendidas.append(i)
+            thread = threading.Thread(target=chamar)
+            thread.start()
+            threads.append(thread)
+            self.esperar_na_fila(limitador, i + 1)
+        for thread in threads:
+            thread.join(5)
+        return atendidas
+
+    def test_interativa_passa_na_frente_do_segundo_plano(self):
+        ordem = self.ordem_de_atendimento(
+            [PRIORIDADE_SEGUNDO_PLANO, PRIORIDADE_SEGUNDO_PLANO, PRIORIDADE_INTERATIVA]
+        )
+        self.assertEqual(ordem, [2, 0, 1])
+
+    def test_mesma_prioridade_respeita_a_chegada(self):
+        ordem = self.ordem_de_atendimento([PRIORIDADE_INTERATIVA] * 3)
+        self.assertEqual(ordem, [0, 1, 2])
+
+    def test_rajada_nao_espera(self):
+        limitador = LimitadorCota(por_minuto=60, rajada=5)
+        inicio = time.monotonic()
+        for _ in range(5):
+            limitador.adquirir()
+        self.assertLess(time.monotonic() - inicio, 0.5)
+
+
+class TestClienteSheets(unittest.TestCase):
+
+    def setUp(self):
+        self.cliente = ClienteFalso()
+        self.api = ClienteSheets(por_minuto=10 ** 9, max_tentativas=3, espera_base=0.001, espera_maxima=0.001)
+
+    def test_repete_erro_de_cota(self):
+        self.cliente.falhar_proximas(2)
+        planilha = self.api.executar(self.cliente.open_by_key, 'x')
+        self.assertEqual(planilha.id, 'x')
+        self.assertEqual(self.cliente.chamadas['Client.open_by_key'], 3)
+
+    def test_desiste_depois_das_tentativas(self):
+        self.cliente.falhar_proximas(3)
+        with self.assertRaises(gspread.exceptions.APIError):
+            self.api.executar(self.cliente.open_by_key, 'x')
+        self.assertEqual(self.cliente.chamadas['Client.open_by_key'], 3)
+
+    def aba(self):
+        planilha = self.api.executar(self.cliente.open_by_key, 'x')
+        return self.api.executar(planilha.add_worksheet, 'Database')
+
+    def test_append_aplicado_com_5xx_nao_e_repetido(self):
+        aba = self.aba()
+
+        # O servidor grava as linhas e mesmo assim responde 503
+        def append_rows(linhas):
+            aba.append_rows(linhas)
+            raise gspread.exceptions.APIError(RespostaFalsa(503, 'Service unavailable'))
+
+        with self.assertRaises(gspread.exceptions.APIError):
+            self.api.executar(append_rows, [[1, 'Geladeira']])
+        self.assertEqual(aba.linhas, [[1, 'Geladeira']])
+
+    def test_append_repete_erro_de_cota(self):
+        aba = self.aba()
+        self.cliente.falhar_proximas(1)
+        self.api.executar(aba.append_rows, [[1, 'Geladeira']])
+        self.assertEqual(aba.linhas, [[1, 'Geladeira']])
+        self.assertEqual(self.cliente.chamadas['Worksheet.append_rows'], 2)
+
+    def test_leitura_repete_erro_de_servidor(self):
+        aba = self.aba()
+        respostas = [RespostaFalsa(503, 'Service unavailable')]
+
+        def get_all_values():
+            if respostas:
+                raise gspread.exceptions.APIError(respostas.pop())
+            return aba.get_all_values()
+
+        self.assertEqual(self.api.executar(get_all_values), [])
+        self.assertEqual(respostas, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
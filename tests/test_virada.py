@@ -0,0 +1,159 @@
+"""
+Testes da virada automática do mês: estado, recuperação de viradas perdidas
+e falhas de leitura durante a virada
+"""
+import os
+import threading
+import unittest
+from datetime import datetime
+
+import gspread
+
+from tests.apoio import PlanilhaEmMemoria, relogio
+from calculator import mes_para_ordinal
+from config import SHEET_DATABASE
+from virada import EstadoVirada, dia_da_virada, mes_pendente, virar_mes, virar_se_pendente
+
+MARCO = mes_para_ordinal('2026-03')
+
+
+class TestEstadoVirada(unittest.TestCase):
+
+    def setUp(self):
+        self.planilhas = PlanilhaEmMemoria()
+        self.addCleanup(self.planilhas.fechar)
+        self.caminho = self.planilhas.caminho('virada.json')
+
+    def test_registro_sobrevive_ao_reinicio(self):
+        estado = EstadoVirada(self.caminho)
+        self.assertIsNone(estado.ultimo('teste'))
+        estado.registrar('teste', MARCO)
+        self.assertEqual(EstadoVirada(self.caminho).ultimo('teste'), MARCO)
+        self.assertIsNone(EstadoVirada(self.caminho).ultimo('outra'))
+
+    def test_arquivo_ilegivel_recomeca(self):
+        with open(self.caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('{quebrado')
+        self.assertIsNone(EstadoVirada(self.caminho).ultimo('teste'))
+        self.assertFalse(os.path.exists(self.caminho + '.tmp'))
+
+    def test_dia_da_virada_limitado_ao_fim_do_mes(self):
+        self.assertEqual(dia_da_virada(datetime(2026, 2, 10), 31), 28)
+        self.assertEqual(dia_da_virada(datetime(2026, 3, 10), 31), 31)
+        self.assertEqual(dia_da_virada(datetime(2026, 3, 10), 0), 1)
+
+
+class TestVirada(unittest.TestCase):
+
+    def setUp(self):
+        self.planilhas = PlanilhaEmMemoria()
+        self.addCleanup(self.planilhas.fechar)
+        self.estado = EstadoVirada(self.planilhas.caminho('virada.json'))
+        # Compras cadastradas em fevereiro; o relógio está em 1º de março
+        self.gerenciador = self.planilhas.abrir(mes=(2026, 2))
+        self.gerenciador.adicionar_compra('Geladeira', 3000, 300, 1, 10, 'Nubank')
+        self.gerenciador.adicionar_compra('Curso', 400, 200, 1, 2, 'Inter')
+        self.gerenciador.calc.relogio = relogio(2026, 3)
+
+    def parcelas_na_planilha(self):
+        return [linha[6] for linha in self.planilhas.linhas(SHEET_DATABASE)]
+
+    def historico(self):
+        return self.gerenciador._historico().meses()
+
+    def test_pendente_so_a_partir_do_dia_configurado(self):
+        g = self.gerenciador
+        self.assertEqual(mes_pendente(g, 'teste', self.estado, 1), MARCO)
+        self.assertIsNone(mes_pendente(g, 'teste', self.estado, 5))
+        g.calc.relogio = relogio(2026, 3, 5)
+        self.assertEqual(mes_pendente(g, 'teste', self.estado, 5), MARCO)
+
+    def test_virada_avanca_o_estado_uma_vez(self):
+        resultado = virar_mes(self.gerenciador, 'teste', self.estado)
+        self.assertEqual(resultado['atualizadas'], 2)
+        self.assertEqual(self.estado.ultimo('teste'), MARCO)
+        self.assertEqual(self.parcelas_na_planilha(), [2, 2])
+        self.assertEqual(self.historico(), ['2026-02'])
+        self.assertEqual(self.gerenciador._historico().obter('2026-02')['despesas'], 500)
+
+        # Já virado: o job do dia seguinte não faz nada
+        self.assertIsNone(mes_pendente(self.gerenciador, 'teste', self.estado, 1))
+
+    def test_recupera_viradas_perdidas(self):
+        # Última virada em dezembro; o bot ficou fora em janeiro e fevereiro
+        self.estado.registrar('teste', mes_para_ordinal('2025-12'))
+        virar_mes(self.gerenciador, 'teste', self.estado)
+        self.assertEqual(self.historico(), ['2025-12', '2026-01', '2026-02'])
+        self.assertEqual(self.gerenciador._historico().obter('2026-01')['despesas'], 0)
+        self.assertEqual(self.estado.ultimo('teste'), MARCO)
+
+    def test_erro_de_leitura_nao_avanca_o_estado(self):
+        # Cota esgotada bem na leitura da aba: antes virava um mês com 0 compras
+        self.planilhas.cliente.falhar_proximas(1)
+        with self.assertRaises(RuntimeError):
+            virar_mes(self.gerenciador, 'teste', self.estado)
+        self.assertIsNone(self.estado.ultimo('teste'))
+        self.assertEqual(self.historico(), [])
+        self.assertEqual(self.parcelas_na_planilha(), [1, 1])
+        self.assertEqual(mes_pendente(self.gerenciador, 'teste', self.estado, 1), MARCO)
+
+        # Próxima verificação: a cota voltou
+        virar_mes(self.gerenciador, 'teste', self.estado)
+        self.assertEqual(self.estado.ultimo('teste'), MARCO)
+        self.assertEqual(self.parcelas_na_planilha(), [2, 2])
+        self.assertEqual(self.gerenciador._historico().obter('2026-02')['despesas'], 500)
+
+    def test_erro_ao_recuperar_viradas_perdidas_propaga(self):
+        dezembro = mes_para_ordinal('2025-12')
+        self.estado.registrar('teste', dezembro)
+        self.gerenciador.invalidar_cache()
+        self.planilhas.cliente.falhar_proximas(1)
+        with self.assertRaises(gspread.exceptions.APIError):
+            virar_mes(self.gerenciador, 'teste', self.estado)
+        self.assertEqual(self.estado.ultimo('teste'), dezembro)
+        self.assertEqual(self.historico(), [])
+
+    def test_virada_automatica_espera_a_manual_e_nao_repete(self):
+        g = self.gerenciador
+        original = g.atualizar_mes
+        liberar = threading.Event()
+        iniciou = threading.Event()
+        chamadas = []
+
+        def atualizar_mes_lento():
+            chamadas.append(1)
+            iniciou.set()
+            liberar.wait(5)
+            return original()
+
+        g.atualizar_mes = atualizar_mes_lento
+        manual = threading.Thread(target=virar_mes, args=(g, 'teste', self.estado))
+        manual.start()
+        self.assertTrue(iniciou.wait(5))
+
+        # O job diário chega com a virada manual em andamento
+        automatica = {}
+        job = threading.Thread(
+            target=lambda: automatica.update(resultado=virar_se_pendente(g, 'teste', self.estado, 1))
+        )
+        job.start()
+        job.join(0.2)
+        self.assertTrue(job.is_alive())
+
+        liberar.set()
+        manual.join(5)
+        job.join(5)
+        self.assertIsNone(automatica['resultado'])
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(self.parcelas_na_planilha(), [2, 2])
+        self.assertEqual(self.historico(), ['2026-02'])
+
+    def test_virada_automatica_quando_pendente(self):
+        resultado = virar_se_pendente(self.gerenciador, 'teste', self.estado, 1)
+        self.assertEqual(resultado['atualizadas'], 2)
+        self.assertIsNone(virar_se_pendente(self.gerenciador, 'teste', self.estado, 1))
+        self.assertEqual(self.estado.ultimo('teste'), MARCO)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Testes da reconstrução da aba visual (Gastos)
+"""
+import unittest
+
+from tests.apoio import PlanilhaEmMemoria
+from config import SHEET_VISUAL
+
+
+class TestAbaVisual(unittest.TestCase):
+
+    def setUp(self):
+        self.planilhas = PlanilhaEmMemoria()
+        self.addCleanup(self.planilhas.fechar)
+        self.gerenciador = self.planilhas.abrir(mes=(2026, 3))
+        self.gerenciador.adicionar_compra('Geladeira', 3000, 300, 1, 10, 'Nubank')
+
+    def aba_visual(self):
+        return self.planilhas.cliente._planilhas['teste']._abas[SHEET_VISUAL].linhas
+
+    def test_layout_agrupado_por_cartao(self):
+        self.assertTrue(self.gerenciador.atualizar_aba_visual())
+        self.assertEqual(self.aba_visual()[:3], [
+            ['═══ NUBANK ═══', ''], ['Compra', 'Valor'], ['Geladeira 1/10', 'R$ 300.00']
+        ])
+
+    def test_erro_de_leitura_nao_apaga_a_aba(self):
+        g = self.gerenciador
+        self.assertTrue(g.atualizar_aba_visual())
+        antes = [list(linha) for linha in self.aba_visual()]
+
+        # Cota esgotada na releitura da Database: antes limpava a aba e
+        # devolvia True, e a aba ficava vazia até a próxima escrita
+        g.invalidar_cache()
+        self.planilhas.cliente.falhar_proximas(1)
+        self.assertFalse(g.atualizar_aba_visual())
+        self.assertEqual(self.aba_visual(), antes)
+
+    def test_sincronizacao_que_falha_fica_pendente(self):
+        g = self.gerenciador
+        g.invalidar_cache()
+        self.planilhas.cliente.falhar_proximas(1)
+        self.assertFalse(g.sincronizar_visual())
+        self.assertIsNotNone(g._visual_sujo_desde)
+
+        self.assertTrue(g.sincronizar_visual())
+        self.assertIsNone(g._visual_sujo_desde)
+        self.assertEqual(self.aba_visual()[2], ['Geladeira 1/10', 'R$ 300.00'])
+
+
+if __name__ == '__main__':
+    unittest.main()
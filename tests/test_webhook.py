@@ -0,0 +1,17 @@
+"""
+Testes do modo webhook (bot.py num processo novo contra uma Bot API falsa)
+"""
+import unittest
+
+import tests.apoio  # noqa: F401  (coloca benchmarks/ no sys.path)
+from verificar_webhook import verificar
+
+
+class TestWebhook(unittest.TestCase):
+
+    def test_set_webhook_e_segredo(self):
+        self.assertEqual(verificar(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Virada automática do mês
+Guarda o último mês virado de cada planilha (para um reinício não repetir a
+virada) e recupera os meses perdidos enquanto o bot esteve fora do ar
+"""
+import calendar
+import json
+import os
+import threading
+from datetime import datetime
+from calculator import mes_para_ordinal, ordinal_para_mes
+
+
+class EstadoVirada:
+    """
+    Último mês virado por planilha, num arquivo JSON local
+
+    Formato: {spreadsheet_id: {"mes": "YYYY-MM", "executado_em": "..."}}
+    """
+
+    def __init__(self, caminho):
+        """
+        Args:
+            caminho (str): Arquivo JSON do estado
+        """
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._dados = self._ler()
+        # Uma trava por planilha: a virada manual e a automática não rodam juntas
+        self._travas = {}
+
+    def _ler(self):
+        if not os.path.exists(self.caminho):
+            return {}
+        try:
+            with open(self.caminho, encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Estado da virada ilegível ({self.caminho}), recomeçando: {e}")
+            return {}
+
+    def ultimo(self, chave):
+        """
+        Ordinal do último mês virado da planilha
+
+        Returns:
+            int: Ordinal do mês, ou None se a planilha nunca foi virada
+        """
+        with self._lock:
+            registro = self._dados.get(chave)
+        return mes_para_ordinal(registro['mes']) if registro else None
+
+    def trava(self, chave):
+        """Trava da virada da planilha (reentrante)"""
+        with self._lock:
+            return self._travas.setdefault(chave, threading.RLock())
+
+    def registrar(self, chave, mes):
+        """
+        Marca a virada do mês como feita (gravação atômica do arquivo)
+
+        Args:
+            chave (str): Planilha
+            mes (int): Ordinal do mês virado
+        """
+        with self._lock:
+            self._dados[chave] = {
+                'mes': ordinal_para_mes(mes),
+                'executado_em': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            temporario = f"{self.caminho}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(self._dados, arquivo, ensure_ascii=False, indent=2)
+            os.replace(temporario, self.caminho)
+
+
+def dia_da_virada(agora, dia):
+    """Dia configurado da virada, limitado ao último dia do mês (ex: 31 em fevereiro)"""
+    return min(max(dia, 1), calendar.monthrange(agora.year, agora.month)[1])
+
+
+def mes_pendente(gerenciador, chave, estado, dia):
+    """
+    Mês a virar na planilha, se a virada dele ainda não foi feita
+
+    Args:
+        gerenciador (Storage): Armazenamento da planilha (seu relógio define o "hoje")
+        chave (str): Planilha
+        estado (EstadoVirada): Estado das viradas
+        dia (int): Dia do mês da virada (AUTO_UPDATE_DAY)
+
+    Returns:
+        int: Ordinal do mês atual, ou None se não há virada pendente
+    """
+    agora = gerenciador.calc.relogio()
+    hoje = gerenciador.calc.mes_atual()
+    ultimo = estado.ultimo(chave)
+    if ultimo is not None and ultimo >= hoje:
+        return None
+    if agora.day < dia_da_virada(agora, dia):
+        return None
+    return hoje
+
+
+def virar_mes(gerenciador, chave, estado, hoje=None):
+    """
+    Vira o mês de uma planilha (bloqueante; rodar fora do event loop)
+
+    Antes da virada grava no histórico os meses cuja virada foi perdida
+    (do último mês virado até o retrasado); a própria virada registra o mês
+    anterior. O estado só avança depois que a atualização leu e gravou os
+    dados; em caso de erro a virada continua pendente e é repetida na
+    próxima verificação.
+
+    Roda sob a trava da planilha (EstadoVirada.trava): um /atualizarmes e o
+    job diário nunca viram a mesma planilha ao mesmo tempo. As parcelas de
+    todas as compras vão numa única escrita (ver atualizar_mes), não em lotes:
+    é uma chamada à API qualquer que seja o tamanho da planilha, e uma falha
+    não deixa metade das compras viradas.
+
+    Args:
+        gerenciador (Storage): Armazenamento da planilha
+        chave (str): Planilha
+        estado (EstadoVirada): Estado das viradas
+        hoje (int): Ordinal do mês atual (None = relógio do gerenciador)
+
+    Returns:
+        dict: Resultado de atualizar_mes
+
+    Raises:
+        RuntimeError: A atualização falhou (o estado não avança)
+        Exception: Erro ao ler os dados para recuperar viradas perdidas
+    """
+    with estado.trava(chave):
+        if hoje is None:
+            hoje = gerenciador.calc.mes_atual()
+        ultimo = estado.ultimo(chave)
+        if ultimo is not None and ultimo < hoje - 1:
+            print(f"⏪ Recuperando {hoje - 1 - ultimo} virada(s) perdida(s) de {chave}")
+            gerenciador.registrar_historico(ultimo, hoje - 2)
+
+        resultado = gerenciador.atualizar_mes()
+        if resultado is None:
+            raise RuntimeError(f"virada de {ordinal_para_mes(hoje)} em {chave} falhou e fica pendente")
+        estado.registrar(chave, hoje)
+        return resultado
+
+
+def virar_se_pendente(gerenciador, chave, estado, dia):
+    """
+    Vira o mês da planilha se a virada dele ainda não foi feita (bloqueante)
+
+    A pendência é conferida sob a trava da planilha: uma virada que terminou
+    enquanto esta esperava (ex: um /atualizarmes) não é repetida.
+
+    Args:
+        gerenciador (Storage): Armazenamento da planilha
+        chave (str): Planilha
+        estado (EstadoVirada): Estado das viradas
+        dia (int): Dia do mês da virada (AUTO_UPDATE_DAY)
+
+    Returns:
+        dict: Resultado de atualizar_mes, ou None se não havia virada pendente
+    """
+    with estado.trava(chave):
+        hoje = mes_pendente(gerenciador, chave, estado, dia)
+        if hoje is None:
+            return None
+        print(f"🔄 Executando virada de {ordinal_para_mes(hoje)} em {chave}...")
+        return virar_mes(gerenciador, chave, estado, hoje=hoje)